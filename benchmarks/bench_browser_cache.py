@@ -0,0 +1,77 @@
+"""Compare Selenium lookups with a cold and a warm Chrome profile
+
+Usage: python benchmarks/bench_browser_cache.py [lookups]
+
+Profiles are served by the local fixture server, whose pages load a script
+bundle and stylesheet with long-lived cache headers like mrivals.gg's. Each
+lookup starts its own driver, like !rank does, and reports the bytes the
+server sent and the time from navigation until the JSON-LD has rendered.
+
+"fresh" gives every driver a new user-data directory, which is what
+happens without CHROME_PROFILE_DIR. "cold" is the first driver on an empty
+ProfilePool slot and "warm" the drivers that reuse it afterwards. As with
+bench_engines.py, on Linux set RENDER=true and point CHROME_BINARY and
+CHROMEDRIVER_PATH at a matching Chrome install.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import FixtureServer
+
+server = FixtureServer()
+os.environ['MRIVALS_BASE_URL'] = server.start()
+
+import botforserver as bot
+from browser_cache import ProfilePool
+
+
+def timed_lookup(username):
+    """Return (bytes downloaded, seconds until JSON-LD) for one new driver"""
+    driver = bot.create_driver()
+    try:
+        bytes_before = server.bytes_sent
+        start = time.perf_counter()
+        bot.load_profile_page(driver, f'{bot.MRIVALS_BASE_URL}/player/{username}')
+        readiness = bot.wait_for_sections(driver, username, ["jsonld"])
+        elapsed = time.perf_counter() - start
+    finally:
+        bot.quit_driver(driver)
+    assert readiness and not readiness['missing'], \
+        f"JSON-LD did not render for {username}"
+    return server.bytes_sent - bytes_before, elapsed
+
+
+def report(label, results):
+    downloaded = [size for size, _ in results]
+    times = sorted(seconds for _, seconds in results)
+    print(f"{label:>6}  {statistics.mean(downloaded) / 1024:8.1f} KiB/lookup  "
+          f"time-to-JSON-LD mean {statistics.mean(times) * 1000:6.0f}ms  "
+          f"p50 {times[len(times) // 2] * 1000:6.0f}ms  "
+          f"({len(results)} lookups)")
+
+
+def main():
+    lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    bot.async_engine = None
+
+    bot.profile_pool = None
+    report("fresh", [timed_lookup(f"fresh{i}") for i in range(lookups)])
+
+    with tempfile.TemporaryDirectory(prefix="bench-profiles-") as root:
+        bot.profile_pool = ProfilePool(root, 1, bot.CHROME_CACHE_MAX_MB * 2**20)
+        report("cold", [timed_lookup("cold0")])
+        report("warm", [timed_lookup(f"warm{i}") for i in range(lookups)])
+        stats = bot.profile_pool.stats()
+        print(f"profile on disk {stats['bytes'] / 2**20:.1f} MiB, "
+              f"{stats['warm_starts']} warm / {stats['cold_starts']} cold starts")
+
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
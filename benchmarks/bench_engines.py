@@ -0,0 +1,91 @@
+"""Compare the Selenium, Playwright and CDP engines on the same fixture pages
+
+Usage: python benchmarks/bench_engines.py [lookups] [concurrency]
+
+Profiles are served by the local fixture server, so no requests reach
+mrivals.gg. Each lookup opens and closes its own session, like !rank does.
+The Selenium engine uses create_driver(), so on Linux set RENDER=true and
+point CHROME_BINARY and CHROMEDRIVER_PATH at a matching Chrome install.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import FixtureServer
+
+server = FixtureServer()
+os.environ['MRIVALS_BASE_URL'] = server.start()
+
+import botforserver as bot
+from cdp_engine import CdpEngine
+from playwright_engine import PlaywrightEngine
+
+
+async def timed_lookup(username):
+    """Run one full lookup through the engine contract and time it"""
+    start = time.perf_counter()
+    session = await bot.create_driver_async()
+    try:
+        player_data, top_heroes, stats, matches = await bot.get_player_data_async(
+            session, username)
+    finally:
+        await bot.quit_driver_async(session)
+    assert player_data and len(top_heroes) == 3 and len(matches) == 10, \
+        f"Incomplete extraction for {username}"
+    return time.perf_counter() - start
+
+
+async def run(engine_name, lookups, concurrency):
+    # Warm up once so browser launch is not counted against the first lookup
+    await timed_lookup("warmup")
+
+    sequential = [await timed_lookup(f"player{i}") for i in range(lookups)]
+
+    start = time.perf_counter()
+    concurrent = await asyncio.gather(
+        *[timed_lookup(f"burst{i}") for i in range(concurrency)])
+    burst_wall = time.perf_counter() - start
+
+    sequential.sort()
+    print(f"{engine_name:>10}  sequential mean {statistics.mean(sequential):6.3f}s  "
+          f"p50 {sequential[len(sequential) // 2]:6.3f}s  "
+          f"p95 {sequential[int(len(sequential) * 0.95) - 1]:6.3f}s  |  "
+          f"{concurrency} concurrent: wall {burst_wall:6.3f}s  "
+          f"max {max(concurrent):6.3f}s")
+
+
+async def main():
+    lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    bot.async_engine = None
+    await run("selenium", lookups, concurrency)
+
+    engine = PlaywrightEngine(bot.MRIVALS_BASE_URL, bot.SELENIUM_TIMEOUT,
+                              bot.PAGE_LOAD_TIMEOUT, bot.USER_AGENT,
+                              executable_path=os.getenv('CHROME_BINARY'))
+    bot.async_engine = engine
+    try:
+        await run("playwright", lookups, concurrency)
+    finally:
+        await engine.close()
+
+    engine = CdpEngine(bot.MRIVALS_BASE_URL, bot.SELENIUM_TIMEOUT,
+                       bot.PAGE_LOAD_TIMEOUT, bot.USER_AGENT,
+                       chrome_binary=os.getenv('CHROME_BINARY'))
+    bot.async_engine = engine
+    try:
+        await run("cdp", lookups, concurrency)
+    finally:
+        await engine.close()
+
+    print(f"fixture server handled {server.request_count} profile requests")
+    server.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""Measure event-loop stalls caused by logging during a burst of commands
+
+Usage: python benchmarks/bench_logging.py [commands] [lines_per_command] [console_delay_ms]
+
+Runs the same DEBUG-level burst twice: with file and console handlers
+attached directly to the root logger (the old basicConfig setup), then
+through log_pipeline's QueueHandler/QueueListener. Reported are the time
+the event loop spends inside logging calls and how late a ticker's 1ms
+sleeps wake up. Console output goes to a temporary file so the terminal
+does not skew the numbers; console_delay_ms makes every console write
+block for that long, like a slow log collector reading the pipe.
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_pipeline import TEXT_FORMAT, setup_logging
+
+logger = logging.getLogger("bench")
+
+
+class SlowStream:
+    """File stream whose writes block, like a backed-up stderr pipe"""
+
+    def __init__(self, stream, delay):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+async def fake_command(index, lines, call_times):
+    """Log like a !rank lookup does, waiting on "I/O" in between"""
+    for line in range(lines):
+        start = time.perf_counter()
+        logger.debug(f"command {index} step {line}: fetched section for player{index}")
+        call_times.append(time.perf_counter() - start)
+        await asyncio.sleep(0.001)
+
+
+async def burst(commands, lines):
+    lags = []
+    call_times = []
+    running = True
+
+    async def ticker():
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    ticker_task = asyncio.ensure_future(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[fake_command(i, lines, call_times) for i in range(commands)])
+    wall = time.perf_counter() - start
+    running = False
+    await ticker_task
+    return wall, call_times, lags
+
+
+def report(name, wall, call_times, lags):
+    call_times.sort()
+    lags.sort()
+    print(f"{name:>8}  wall {wall * 1000:7.1f}ms  "
+          f"in log calls {sum(call_times) * 1000:7.1f}ms "
+          f"(p99 {call_times[int(len(call_times) * 0.99) - 1] * 1e6:6.1f}us, "
+          f"max {call_times[-1] * 1e6:7.1f}us)  "
+          f"ticker lag p99 {lags[int(len(lags) * 0.99) - 1] * 1000:5.2f}ms  "
+          f"max {lags[-1] * 1000:5.2f}ms")
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def main():
+    commands = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    console_delay = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        console = open(os.path.join(tmp, 'console.log'), 'w')
+        real_stderr, sys.stderr = sys.stderr, SlowStream(console, console_delay)
+        try:
+            logging.basicConfig(
+                level=logging.DEBUG,
+                format=TEXT_FORMAT,
+                handlers=[logging.FileHandler(os.path.join(tmp, 'direct.log')),
+                          logging.StreamHandler()])
+            direct = asyncio.run(burst(commands, lines))
+            reset_root()
+
+            listener = setup_logging(logging.DEBUG,
+                                     os.path.join(tmp, 'queued.log'))
+            queued = asyncio.run(burst(commands, lines))
+            listener.stop()
+            reset_root()
+        finally:
+            sys.stderr = real_stderr
+            console.close()
+
+    print(f"{commands} commands x {lines} DEBUG lines, "
+          f"console delay {console_delay * 1000:g}ms")
+    report("direct", *direct)
+    report("queued", *queued)
+
+
+if __name__ == '__main__':
+    main()
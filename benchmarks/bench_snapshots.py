@@ -0,0 +1,148 @@
+"""Compare cached player snapshots as scraped dicts and as PlayerSnapshot
+
+Usage: python benchmarks/bench_snapshots.py [count]
+
+Builds `count` full profiles (3 top heroes and 10 recent matches each) in
+the shape get_player_data returns them, then reports the memory held by
+the dict results and by PlayerSnapshot objects, the one-off cost of
+parsing them at ingest, and the cost of sorting the roster representation
+(name, rank, win rate) with the old string-parsing sort key versus the
+numbers parsed at ingest.
+"""
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshot import (RANK_ORDER, PlayerSnapshot, parse_rank,
+                      parse_win_rate)
+
+RANKS = [f"{tier} {division}" for tier in
+         ("Bronze", "Silver", "Gold", "Platinum", "Diamond", "Grandmaster",
+          "Celestial") for division in ("III", "II", "I")]
+RANKS += ["Eternity", "One Above All"]
+HEROES = ["Magik", "Luna Snow", "Magneto", "Hulk", "Storm", "Loki", "Venom",
+          "Psylocke", "Mantis", "Thor"]
+
+
+def dict_sort_key(player):
+    """The sort key used before snapshots, parsing strings on every call"""
+    if player["rank"] == "Unknown":
+        return (999, 999, 0)
+    tier, number = parse_rank(player["rank"])
+    return (RANK_ORDER.get(tier, 999), number,
+            -parse_win_rate(player["win_rate"]))
+
+
+def scraped_profile(rng, i):
+    """One profile as get_player_data returns it"""
+    player_data = {
+        "@type": "Person",
+        "name": f"player{i}",
+        "additionalProperty": [
+            {"@type": "PropertyValue", "name": "Rank",
+             "value": rng.choice(RANKS)},
+            {"@type": "PropertyValue", "name": "Level",
+             "value": str(rng.randint(1, 400))},
+            {"@type": "PropertyValue", "name": "Win Rate",
+             "value": f"{rng.uniform(30, 70):.1f}%"},
+        ]
+    }
+    top_heroes = []
+    for rank, name in enumerate(rng.sample(HEROES, 3), 1):
+        wins, losses = rng.randint(0, 400), rng.randint(0, 400)
+        top_heroes.append({
+            "name": name,
+            "matches": f"{wins + losses} matches",
+            "win_rate": f"{wins / max(wins + losses, 1) * 100:.1f}%",
+            "w_l": f"{wins}W / {losses}L",
+            "rank": rank,
+            "image_url": f"https://mrivals.gg/assets/heroes/{name.lower()}.webp"
+        })
+    wins, losses = rng.randint(0, 2000), rng.randint(0, 2000)
+    stats = {
+        "time_played": f"{rng.randint(1, 900)}h {rng.randint(0, 59)}m",
+        "total_matches": f"{wins + losses:,}",
+        "wins": f"{wins:,}",
+        "losses": f"{losses:,}"
+    }
+    matches = []
+    for m in range(10):
+        kills, deaths, assists = (rng.randint(0, 30), rng.randint(0, 15),
+                                  rng.randint(0, 30))
+        is_win = rng.random() < 0.5
+        matches.append({
+            "result": "Victory" if is_win else "Defeat",
+            "is_win": is_win,
+            "details": f"Competitive • Tokyo 2099 • Match {m}",
+            "stats": {"K": str(kills), "D": str(deaths), "A": str(assists),
+                      "KDA": f"{(kills + assists) / max(deaths, 1):.2f}"}
+        })
+    return player_data, top_heroes, stats, matches
+
+
+def measure(build):
+    """Return (result, bytes allocated and still held)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(build):
+    """Return (result, seconds), without tracemalloc slowing it down"""
+    start = time.perf_counter()
+    result = build()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(count)
+
+    profiles, dict_bytes = measure(
+        lambda: [scraped_profile(rng, i) for i in range(count)])
+    # Parse cost, on profiles that already exist
+    _, parse_s = timed(
+        lambda: [PlayerSnapshot.from_profile(*profile) for profile in profiles])
+    # Memory, counting the strings a snapshot keeps once the dicts are gone
+    rng = random.Random(count)
+    _, snapshot_bytes = measure(lambda: [
+        PlayerSnapshot.from_profile(*scraped_profile(rng, i))
+        for i in range(count)
+    ])
+
+    print(f"{count} cached full profiles")
+    print(f"  dict results     {dict_bytes / 2**20:8.1f} MiB "
+          f"({dict_bytes / count:6.0f} B each)")
+    print(f"  PlayerSnapshot   {snapshot_bytes / 2**20:8.1f} MiB "
+          f"({snapshot_bytes / count:6.0f} B each), "
+          f"parsed once in {parse_s * 1000:.0f}ms "
+          f"({parse_s / count * 1e6:.1f}us each)")
+
+    roster = [{
+        "name": data["name"],
+        "rank": data["additionalProperty"][0]["value"],
+        "win_rate": data["additionalProperty"][2]["value"]
+    } for data, _, _, _ in profiles]
+    del profiles
+    top_snapshots, top_parse_s = timed(
+        lambda: [PlayerSnapshot.from_top_data(stats) for stats in roster])
+    _, dict_sort_s = timed(lambda: sorted(roster, key=dict_sort_key))
+    _, snapshot_sort_s = timed(
+        lambda: sorted(top_snapshots, key=lambda player: player.sort_key))
+
+    print(f"{count} roster entries")
+    print(f"  sort dicts, parsing strings     {dict_sort_s * 1000:7.0f}ms")
+    print(f"  sort snapshots, parsed at ingest {snapshot_sort_s * 1000:6.0f}ms "
+          f"(+{top_parse_s * 1000:.0f}ms once to parse)")
+
+
+if __name__ == '__main__':
+    main()
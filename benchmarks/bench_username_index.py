@@ -0,0 +1,69 @@
+"""Measure UsernameIndex lookup time for large indexes
+
+Usage: python benchmarks/bench_username_index.py [size ...]
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from username_index import UsernameIndex
+
+QUERIES = 2000
+
+
+def random_name(rng):
+    """Generate a gamer-tag style username"""
+    length = rng.randint(4, 14)
+    alphabet = string.ascii_letters + string.digits + "_"
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def typo(rng, name):
+    """Introduce a single-character typo into a name"""
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+
+
+def bench(size):
+    rng = random.Random(size)
+    names = [random_name(rng) for _ in range(size)]
+
+    start = time.perf_counter()
+    index = UsernameIndex()
+    for name in names:
+        index.add(name)
+    build_s = time.perf_counter() - start
+
+    sample = [rng.choice(names) for _ in range(QUERIES)]
+    case_slips = [name.swapcase() for name in sample]
+    typos = [typo(rng, name) for name in sample]
+
+    start = time.perf_counter()
+    for query in case_slips:
+        index.resolve(query)
+    resolve_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+    start = time.perf_counter()
+    hits = 0
+    for query, expected in zip(typos, sample):
+        if expected in index.suggest(query):
+            hits += 1
+    suggest_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+    print(f"{size:>8} names  build {build_s:6.2f}s  "
+          f"resolve {resolve_us:6.2f}us  suggest {suggest_us:8.1f}us  "
+          f"typo recall {hits / QUERIES:.0%}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    for size in sizes:
+        bench(size)
+
+
+if __name__ == '__main__':
+    main()
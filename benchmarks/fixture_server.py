@@ -0,0 +1,82 @@
+"""Local stand-in for mrivals.gg profile pages
+
+Serves /player/<username> from the templates in fixtures/, so scrapers can
+be pointed at it with MRIVALS_BASE_URL. Usernames starting with "missing"
+return a page without player data and usernames starting with "private"
+return a private profile. Pages load a script bundle and a stylesheet from
+/assets/, served with long-lived cache headers, so browser caching can be
+measured.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture import ProfileServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'fixtures')
+
+
+def load_template(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def build_asset(kind, size):
+    """Deterministic filler standing in for a minified bundle"""
+    if kind == 'js':
+        line = "window.__mrivals=(window.__mrivals||0)+1;/*" + "x" * 60 + "*/\n"
+    else:
+        line = ".c{color:#fff;margin:0 auto;padding:0}/*" + "x" * 60 + "*/\n"
+    return (line * (size // len(line) + 1))[:size].encode('utf-8')
+
+
+ASSETS = {
+    'app.js': ('application/javascript', build_asset('js', 400 * 1024)),
+    'app.css': ('text/css', build_asset('css', 80 * 1024)),
+}
+
+
+def render_profile(username, match_count=10):
+    """Render a fixture profile page for a username"""
+    page = load_template('player.html')
+    match_template = load_template('match.html')
+
+    if username.lower().startswith('missing'):
+        # mrivals.gg renders its shell without the player JSON-LD
+        start = page.index('<script type="application/ld+json">\n{"@context": "https://schema.org", "@type": "ProfilePage"')
+        end = page.index('</script>', start) + len('</script>')
+        page = page[:start] + page[end:]
+    elif username.lower().startswith('private'):
+        page = page.replace('"Diamond II"', '"Unranked"').replace(
+            '"53.2%"', '"0%"')
+
+    matches = []
+    for i in range(match_count):
+        is_win = i % 3 != 2
+        matches.append(
+            match_template.replace('{{result_class}}',
+                                   'bg-green-500' if is_win else 'bg-red-500')
+            .replace('{{index}}', str(i)).replace('{{kills}}', str(10 + i))
+            .replace('{{deaths}}', str(3 + i % 4)).replace(
+                '{{assists}}', str(7 + i % 5)).replace(
+                    '{{kda}}', f"{(17 + i) / (3 + i % 4):.2f}"))
+    return page.replace('{{matches}}', ''.join(matches)).replace(
+        '{{username}}', username)
+
+
+class FixtureServer(ProfileServer):
+    """Serve rendered fixture profiles, with optional latency"""
+
+    def render(self, username):
+        return render_profile(username).encode('utf-8')
+
+    def asset(self, name):
+        return ASSETS.get(name)
+
+
+if __name__ == '__main__':
+    server = FixtureServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f"Serving fixture profiles at {server.base_url}/player/<username>")
+    server.serve_forever()
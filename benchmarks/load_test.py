@@ -0,0 +1,267 @@
+"""Drive the real !rank and !top commands with simulated Discord users
+
+Usage: python benchmarks/load_test.py [users] [roster sizes] [rounds]
+e.g.   python benchmarks/load_test.py 1,5,10,20 10,50 3
+
+For every roster size and number of concurrent users, each user runs
+`rounds` commands one after another through the command callbacks, with a
+fake context whose send, edit and delete only record the reply. A share of
+the commands are !top, the rest !rank on a player nobody looked up before.
+Profiles come from the local fixture server, so no requests reach
+mrivals.gg. Each step starts from empty caches and reports throughput,
+reply outcomes, latency percentiles and the peak number of Chrome
+processes and resident memory of the bot and its browsers.
+
+The bot is configured from the environment as usual, so set
+SELENIUM_WORKERS, SCRAPER_ENGINE etc. to the values under test. These
+shape the load:
+
+    LOAD_LATENCY       seconds the fixture server takes per request (0.2)
+    LOAD_FAILURE_RATE  share of profile requests answered with a 503 (0)
+    LOAD_STALL_RATE    share held until the page load times out (0)
+    LOAD_TOP_SHARE     share of commands that are !top (0.2)
+    LOAD_GUILDS        servers the users are spread over, 0 for DMs (1)
+    LOAD_SEND_LATENCY  seconds each Discord send, edit or delete takes (0.05)
+
+Process counts and memory are read from /proc, so they are only reported
+on Linux, like the Render container the bot runs in.
+"""
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import FixtureServer
+
+LATENCY = float(os.getenv('LOAD_LATENCY', '0.2'))
+FAILURE_RATE = float(os.getenv('LOAD_FAILURE_RATE', '0'))
+STALL_RATE = float(os.getenv('LOAD_STALL_RATE', '0'))
+TOP_SHARE = float(os.getenv('LOAD_TOP_SHARE', '0.2'))
+GUILDS = int(os.getenv('LOAD_GUILDS', '1'))
+SEND_LATENCY = float(os.getenv('LOAD_SEND_LATENCY', '0.05'))
+
+# Keep the bot's files out of the working directory
+state_dir = tempfile.mkdtemp(prefix='load-test-')
+for name, path in (('USERNAME_INDEX_PATH', 'usernames.json'),
+                   ('HERO_INDEX_PATH', 'hero_index.json'),
+                   ('MATCH_HISTORY_DIR', 'match_history'),
+                   ('LEADERBOARD_CHANNELS_PATH', 'leaderboard_channels.json'),
+                   ('RANK_WATCH_PATH', 'rank_watch.json'),
+                   ('CHROME_PROFILE_DIR', 'chrome_profiles'),
+                   ('PROFILE_DIR', 'profiles'),
+                   ('LOG_FILE', 'bot.log')):
+    os.environ[name] = os.path.join(state_dir, path)
+
+server = FixtureServer(latency=LATENCY, failure_rate=FAILURE_RATE,
+                       stall_rate=STALL_RATE,
+                       stall_time=int(os.getenv('PAGE_LOAD_TIMEOUT', '15')) + 5)
+os.environ['MRIVALS_BASE_URL'] = server.start()
+
+import botforserver as bot
+from browser_supervisor import descendants, is_browser, process_table
+from degradation import DegradationController, percentile
+from leaderboard import SortedLeaderboard
+from profile_cache import (CircuitBreaker, NegativeCache, SnapshotCache,
+                           normalize_username)
+
+# Reply text prefixes and the outcome they stand for
+OUTCOMES = (("⏳", "busy"), ("⚠️ MRivals.gg", "upstream"),
+            ("Could not find", "not found"), ("🔒", "private"),
+            ("⏱️", "deadline"), ("An error occurred", "error"))
+
+
+class FakeMessage:
+
+    def __init__(self, content=None, embed=None):
+        self.content = content
+        self.embed = embed
+
+    async def edit(self, content=None, **kwargs):
+        await asyncio.sleep(SEND_LATENCY)
+        self.content = content
+
+    async def delete(self):
+        await asyncio.sleep(SEND_LATENCY)
+
+
+class FakeContext:
+    """Just enough of commands.Context for the command callbacks"""
+
+    def __init__(self, user_id, guild_id=None):
+        self.author = SimpleNamespace(id=user_id, name=f"user{user_id}")
+        self.guild = SimpleNamespace(
+            id=guild_id, name=f"guild{guild_id}") if guild_id else None
+        self.replies = []
+
+    async def send(self, content=None, embed=None, **kwargs):
+        await asyncio.sleep(SEND_LATENCY)
+        message = FakeMessage(content, embed)
+        self.replies.append(message)
+        return message
+
+    def outcome(self):
+        if any(reply.embed for reply in self.replies):
+            return "ok"
+        text = self.replies[-1].content if self.replies else ""
+        for prefix, outcome in OUTCOMES:
+            if text and text.startswith(prefix):
+                return outcome
+        return "other"
+
+
+def process_tree():
+    """(browsers, Chrome processes, RSS bytes) of this process and its children
+
+    Returns None where /proc is not available.
+    """
+    processes = process_table()
+    if processes is None:
+        return None
+    tree = [os.getpid()] + descendants(processes, os.getpid())
+
+    def is_chrome(pid):
+        name, state, _, _ = processes.get(pid, ("", "", 0, 0))
+        return state != 'Z' and is_browser(name)
+
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    chrome = browsers = rss = 0
+    for pid in tree:
+        if is_chrome(pid):
+            chrome += 1
+            # Renderers and helpers are children of the browser process
+            if not is_chrome(processes[pid][2]):
+                browsers += 1
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                rss += int(f.read().split()[1]) * page_size
+        except OSError:
+            pass
+    return browsers, chrome, rss
+
+
+class PeakSampler:
+    """Track the most browsers, Chrome processes and RSS seen while running"""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            sample = process_tree()
+            if sample is None:
+                return
+            self.peak = tuple(max(a, b) for a, b in zip(self.peak, sample)) \
+                if self.peak else sample
+            if self._stop.wait(self.interval):
+                return
+
+
+def reset_bot(roster):
+    """Start a step from empty caches with a roster of `roster` players"""
+    bot.TOP_PLAYERS = roster
+    bot.roster_keys = {normalize_username(name) for name in roster}
+    bot.top_board = SortedLeaderboard(lambda player: player.sort_key)
+    bot.top_cache.update(player_stats=None, computed_at=0.0, queue_wait=0.0,
+                         task=None)
+    bot.negative_cache = NegativeCache(bot.NEGATIVE_CACHE_TTL)
+    bot.rank_snapshots = SnapshotCache()
+    bot.top_snapshots = SnapshotCache()
+    bot.mrivals_breaker = CircuitBreaker(bot.BREAKER_FAILURE_THRESHOLD,
+                                         bot.BREAKER_RESET_TIMEOUT)
+    bot.service_mode = DegradationController(
+        bot.DEGRADE_LATENCY_SLO, bot.DEGRADE_QUEUE_DEPTH,
+        bot.browser_scheduler.queue_depth)
+
+
+async def simulate_user(step, user, rounds, rng, results):
+    guild_id = 1 + user % GUILDS if GUILDS else None
+    for round_number in range(rounds):
+        ctx = FakeContext(1000 + user, guild_id)
+        command = "top" if rng.random() < TOP_SHARE else "rank"
+        start = time.perf_counter()
+        if command == "top":
+            await bot.top.callback(ctx)
+        else:
+            await bot.rank.callback(
+                ctx, username=f"load{step}u{user}r{round_number}")
+        results.append((command, ctx.outcome(), time.perf_counter() - start))
+
+
+def report(roster_size, users, results, wall, peak):
+    for command in ("rank", "top"):
+        entries = [entry for entry in results if entry[0] == command]
+        if not entries:
+            continue
+        latencies = [seconds for _, _, seconds in entries]
+        outcomes = {}
+        for _, outcome, _ in entries:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        counts = ", ".join(f"{count} {outcome}"
+                           for outcome, count in sorted(outcomes.items()))
+        print(f"{roster_size:>6} {users:>5}  !{command:<4} "
+              f"{len(entries) / wall:6.2f}/s  "
+              f"p50 {percentile(latencies, 0.5):6.2f}s  "
+              f"p90 {percentile(latencies, 0.9):6.2f}s  "
+              f"p99 {percentile(latencies, 0.99):6.2f}s  "
+              f"max {max(latencies):6.2f}s  ({counts})")
+    if peak:
+        browsers, chrome, rss = peak
+        print(f"{'':>13}  peak {browsers} browsers, {chrome} Chrome processes, "
+              f"RSS {rss / 2**20:.0f} MiB")
+
+
+async def main():
+    user_counts = [int(n) for n in (sys.argv[1] if len(sys.argv) > 1
+                                    else "1,5,10,20").split(",")]
+    roster_sizes = [int(n) for n in (sys.argv[2] if len(sys.argv) > 2
+                                     else "10,50").split(",")]
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    print(f"SELENIUM_WORKERS={bot.SELENIUM_WORKERS} engine={bot.SCRAPER_ENGINE} "
+          f"latency={LATENCY}s failures={FAILURE_RATE:.0%} "
+          f"stalls={STALL_RATE:.0%} top share={TOP_SHARE:.0%}")
+    print(f"{'roster':>6} {'users':>5}")
+    step = 0
+    for roster_size in roster_sizes:
+        for users in user_counts:
+            step += 1
+            reset_bot([f"roster{step}p{i}" for i in range(roster_size)])
+            rng = random.Random(step)
+            results = []
+            with PeakSampler() as sampler:
+                start = time.perf_counter()
+                await asyncio.gather(*[
+                    simulate_user(step, user, rounds, rng, results)
+                    for user in range(users)
+                ])
+                wall = time.perf_counter() - start
+            report(roster_size, users, results, wall, sampler.peak)
+
+    print(f"fixture server handled {server.request_count} requests, "
+          f"{server.failures} failed on purpose")
+    if bot.async_engine:
+        await bot.async_engine.close()
+    server.stop()
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,21 +1,51 @@
 import os
 import discord
-from discord.ext import commands
+from discord import app_commands
+from discord.ext import commands, tasks
+from discord.ext.commands.view import StringView
 from dotenv import load_dotenv
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 import json
+import csv
+import io
 import time
+import random
 import urllib.parse
 import asyncio
 import logging
+import signal
 from concurrent.futures import ThreadPoolExecutor
 from player_data import TOP_PLAYERS, PLAYER_EMOJIS
+from profile_cache import (NOT_FOUND, PRIVATE, CircuitBreaker, NegativeCache,
+                           SnapshotCache, UpstreamError, normalize_username)
+from username_index import UsernameIndex
+from hero_index import MIN_HERO_MATCHES, HeroIndex
+from snapshot import PRIVATE_PROFILE, PlayerSnapshot
+from match_history import MatchHistoryStore, match_key
+from extraction import (EXTRACT_JSONLD_SCRIPT, EXTRACT_PLAYER_SCRIPT,
+                        PROFILE_SECTIONS, UNKNOWN_STATS,
+                        WAIT_FOR_SECTIONS_SCRIPT, build_hero_cards,
+                        build_top_data, find_player_entity,
+                        is_private_profile, profile_exists, sections_args,
+                        selenium_async_script)
+from leaderboard import (LeaderboardChannels, SortedLeaderboard, content_hash,
+                         format_delta, rank_deltas)
+from deadline import Deadline, DeadlineExceeded
+from degradation import CACHE_ONLY, FULL, STALE, DegradationController
+from log_pipeline import setup_logging
+from capture import CaptureWriter, ReplayServer
+from browser_cache import ProfilePool
+from browser_supervisor import BrowserSupervisor
+from profiler import SamplingProfiler
+from loop_watchdog import LoopWatchdog
+from rank_watcher import RankWatcher, rank_position
+from scheduler import (BACKGROUND, BULK, INTERACTIVE, BrowserScheduler,
+                       QueueFull)
 
 # Load environment variables
 load_dotenv()
@@ -26,13 +56,61 @@ DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 SELENIUM_WORKERS = int(os.getenv('SELENIUM_WORKERS', '2'))
 SELENIUM_TIMEOUT = int(os.getenv('SELENIUM_TIMEOUT', '2'))
 DUMP_HTML = os.getenv('DUMP_HTML', 'False').lower() == 'true'
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG if DEBUG else logging.INFO,  # Set level based on DEBUG
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.FileHandler('bot.log'),
-              logging.StreamHandler()])
+# DUMP_HTML now records into the capture directory
+CAPTURE_DIR = os.getenv('CAPTURE_DIR') or ('captures' if DUMP_HTML else None)
+REPLAY_DIR = os.getenv('REPLAY_DIR')
+PAGE_LOAD_TIMEOUT = int(os.getenv('PAGE_LOAD_TIMEOUT', '15'))
+# Overall time budget of one !rank, from the queue to the last message
+COMMAND_DEADLINE = float(os.getenv('COMMAND_DEADLINE', '25'))
+CHROME_PROFILE_DIR = os.getenv('CHROME_PROFILE_DIR', 'chrome_profiles')
+CHROME_CACHE_MAX_MB = int(os.getenv('CHROME_CACHE_MAX_MB', '200'))
+SCRAPER_ENGINE = os.getenv('SCRAPER_ENGINE', 'selenium').lower()
+MRIVALS_BASE_URL = os.getenv('MRIVALS_BASE_URL', 'https://mrivals.gg').rstrip('/')
+NEGATIVE_CACHE_TTL = int(os.getenv('NEGATIVE_CACHE_TTL', '300'))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '3'))
+BREAKER_RESET_TIMEOUT = int(os.getenv('BREAKER_RESET_TIMEOUT', '60'))
+USERNAME_INDEX_PATH = os.getenv('USERNAME_INDEX_PATH', 'usernames.json')
+MATCH_HISTORY_DIR = os.getenv('MATCH_HISTORY_DIR', 'match_history')
+HERO_INDEX_PATH = os.getenv('HERO_INDEX_PATH', 'hero_index.json')
+LEADERBOARD_CHANNELS_PATH = os.getenv('LEADERBOARD_CHANNELS_PATH',
+                                      'leaderboard_channels.json')
+LEADERBOARD_INTERVAL = int(os.getenv('LEADERBOARD_INTERVAL', '15'))
+TOP_CACHE_TTL = int(os.getenv('TOP_CACHE_TTL', '300'))
+RANK_WATCH_PATH = os.getenv('RANK_WATCH_PATH', 'rank_watch.json')
+RANK_WATCH_BUDGET = int(os.getenv('RANK_WATCH_BUDGET', '60'))
+RANK_WATCH_MIN_INTERVAL = int(os.getenv('RANK_WATCH_MIN_INTERVAL', '10'))
+RANK_WATCH_MAX_INTERVAL = int(os.getenv('RANK_WATCH_MAX_INTERVAL', '360'))
+PREFIX_COMMANDS = os.getenv('PREFIX_COMMANDS', 'True').lower() == 'true'
+SCHEDULER_RESERVED_INTERACTIVE = int(
+    os.getenv('SCHEDULER_RESERVED_INTERACTIVE', '1'))
+MAX_QUEUED_JOBS = int(os.getenv('MAX_QUEUED_JOBS', '20'))
+MAX_JOBS_PER_USER = int(os.getenv('MAX_JOBS_PER_USER', '2'))
+MAX_JOBS_PER_GUILD = int(os.getenv('MAX_JOBS_PER_GUILD', '5'))
+MAX_BULK_LOOKUP = int(os.getenv('MAX_BULK_LOOKUP', '30'))
+DEGRADE_LATENCY_SLO = float(os.getenv('DEGRADE_LATENCY_SLO', '10'))
+DEGRADE_QUEUE_DEPTH = int(os.getenv('DEGRADE_QUEUE_DEPTH', '10'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv('LOOP_LAG_THRESHOLD_MS', '250'))
+LOOP_LAG_REPORT_INTERVAL = int(os.getenv('LOOP_LAG_REPORT_INTERVAL', '300'))
+BROWSER_SWEEP_INTERVAL = int(os.getenv('BROWSER_SWEEP_INTERVAL', '60'))
+DRIVER_MAX_AGE = int(os.getenv('DRIVER_MAX_AGE', '900'))
+SHUTDOWN_TIMEOUT = int(os.getenv('SHUTDOWN_TIMEOUT', '20'))
+LOG_FILE = os.getenv('LOG_FILE', 'bot.log')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN') or None
+LOG_JSON = os.getenv('LOG_JSON', 'False').lower() == 'true'
+
+# Configure logging; file and console writes happen off the event loop
+log_listener = setup_logging(
+    logging.DEBUG if DEBUG else logging.INFO,  # Set level based on DEBUG
+    LOG_FILE,
+    max_bytes=LOG_MAX_BYTES,
+    backup_count=LOG_BACKUP_COUNT,
+    rotate_when=LOG_ROTATE_WHEN,
+    json_records=LOG_JSON)
 logger = logging.getLogger(__name__)
 
 # Set logger level based on DEBUG
@@ -40,7 +118,11 @@ logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
 
 # Bot configuration
 intents = discord.Intents.default()
-intents.message_content = True
+if PREFIX_COMMANDS:
+    intents.message_content = True
+else:
+    # Slash commands only: skip the privileged intent and message events
+    intents.messages = False
 
 # Create bot instance
 bot = commands.Bot(command_prefix='!', intents=intents)
@@ -99,20 +181,48 @@ HERO_EMOJIS = {
     "Wolverine": "🦮"
 }
 
-# Add rank order mapping with more granular values
-RANK_ORDER = {
-    "one above all": -2,  # Lower value for higher rank
-    "eternity": -1,
-    "celestial": 0,
-    "grandmaster": 1,
-    "diamond": 2,
-    "platinum": 3,
-    "gold": 4,
-    "silver": 5,
-    "bronze": 6,
-    "unknown": 999  # Unknown ranks at the bottom
+# Hero roles, for questions like "most-played tank"
+HERO_ROLES = {
+    "Captain America": "Vanguard",
+    "Doctor Strange": "Vanguard",
+    "Groot": "Vanguard",
+    "Hulk": "Vanguard",
+    "Magneto": "Vanguard",
+    "Peni Parker": "Vanguard",
+    "The Thing": "Vanguard",
+    "Thor": "Vanguard",
+    "Venom": "Vanguard",
+    "Black Panther": "Duelist",
+    "Black Widow": "Duelist",
+    "Hawkeye": "Duelist",
+    "Hela": "Duelist",
+    "Iron Fist": "Duelist",
+    "Iron Man": "Duelist",
+    "Johnny Storm": "Duelist",
+    "Magik": "Duelist",
+    "Moon Knight": "Duelist",
+    "Namor": "Duelist",
+    "Psylocke": "Duelist",
+    "The Punisher": "Duelist",
+    "Scarlet Witch": "Duelist",
+    "Spider-Man": "Duelist",
+    "Squirrel Girl": "Duelist",
+    "Star-Lord": "Duelist",
+    "Storm": "Duelist",
+    "Winter Soldier": "Duelist",
+    "Wolverine": "Duelist",
+    "Adam Warlock": "Strategist",
+    "Cloak & Dagger": "Strategist",
+    "Invisible Woman": "Strategist",
+    "Jeff The Land Shark": "Strategist",
+    "Loki": "Strategist",
+    "Luna Snow": "Strategist",
+    "Mantis": "Strategist",
+    "Rocket Raccoon": "Strategist"
 }
 
+ROLE_EMOJIS = {"Vanguard": "🛡️", "Duelist": "⚔️", "Strategist": "💚"}
+
 # Add rank emoji mapping
 RANK_EMOJIS = {
     "one above all": "👑",
@@ -128,47 +238,230 @@ RANK_EMOJIS = {
 }
 
 # Create a thread pool for Selenium operations
-selenium_pool = ThreadPoolExecutor(max_workers=SELENIUM_WORKERS)
-
+# Named so the profiler can find its threads
+selenium_pool = ThreadPoolExecutor(max_workers=SELENIUM_WORKERS,
+                                   thread_name_prefix='selenium')
+
+# Sampling profiler of the command being profiled, if any
+active_profiler = None
+
+# Logs the stack of anything that holds the event loop past the threshold
+loop_watchdog = LoopWatchdog(threshold=LOOP_LAG_THRESHOLD_MS / 1000,
+                             report_interval=LOOP_LAG_REPORT_INTERVAL)
+
+# Every browser process the bot starts, so leaked ones can be killed
+browser_supervisor = BrowserSupervisor(DRIVER_MAX_AGE)
+
+# User-data directories reused across Selenium drivers, so each one starts
+# with a warm HTTP and code cache
+profile_pool = None
+if CHROME_PROFILE_DIR and SCRAPER_ENGINE == 'selenium':
+    profile_pool = ProfilePool(CHROME_PROFILE_DIR, SELENIUM_WORKERS,
+                               CHROME_CACHE_MAX_MB * 1024 * 1024)
+
+# Short-lived cache of usernames that were not found or private
+negative_cache = NegativeCache(NEGATIVE_CACHE_TTL)
+
+# Last good result per username, served while mrivals.gg is unavailable
+rank_snapshots = SnapshotCache()
+top_snapshots = SnapshotCache()
+
+# Fail fast when mrivals.gg keeps timing out
+mrivals_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD,
+                                 BREAKER_RESET_TIMEOUT)
+
+# Every username resolved so far, for case fixes and "did you mean" hints
+username_index = UsernameIndex.load(USERNAME_INDEX_PATH)
+for roster_name in TOP_PLAYERS:
+    username_index.add(roster_name)
+
+# Top heroes of every roster player, keyed by hero
+hero_index = HeroIndex.load(HERO_INDEX_PATH, HERO_EMOJIS, HERO_ROLES,
+                            TOP_PLAYERS)
+
+# Every match card seen so far, per player
+match_store = MatchHistoryStore(MATCH_HISTORY_DIR)
+
+# Guilds with an auto-updating leaderboard channel
+leaderboard_channels = LeaderboardChannels.load(LEADERBOARD_CHANNELS_PATH)
+
+# Roster players polled in the background for rank-change announcements
+rank_watcher = RankWatcher.load(RANK_WATCH_PATH, TOP_PLAYERS,
+                                min_interval=RANK_WATCH_MIN_INTERVAL * 60,
+                                max_interval=RANK_WATCH_MAX_INTERVAL * 60,
+                                budget_per_hour=RANK_WATCH_BUDGET)
+
+# Last computed roster ranking, shared by !top and the leaderboard job
+top_cache = {
+    "player_stats": None,
+    "computed_at": 0.0,
+    "queue_wait": 0.0,
+    "task": None
+}
 
-def parse_rank(rank_str):
-    """Parse rank string to get rank tier and number"""
+# Roster players in leaderboard order, updated one player at a time by
+# roster scrapes and by !rank lookups of roster players
+top_board = SortedLeaderboard(lambda player: player.sort_key)
+roster_keys = {normalize_username(username) for username in TOP_PLAYERS}
+
+# Orders browser work so interactive lookups run before roster scrapes
+browser_scheduler = BrowserScheduler(SELENIUM_WORKERS,
+                                     SCHEDULER_RESERVED_INTERACTIVE,
+                                     max_queued=MAX_QUEUED_JOBS,
+                                     per_user=MAX_JOBS_PER_USER,
+                                     per_guild=MAX_JOBS_PER_GUILD)
+
+# Steps the bot down to cheaper answers while lookups are too slow
+service_mode = DegradationController(DEGRADE_LATENCY_SLO, DEGRADE_QUEUE_DEPTH,
+                                     browser_scheduler.queue_depth)
+
+# Records profile pages for offline replay
+capture_writer = CaptureWriter(CAPTURE_DIR) if CAPTURE_DIR else None
+
+# Serves recorded profiles locally instead of scraping mrivals.gg
+replay_server = None
+if REPLAY_DIR:
+    replay_server = ReplayServer(REPLAY_DIR)
+    MRIVALS_BASE_URL = replay_server.start()
+    logger.info(
+        f"Replaying {len(replay_server.usernames())} captured profiles from {REPLAY_DIR}")
+
+# Players per !compare; each one is a concurrent browser lookup
+MIN_COMPARE_PLAYERS = 2
+MAX_COMPARE_PLAYERS = 4
+
+# Players per !top page; Discord allows at most 25 fields in an embed
+TOP_PAGE_SIZE = 10
+MAX_EMBED_FIELDS = 25
+TOP_PAGE_TIMEOUT = 300
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Optional native-async engine; the Selenium functions below are the default
+async_engine = None
+if SCRAPER_ENGINE == 'playwright':
+    from playwright_engine import PlaywrightEngine
+    async_engine = PlaywrightEngine(MRIVALS_BASE_URL,
+                                    SELENIUM_TIMEOUT,
+                                    PAGE_LOAD_TIMEOUT,
+                                    USER_AGENT,
+                                    executable_path=os.getenv('CHROME_BINARY'),
+                                    capture_writer=capture_writer,
+                                    supervisor=browser_supervisor)
+elif SCRAPER_ENGINE == 'cdp':
+    from cdp_engine import CdpEngine
+    async_engine = CdpEngine(MRIVALS_BASE_URL,
+                             SELENIUM_TIMEOUT,
+                             PAGE_LOAD_TIMEOUT,
+                             USER_AGENT,
+                             chrome_binary=os.getenv('CHROME_BINARY'),
+                             capture_writer=capture_writer,
+                             supervisor=browser_supervisor)
+
+
+def sort_key(player):
+    """Sort key for the leaderboard: rank tier, number, then win rate"""
+    return player.sort_key
+
+
+def load_profile_page(driver, profile_url, deadline=None):
+    """Navigate to a profile page, raising UpstreamError if it fails
+
+    With a deadline the page load is cut short when the command runs out
+    of time, raising DeadlineExceeded so the circuit breaker does not
+    count it against mrivals.gg.
+    """
+    page_load_timeout = PAGE_LOAD_TIMEOUT
+    if deadline:
+        if deadline.expired:
+            deadline.skip("profile")
+            raise DeadlineExceeded(f"no time left to load {profile_url}")
+        page_load_timeout = deadline.cap(PAGE_LOAD_TIMEOUT)
     try:
-        # Special handling for One Above All and Eternity
-        if rank_str.lower() == "one above all":
-            return "one above all", 0
-        elif rank_str.lower() == "eternity":
-            return "eternity", 0
-
-        parts = rank_str.lower().split()
-        if len(parts) >= 2:
-            tier = parts[0]
-            # Convert roman numerals to numbers
-            number_str = parts[1].upper()
-            number_map = {'I': 1, 'II': 2, 'III': 3}
-            number = number_map.get(number_str, 999)
-            return tier, number
-    except:
-        pass
-    return "unknown", 999  # Return unknown with high number to sort at bottom
-
-
-def get_player_data(driver, username):
-    """Get player data using Selenium"""
+        if page_load_timeout < PAGE_LOAD_TIMEOUT:
+            driver.set_page_load_timeout(max(page_load_timeout, 0.1))
+        try:
+            driver.get(profile_url)
+        finally:
+            if page_load_timeout < PAGE_LOAD_TIMEOUT:
+                driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    except WebDriverException as e:
+        if deadline and deadline.expired:
+            deadline.skip("profile")
+            raise DeadlineExceeded(f"ran out of time loading {profile_url}") from e
+        raise UpstreamError(f"Could not load {profile_url}: {e.msg}") from e
+
+
+def wait_for_sections(driver, username, sections, deadline=None):
+    """Block until the given profile sections have rendered
+
+    Returns the readiness script's result (per-section timings in ms and
+    any sections still missing), or None if the script failed. With a
+    deadline the wait ends when the command runs out of time, and the
+    sections still missing then are recorded as skipped.
+    """
+    timeout = deadline.cap(SELENIUM_TIMEOUT) if deadline else SELENIUM_TIMEOUT
+    try:
+        readiness = driver.execute_async_script(
+            selenium_async_script(WAIT_FOR_SECTIONS_SCRIPT),
+            sections_args(sections, timeout))
+    except WebDriverException as e:
+        logger.warning(f"Readiness check failed for {username}: {e.msg}")
+        return None
+    logger.debug(
+        f"Sections for {username} after {readiness['elapsed']}ms: "
+        f"{readiness['timings']}, missing {readiness['missing']}")
+    if deadline and readiness['missing'] and timeout < SELENIUM_TIMEOUT:
+        deadline.skip(*readiness['missing'])
+    return readiness
+
+
+def capture_profile(driver, username):
+    """Queue the loaded profile page for the background capture writer"""
     try:
-        # Navigate to the player profile page
-        profile_url = f'https://mrivals.gg/player/{username}'
-        driver.get(profile_url)
+        capture_writer.submit(
+            username, driver.page_source,
+            driver.execute_script(f"return ({EXTRACT_JSONLD_SCRIPT})();"))
+    except WebDriverException as e:
+        logger.error(f"Failed to capture profile for {username}: {str(e)}")
+
+
+def get_player_data(driver, username, known_match_keys=frozenset(),
+                    deadline=None):
+    """Get player data using Selenium
+
+    Match cards are read newest first and reading stops at the first match
+    in `known_match_keys`. Returns None as the player data when the
+    profile does not exist, see profile_exists, and raises UpstreamError
+    when mrivals.gg could not be loaded or answered with an error.
+
+    With a deadline, each extraction stage only starts while there is time
+    left; once it runs out, what was already extracted is returned and the
+    remaining stages are recorded as skipped on the deadline. Raises
+    DeadlineExceeded if it runs out before the player entity was read.
+    """
+    # Navigate to the player profile page
+    profile_url = f'{MRIVALS_BASE_URL}/player/{username}'
+    load_profile_page(driver, profile_url, deadline)
+
+    # Wait until stats, hero and match cards have rendered too, so
+    # extraction never reads a half-rendered page
+    readiness = wait_for_sections(driver, username, PROFILE_SECTIONS,
+                                  deadline)
+    if not profile_exists(readiness, profile_url, deadline):
+        return None, [], dict(UNKNOWN_STATS), []
+
+    def out_of_time(*stages):
+        if deadline and deadline.expired:
+            deadline.skip(*stages)
+            return True
+        return False
 
-        # Wait for the content to load with a shorter timeout
-        wait = WebDriverWait(driver,
-                             SELENIUM_TIMEOUT)  # Reduced from 3 to 2 seconds
+    try:
 
         try:
-            # Wait for the JSON-LD script tag directly
-            script_elements = wait.until(
-                EC.presence_of_all_elements_located(
-                    (By.CSS_SELECTOR, "script[type='application/ld+json']")))
+            script_elements = driver.find_elements(
+                By.CSS_SELECTOR, "script[type='application/ld+json']")
 
             # Find the player data script
             player_data = None
@@ -182,17 +475,13 @@ def get_player_data(driver, username):
                     continue
 
             if player_data and "mainEntity" in player_data:
-                # Dump HTML if enabled - moved here after content is loaded
-                if DUMP_HTML:
-                    try:
-                        with open('page_source.html', 'w',
-                                  encoding='utf-8') as f:
-                            f.write(driver.page_source)
-                        logger.debug(
-                            f"HTML source saved to page_source.html for player {username}"
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to save HTML source: {str(e)}")
+                # Capture the page if enabled - after content is loaded
+                if capture_writer:
+                    capture_profile(driver, username)
+
+                if out_of_time("stats", "heroes", "matches"):
+                    return player_data["mainEntity"], [], dict(
+                        UNKNOWN_STATS), []
 
                 # Extract stats from HTML
                 try:
@@ -277,6 +566,9 @@ def get_player_data(driver, username):
                     print(f"Error extracting stats: {str(e)}")
                     # Keep the default values if extraction fails
 
+                if out_of_time("heroes", "matches"):
+                    return player_data["mainEntity"], [], stats, []
+
                 # Extract top heroes data with optimized selectors
                 top_heroes = []
                 try:
@@ -327,6 +619,9 @@ def get_player_data(driver, username):
                 except:
                     pass
 
+                if out_of_time("matches"):
+                    return player_data["mainEntity"], top_heroes, stats, []
+
                 # Extract recent matches data with optimized selectors
                 recent_matches = []
                 try:
@@ -356,15 +651,22 @@ def get_player_data(driver, username):
                                 except:
                                     continue
 
+                            details = match_element.find_element(
+                                By.CSS_SELECTOR,
+                                "p.text-xs.text-gray-400").text
+
+                            # Older matches are already in the history store
+                            if match_key(details,
+                                         match_stats) in known_match_keys:
+                                break
+
                             recent_matches.append({
                                 "result":
                                 "Victory" if is_win else "Defeat",
                                 "is_win":
                                 is_win,
                                 "details":
-                                match_element.find_element(
-                                    By.CSS_SELECTOR,
-                                    "p.text-xs.text-gray-400").text,
+                                details,
                                 "stats":
                                 match_stats
                             })
@@ -377,45 +679,63 @@ def get_player_data(driver, username):
                     "mainEntity"], top_heroes, stats, recent_matches
 
         except Exception as e:
-            return None, [], {
-                "time_played": "Unknown",
-                "total_matches": "Unknown",
-                "wins": "Unknown",
-                "losses": "Unknown"
-            }, []
+            raise UpstreamError(
+                f"Could not read player data on {profile_url}: {str(e)}") from e
 
     except Exception as e:
-        return None, [], {
-            "time_played": "Unknown",
-            "total_matches": "Unknown",
-            "wins": "Unknown",
-            "losses": "Unknown"
-        }, []
+        raise UpstreamError(
+            f"Could not read player data on {profile_url}: {str(e)}") from e
+
+    # The player entity rendered but could not be read
+    raise UpstreamError(f"Could not read player data on {profile_url}")
 
 
-async def get_player_data_async(driver, username):
+async def get_player_data_async(driver, username,
+                                known_match_keys=frozenset(), deadline=None):
     """Async wrapper for get_player_data"""
+    if async_engine:
+        return await async_engine.get_player_data(
+            driver, username, known_match_keys, deadline)
     loop = asyncio.get_event_loop()
     return await loop.run_in_executor(selenium_pool, get_player_data, driver,
-                                      username)
+                                      username, known_match_keys, deadline)
 
 
-def get_player_data_for_top(driver, username):
-    """Get player data specifically for top command using an existing driver"""
-    try:
-        # Navigate to the player profile page
-        profile_url = f'https://mrivals.gg/player/{username}'
-        driver.get(profile_url)
+def get_player_data_for_top(driver, username, heroes=False):
+    """Get player data specifically for top command using an existing driver
+
+    With `heroes`, used by roster refreshes, the top hero cards are read
+    too and returned under "heroes". Raises UpstreamError when mrivals.gg
+    could not be loaded or answered with an error.
+    """
+    # Navigate to the player profile page
+    profile_url = f'{MRIVALS_BASE_URL}/player/{username}'
+    load_profile_page(driver, profile_url)
+
+    # Wait for the player JSON-LD, and the hero cards if they are wanted
+    readiness = wait_for_sections(
+        driver, username, ("jsonld", "heroes") if heroes else ("jsonld", ))
+    if not profile_exists(readiness, profile_url):
+        return {"name": username, "rank": "Unknown", "win_rate": "Unknown"}
 
-        # Wait for the content to load with a shorter timeout
-        wait = WebDriverWait(driver,
-                             SELENIUM_TIMEOUT)  # Reduced from 3 to 2 seconds
+    if heroes:
+        try:
+            raw = driver.execute_script(f"return ({EXTRACT_PLAYER_SCRIPT})();")
+        except WebDriverException as e:
+            raise UpstreamError(
+                f"Could not read player data on {profile_url}: {e.msg}") from e
+        player_data = find_player_entity(raw["jsonld"])
+        if not player_data:
+            raise UpstreamError(f"Could not read player data on {profile_url}")
+        if capture_writer:
+            capture_profile(driver, username)
+        return build_top_data(player_data, username, build_hero_cards(raw))
+
+    try:
 
         try:
-            # Wait for the JSON-LD script tag directly
-            script_elements = wait.until(
-                EC.presence_of_all_elements_located(
-                    (By.CSS_SELECTOR, "script[type='application/ld+json']")))
+            script_elements = driver.find_elements(
+                By.CSS_SELECTOR, "script[type='application/ld+json']")
 
             # Find the player data script
             player_data = None
@@ -429,6 +749,9 @@ def get_player_data_for_top(driver, username):
                     continue
 
             if player_data and "mainEntity" in player_data:
+                if capture_writer:
+                    capture_profile(driver, username)
+
                 # Extract rank and win rate
                 rank_value = "Unknown"
                 win_rate = "Unknown"
@@ -442,7 +765,7 @@ def get_player_data_for_top(driver, username):
                         win_rate = prop.get("value", "Unknown")
 
                 # If we get Unranked and 0% win rate, show as Private Profile
-                if rank_value == "Unranked" and win_rate == "0%":
+                if is_private_profile(rank_value, win_rate):
                     return {
                         "name":
                         username,  # Use the provided username for private profiles
@@ -458,33 +781,944 @@ def get_player_data_for_top(driver, username):
                 }
 
         except Exception as e:
-            return {
-                "name":
-                username,  # Return the provided username when data can't be fetched
-                "rank": "Unknown",
-                "win_rate": "Unknown"
-            }
+            raise UpstreamError(
+                f"Could not read player data on {profile_url}: {str(e)}") from e
 
     except Exception as e:
-        return {
-            "name":
-            username,  # Return the provided username when data can't be fetched
-            "rank": "Unknown",
-            "win_rate": "Unknown"
-        }
-
-    return {
-        "name": username,  # Return the provided username as a last resort
-        "rank": "Unknown",
-        "win_rate": "Unknown"
-    }
+        raise UpstreamError(
+            f"Could not read player data on {profile_url}: {str(e)}") from e
+
+    # The player entity rendered but could not be read
+    raise UpstreamError(f"Could not read player data on {profile_url}")
+
+
+def get_player_summary(driver, username, deadline=None):
+    """Get only the JSON-LD player entity, in get_player_data's shape
+
+    Used while the bot is degraded: heroes, stats and match cards are
+    skipped. Raises UpstreamError when mrivals.gg could not be loaded or
+    answered with an error, and DeadlineExceeded when the deadline ran
+    out first.
+    """
+    profile_url = f'{MRIVALS_BASE_URL}/player/{username}'
+    load_profile_page(driver, profile_url, deadline)
+    readiness = wait_for_sections(driver, username, ("jsonld", ), deadline)
+    if not profile_exists(readiness, profile_url, deadline):
+        return None, [], dict(UNKNOWN_STATS), []
+    try:
+        script_elements = driver.find_elements(
+            By.CSS_SELECTOR, "script[type='application/ld+json']")
+        player_data = find_player_entity(
+            [script.get_attribute("innerHTML") for script in script_elements])
+    except WebDriverException as e:
+        raise UpstreamError(
+            f"Could not read player data on {profile_url}: {e.msg}") from e
+    if not player_data:
+        raise UpstreamError(f"Could not read player data on {profile_url}")
+    if capture_writer:
+        capture_profile(driver, username)
+    return player_data["mainEntity"], [], dict(UNKNOWN_STATS), []
+
+
+async def get_player_summary_async(driver, username, deadline=None):
+    """Async wrapper for get_player_summary"""
+    if async_engine:
+        return await async_engine.get_player_summary(driver, username,
+                                                     deadline)
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(selenium_pool, get_player_summary,
+                                      driver, username, deadline)
 
 
-async def get_player_data_for_top_async(driver, username):
+async def get_player_data_for_top_async(driver, username, heroes=False):
     """Async wrapper for get_player_data_for_top"""
+    if async_engine:
+        return await async_engine.get_player_data_for_top(
+            driver, username, heroes)
     loop = asyncio.get_event_loop()
     return await loop.run_in_executor(selenium_pool, get_player_data_for_top,
-                                      driver, username)
+                                      driver, username, heroes)
+
+
+def create_driver():
+    """Create a headless Chrome driver configured for scraping"""
+    # Set up Chrome options for maximum performance
+    chrome_options = Options()
+    chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--disable-infobars')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_argument('--disable-web-security')
+    chrome_options.add_argument('--disable-logging')
+    chrome_options.add_argument('--log-level=3')
+    chrome_options.add_argument('--disable-images')  # Disable image loading
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    try:
+        if os.getenv('RENDER'):
+            logger.info("Running in Render.com environment")
+
+            # Check for Chrome binary in multiple locations
+            possible_chrome_paths = [
+                os.getenv('CHROME_BINARY', '/usr/bin/google-chrome-stable'),
+                '/usr/bin/google-chrome-stable',
+                '/usr/bin/google-chrome',
+                '/usr/bin/chromium-browser'
+            ]
+
+            chrome_binary = None
+            for path in possible_chrome_paths:
+                if os.path.exists(path):
+                    chrome_binary = path
+                    logger.info(f"Found Chrome binary at: {path}")
+                    break
+
+            if not chrome_binary:
+                raise FileNotFoundError("Chrome binary not found in any standard location")
+
+            # Check for ChromeDriver
+            chromedriver_path = os.getenv('CHROMEDRIVER_PATH', '/usr/local/bin/chromedriver')
+            if not os.path.exists(chromedriver_path):
+                raise FileNotFoundError(f"ChromeDriver not found at {chromedriver_path}")
+
+            # Test Chrome and ChromeDriver
+            try:
+                import subprocess
+                chrome_version = subprocess.check_output([chrome_binary, '--version'], stderr=subprocess.PIPE).decode().strip()
+                logger.info(f"Chrome version: {chrome_version}")
+
+                chromedriver_version = subprocess.check_output([chromedriver_path, '--version'], stderr=subprocess.PIPE).decode().strip()
+                logger.info(f"ChromeDriver version: {chromedriver_version}")
+            except Exception as e:
+                logger.error(f"Failed to get versions: {str(e)}")
+
+            chrome_options.binary_location = chrome_binary
+            service = Service(executable_path=chromedriver_path)
+        else:
+            # Local Windows configuration
+            chrome_binary_path = "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
+            if os.path.exists(chrome_binary_path):
+                chrome_options.binary_location = chrome_binary_path
+            else:
+                chrome_binary_path = "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe"
+                if os.path.exists(chrome_binary_path):
+                    chrome_options.binary_location = chrome_binary_path
+                else:
+                    raise Exception("Chrome browser not found. Please install Google Chrome.")
+            service = Service(ChromeDriverManager().install())
+
+        logger.info("Chrome configuration completed successfully")
+    except Exception as e:
+        logger.error(f"Chrome setup failed: {str(e)}")
+        raise
+
+    # Start from a leased profile so the cache from earlier drivers is reused
+    profile_dir = profile_pool.acquire() if profile_pool else None
+    if profile_dir:
+        for argument in profile_pool.chrome_arguments(profile_dir):
+            chrome_options.add_argument(argument)
+
+    # Initialize the Chrome WebDriver
+    try:
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception:
+        if profile_dir:
+            profile_pool.release(profile_dir)
+        raise
+    driver.profile_dir = profile_dir
+    driver.browser_pid = driver.service.process.pid
+    browser_supervisor.register(driver.browser_pid, "chromedriver")
+    try:
+        driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+        # The readiness script resolves itself after SELENIUM_TIMEOUT
+        driver.set_script_timeout(SELENIUM_TIMEOUT + 5)
+
+        # Set user agent
+        driver.execute_cdp_cmd('Network.setUserAgentOverride',
+                               {"userAgent": USER_AGENT})
+    except Exception:
+        quit_driver(driver)
+        raise
+    return driver
+
+
+async def create_driver_async(deadline=None):
+    """Async wrapper for create_driver
+
+    With an async engine this returns that engine's session instead. With a
+    deadline, raises DeadlineExceeded if the driver is not ready in time;
+    a driver that starts after that is quit as soon as it is ready.
+    """
+    if async_engine:
+        spawn = asyncio.ensure_future(async_engine.new_session())
+    else:
+        loop = asyncio.get_event_loop()
+        spawn = loop.run_in_executor(selenium_pool, create_driver)
+    if deadline is None:
+        return await spawn
+    try:
+        return await deadline.wait(asyncio.shield(spawn))
+    except DeadlineExceeded:
+        deadline.skip("profile")
+
+        def quit_late_driver(future):
+            if not future.cancelled() and future.exception() is None:
+                asyncio.ensure_future(quit_driver_async(future.result()))
+
+        spawn.add_done_callback(quit_late_driver)
+        raise
+
+
+def quit_driver(driver):
+    """Quit a driver and hand its profile back to the pool
+
+    If quitting fails, chromedriver and Chrome are killed instead.
+    """
+    browser_pid = getattr(driver, 'browser_pid', None)
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"Failed to quit driver, killing its processes: {str(e)}")
+        if browser_pid:
+            browser_supervisor.kill(browser_pid)
+    finally:
+        if browser_pid:
+            browser_supervisor.release(browser_pid)
+        # Chrome has exited, so the next driver may use the profile
+        if getattr(driver, 'profile_dir', None):
+            profile_pool.release(driver.profile_dir)
+
+
+async def quit_driver_async(driver):
+    """Quit a driver in the thread pool, ignoring errors"""
+    if async_engine:
+        await async_engine.close_session(driver)
+        return
+    loop = asyncio.get_event_loop()
+    try:
+        await loop.run_in_executor(selenium_pool, quit_driver, driver)
+    except Exception as e:
+        logger.debug(f"Failed to quit driver: {str(e)}")
+
+
+def negative_result_message(outcome, encoded_username, suggestions=()):
+    """Build the reply for a profile that is missing or private"""
+    if outcome == PRIVATE:
+        return f"🔒 This profile is private. You can view it at: https://mrivals.gg/player/{encoded_username}"
+    message = f"Could not find player data. You can view the profile at: https://mrivals.gg/player/{encoded_username}"
+    if suggestions:
+        names = ", ".join(f"**{name}**" for name in suggestions)
+        message += f"\nDid you mean: {names}?"
+    return message
+
+
+async def remember_username(username):
+    """Add a resolved username to the index and log it off the loop"""
+    if username_index.add(username):
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(None, username_index.append, username)
+        except Exception as e:
+            logger.error(f"Failed to save username index: {str(e)}")
+
+
+async def remember_heroes(player_name, top_heroes):
+    """Update a player's heroes in the hero index and persist it off the loop"""
+    if hero_index.update(player_name, top_heroes):
+        data = hero_index.to_json()
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(None, hero_index.save, data)
+        except Exception as e:
+            logger.error(f"Failed to save hero index: {str(e)}")
+
+
+def queue_full_message(error):
+    """Build the reply for a lookup refused by admission control"""
+    return f"⏳ The bot is busy right now: {error}. Please try again in {error.retry_after}s."
+
+
+def status_updater(edit):
+    """Wrap a message edit coroutine as a loading-status callback
+
+    Used to show the queue position and to switch back to the loading
+    text once the job starts. Failed edits are ignored.
+    """
+
+    async def update(text):
+        try:
+            await edit(content=text)
+        except discord.HTTPException as e:
+            logger.debug(f"Failed to update status message: {str(e)}")
+
+    return update
+
+
+def queue_callbacks(status, loading_text):
+    """Return (on_queued, on_started) for the scheduler from a status callback"""
+    if status is None:
+        return None, None
+
+    async def on_queued(position):
+        await status(f"⏳ Queued, position {position}...")
+
+    async def on_started():
+        await status(loading_text)
+
+    return on_queued, on_started
+
+
+def deadline_message(deadline):
+    """Build the reply for a lookup that ran out of time with nothing to show"""
+    return f"⏱️ MRivals.gg did not answer within {deadline.seconds:g}s. Please try again shortly."
+
+
+def upstream_unavailable_message():
+    """Build the reply for when mrivals.gg is not responding"""
+    retry_after = mrivals_breaker.retry_after()
+    if retry_after:
+        return f"⚠️ MRivals.gg is not responding right now. Please try again in {retry_after}s."
+    return "⚠️ MRivals.gg is not responding right now. Please try again shortly."
+
+
+async def fetch_profile(username, user_id=None, guild_id=None, status=None,
+                        loading_text="🔍 Fetching player data...", mode=FULL,
+                        deadline=None):
+    """Fetch a full profile through the circuit breaker and match history
+
+    Only matches newer than the stored history are scraped; the recent
+    matches returned are read back from the history store. Returns
+    (snapshot, stale_minutes, queue_wait), where snapshot is a
+    PlayerSnapshot, with an Unknown rank if the player does not exist, or
+    None if mrivals.gg is down and no snapshot exists. stale_minutes is None
+    for fresh data and queue_wait is the time spent waiting for a browser
+    slot. Raises QueueFull if the lookup is refused by admission control.
+
+    Degraded service modes scrape only the JSON-LD summary (summary),
+    answer from a snapshot before scraping (stale) or never scrape at all
+    (cache_only).
+
+    With a deadline, the wait for a browser slot, the driver spawn and each
+    scraping stage are bounded by it. A profile cut short is returned with
+    whatever was extracted, and one never loaded falls back to the
+    snapshot; either way the deadline records what was skipped.
+    """
+    loop = asyncio.get_event_loop()
+    started_at = time.monotonic()
+    result = None
+    queue_wait = 0.0
+
+    if mode in (STALE, CACHE_ONLY):
+        snapshot = rank_snapshots.get(username)
+        if snapshot:
+            service_mode.record_latency(time.monotonic() - started_at)
+            return snapshot[0], rank_snapshots.age_minutes(username), 0.0
+        if mode == CACHE_ONLY:
+            raise QueueFull("only cached results are being served",
+                            service_mode.recovery_period)
+
+    if mrivals_breaker.allow_request():
+        known_match_keys = await loop.run_in_executor(
+            None, match_store.known_keys, username)
+        on_queued, on_started = queue_callbacks(status, loading_text)
+        slot = browser_scheduler.admit(INTERACTIVE, user_id, guild_id)
+        try:
+            async with browser_scheduler.run(
+                    slot, on_queued, on_started,
+                    deadline.remaining() if deadline else None) as slot:
+                queue_wait = slot.wait_time
+                driver = await create_driver_async(deadline)
+                try:
+                    if mode == FULL:
+                        result = await get_player_data_async(
+                            driver, username, known_match_keys, deadline)
+                    else:
+                        result = await get_player_summary_async(
+                            driver, username, deadline)
+                    mrivals_breaker.record_success()
+                except UpstreamError as e:
+                    logger.warning(
+                        f"MRivals.gg unavailable for {username}: {str(e)}")
+                    mrivals_breaker.record_failure()
+                finally:
+                    await quit_driver_async(driver)
+        except (asyncio.TimeoutError, DeadlineExceeded) as e:
+            if deadline is None:
+                raise
+            logger.warning(f"Lookup of {username} ran out of time: {str(e)}")
+            deadline.skip("profile")
+        service_mode.record_latency(time.monotonic() - started_at)
+
+    if result is None:
+        snapshot = rank_snapshots.get(username)
+        if not snapshot:
+            return None, None, queue_wait
+        return snapshot[0], rank_snapshots.age_minutes(username), queue_wait
+
+    player_data, top_heroes, stats, recent_matches = result
+    if not player_data:
+        return PlayerSnapshot(username), None, queue_wait
+    try:
+        await loop.run_in_executor(None, match_store.ingest, username,
+                                   recent_matches)
+        recent_matches = await loop.run_in_executor(
+            None, match_store.recent_matches, username, 10)
+    except Exception as e:
+        logger.error(f"Failed to update match history: {str(e)}")
+    # Parse every number once, here, rather than on each render
+    return PlayerSnapshot.from_profile(player_data, top_heroes, stats,
+                                       recent_matches, username), None, queue_wait
+
+
+async def fetch_top_player(driver, username, heroes=False):
+    """Fetch one roster player for !top using the caches and circuit breaker
+
+    With `heroes`, the player's hero cards are read too and fed to the hero
+    index. Returns None if the player could not be fetched and no snapshot
+    exists.
+    """
+    cached_outcome = negative_cache.get(username)
+    if cached_outcome == PRIVATE:
+        return PlayerSnapshot(username, PRIVATE_PROFILE)
+    if cached_outcome == NOT_FOUND:
+        return None
+
+    if driver and not mrivals_breaker.is_open():
+        try:
+            stats = PlayerSnapshot.from_top_data(
+                await get_player_data_for_top_async(driver, username, heroes))
+            mrivals_breaker.record_success()
+            if stats.private:
+                negative_cache.add(username, PRIVATE)
+            elif not stats.known:
+                negative_cache.add(username, NOT_FOUND)
+            else:
+                top_snapshots.put(username, stats)
+                await remember_username(stats.name)
+                if stats.heroes:
+                    await remember_heroes(stats.name, stats.heroes)
+            return stats
+        except UpstreamError as e:
+            logger.warning(f"MRivals.gg unavailable for {username}: {str(e)}")
+            mrivals_breaker.record_failure()
+
+    # Serve the last good snapshot while mrivals.gg is down
+    snapshot = top_snapshots.get(username)
+    if snapshot:
+        return snapshot[0].with_age(top_snapshots.age_minutes(username))
+    return None
+
+
+async def scrape_players(slot, usernames, on_queued=None, on_started=None,
+                         on_player=None, heroes=False):
+    """Fetch several players one after another with a single driver
+
+    Holds an admitted low-priority browser slot and offers it to waiting
+    interactive lookups between players. Returns their stats in the order
+    given, with Unknown entries for players that could not be fetched.
+    `on_player(username, stats)` is called as each player arrives. With
+    `heroes`, hero cards are read too, see fetch_top_player.
+    """
+    async with browser_scheduler.run(slot, on_queued, on_started):
+        driver = None
+
+        async def park_driver():
+            # Quit Chrome before handing the slot over, so jobs waiting to
+            # resume never keep more browsers open than there are slots
+            nonlocal driver
+            if driver:
+                await quit_driver_async(driver)
+                driver = None
+
+        try:
+            # Only start Chrome if mrivals.gg is reachable
+            if mrivals_breaker.allow_request():
+                driver = await create_driver_async()
+
+            # Get data for all players using the same driver
+            player_stats = []
+            for i, username in enumerate(usernames, 1):
+                stats = await fetch_top_player(driver, username, heroes)
+                # Use the username as given if it could not be fetched
+                stats = stats or PlayerSnapshot(username)
+                player_stats.append(stats)
+                if on_player:
+                    on_player(username, stats)
+                if (await slot.checkpoint(park_driver) and i < len(usernames)
+                        and mrivals_breaker.allow_request()):
+                    driver = await create_driver_async()
+        finally:
+            if driver:
+                # Quit the driver in the thread pool
+                await quit_driver_async(driver)
+    return player_stats
+
+
+async def collect_top_players(slot, on_queued=None, on_started=None):
+    """Fetch every roster player with one driver into the sorted board
+
+    Their hero cards are read too, keeping the hero index current. Returns
+    (player_stats, queue_wait).
+    """
+    await scrape_players(slot, TOP_PLAYERS, on_queued, on_started,
+                         top_board.update, heroes=True)
+    if slot.preemptions:
+        logger.info(
+            f"Roster scrape yielded to interactive lookups {slot.preemptions} times")
+    # Each player was moved into place as it arrived, nothing to sort
+    return top_board.players(), slot.wait_time
+
+
+async def refresh_top_players(slot, on_queued=None, on_started=None):
+    """Recompute the roster ranking and store it in the top cache"""
+    player_stats, queue_wait = await collect_top_players(
+        slot, on_queued, on_started)
+    top_cache["player_stats"] = player_stats
+    top_cache["computed_at"] = time.time()
+    top_cache["queue_wait"] = queue_wait
+    return player_stats, top_cache["computed_at"]
+
+
+async def get_top_players(max_age=TOP_CACHE_TTL, priority=BULK, user_id=None,
+                          guild_id=None, status=None):
+    """Return (player_stats, computed_at), reusing a recent ranking
+
+    Concurrent callers share a single refresh instead of each scraping
+    the roster; only the caller that starts it goes through admission
+    control and sees its queue position.
+    """
+    mode = service_mode.mode
+    if mode in (STALE, CACHE_ONLY):
+        # Any ranking we have beats a new roster scrape while degraded
+        max_age = float('inf')
+    if (top_cache["player_stats"] is not None
+            and time.time() - top_cache["computed_at"] < max_age):
+        return top_cache["player_stats"], top_cache["computed_at"]
+    if mode == CACHE_ONLY and priority != BACKGROUND:
+        raise QueueFull("only cached results are being served",
+                        service_mode.recovery_period)
+
+    if top_cache["task"] is None or top_cache["task"].done():
+        slot = browser_scheduler.admit(priority, user_id, guild_id)
+        on_queued, on_started = queue_callbacks(
+            status, "🔍 Fetching top players data...")
+        top_cache["task"] = asyncio.ensure_future(
+            refresh_top_players(slot, on_queued, on_started))
+    # Shield the shared refresh so one cancelled command doesn't stop it
+    return await asyncio.shield(top_cache["task"])
+
+
+def parse_username_list(text):
+    """Split pasted usernames on commas and new lines, dropping repeats"""
+    usernames = {}
+    for part in text.replace('\n', ',').split(','):
+        name = part.strip()
+        if name:
+            name = username_index.resolve(name) or name
+            usernames.setdefault(normalize_username(name), name)
+    return list(usernames.values())
+
+
+async def bulk_lookup(usernames, user_id=None, guild_id=None, status=None):
+    """Fetch a list of players as one batch and sort them like !top
+
+    The names are spread over as many drivers as bulk work may use at
+    once, each starting Chrome once for its whole share. The lookup goes
+    through admission control once, as a single job for the caller and
+    their guild, and its batches are admitted without owners. Returns
+    (player_stats, queue_wait) and raises QueueFull if it is refused.
+    """
+    if service_mode.mode == CACHE_ONLY:
+        # Snapshots only, no browser at all
+        player_stats = []
+        for username in usernames:
+            player_stats.append(await fetch_top_player(None, username)
+                                or PlayerSnapshot(username))
+        player_stats.sort(key=sort_key)
+        return player_stats, 0.0
+
+    workers = min(len(usernames),
+                  browser_scheduler.capacity - browser_scheduler.reserved_interactive)
+    on_queued, on_started = queue_callbacks(status,
+                                            "🔍 Fetching player data...")
+    with browser_scheduler.owner_job(user_id, guild_id):
+        slots = [browser_scheduler.admit(BULK) for _ in range(workers)]
+        jobs = []
+        for i, slot in enumerate(slots):
+            # Only the first batch reports its queue position
+            callbacks = (on_queued, on_started) if i == 0 else (None, None)
+            jobs.append(
+                scrape_players(slot, usernames[i::len(slots)], *callbacks))
+        batches = await asyncio.gather(*jobs)
+    player_stats = [stats for batch in batches for stats in batch]
+    player_stats.sort(key=sort_key)
+    return player_stats, max(slot.wait_time for slot in slots)
+
+
+def format_ranks_table(player_stats):
+    """Render bulk lookup results as fixed-width table lines"""
+    name_width = min(20, max(len("Player"),
+                             max(len(player.name) for player in player_stats)))
+    rank_width = max(len("Rank"), max(len(player.rank) for player in player_stats))
+    lines = [f"{'#':>3} {'Player':<{name_width}} {'Rank':<{rank_width}} Win Rate"]
+    for i, player in enumerate(player_stats, 1):
+        name = player.name[:name_width]
+        line = (f"{i:>3} {name:<{name_width}} "
+                f"{player.rank:<{rank_width}} {player.win_rate_text}")
+        if player.stale_minutes is not None:
+            line += " *"
+        lines.append(line)
+    return lines
+
+
+def build_ranks_csv(player_stats):
+    """Bulk lookup results as CSV bytes"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["position", "name", "rank", "win_rate", "data_age_minutes"])
+    for i, player in enumerate(player_stats, 1):
+        writer.writerow([
+            i, player.name, player.rank, player.win_rate_text,
+            "" if player.stale_minutes is None else player.stale_minutes
+        ])
+    return output.getvalue().encode('utf-8')
+
+
+def build_top_embed(player_stats, deltas=None, start=1):
+    """Build the leaderboard embed, optionally with rank movements
+
+    `start` is the position of the first player, for later pages.
+    """
+    embed = discord.Embed(title="🏆 Top Players", color=discord.Color.blue())
+
+    # Add players to embed
+    for i, player in enumerate(player_stats, start):
+        # Get player emoji or rank emoji
+        player_emoji = PLAYER_EMOJIS.get(player.name)
+        if not player_emoji:
+            player_emoji = RANK_EMOJIS.get(player.tier, "🎮")
+
+        # Create player value
+        player_value = f"Rank: {player.rank}\n"
+        player_value += f"Win Rate: {player.win_rate_text}"
+        if player.stale_minutes is not None:
+            player_value += f"\nData from {player.stale_minutes} minutes ago"
+
+        # Add player as a field with emoji and rank movement
+        field_name = f"#{i} {player_emoji} {player.name}"
+        if deltas is not None:
+            movement = format_delta(deltas.get(player.name))
+            if movement:
+                field_name += f" {movement}"
+        embed.add_field(name=field_name, value=player_value, inline=False)
+
+    return embed
+
+
+async def update_leaderboard(guild_id, entry, player_stats):
+    """Edit a guild's pinned leaderboard, only if its content changed
+
+    Returns True if a message was sent or edited.
+    """
+    channel = bot.get_channel(entry["channel_id"])
+    if channel is None:
+        logger.warning(
+            f"Leaderboard channel {entry['channel_id']} not found for guild {guild_id}")
+        return False
+
+    positions, deltas = rank_deltas(entry, player_stats)
+    embed = build_top_embed(player_stats[:MAX_EMBED_FIELDS], deltas)
+    embed.timestamp = discord.utils.utcnow()
+    embed.set_footer(
+        text=f"Data from MRivals.gg • Updates every {LEADERBOARD_INTERVAL} minutes")
+
+    new_hash = content_hash(embed.to_dict())
+    if entry["message_id"] and new_hash == entry["content_hash"]:
+        return False
+
+    message = None
+    if entry["message_id"]:
+        try:
+            message = await channel.get_partial_message(
+                entry["message_id"]).edit(embed=embed)
+        except discord.NotFound:
+            message = None
+    if message is None:
+        message = await channel.send(embed=embed)
+        try:
+            await message.pin()
+        except discord.Forbidden:
+            logger.warning(
+                f"Bot missing 'Manage Messages' permission to pin the leaderboard in guild {guild_id}")
+
+    leaderboard_channels.record_post(guild_id, message.id, new_hash,
+                                     positions)
+    return True
+
+
+async def save_leaderboard_channels():
+    """Persist leaderboard channel settings off the event loop"""
+    data = leaderboard_channels.to_json()
+    loop = asyncio.get_event_loop()
+    try:
+        await loop.run_in_executor(None, leaderboard_channels.save, data)
+    except Exception as e:
+        logger.error(f"Failed to save leaderboard channels: {str(e)}")
+
+
+@tasks.loop(minutes=LEADERBOARD_INTERVAL)
+async def refresh_leaderboards():
+    """Recompute the ranking and update every leaderboard channel"""
+    if not leaderboard_channels.items():
+        return
+
+    # tasks.Loop stops for good on an exception, so skip this cycle instead
+    try:
+        player_stats, _ = await get_top_players(max_age=60,
+                                                priority=BACKGROUND)
+    except Exception as e:
+        logger.error(f"Failed to refresh leaderboards: {str(e)}")
+        return
+    changed = False
+    for guild_id, entry in leaderboard_channels.items():
+        try:
+            changed = await update_leaderboard(guild_id, entry,
+                                               player_stats) or changed
+        except Exception as e:
+            logger.error(
+                f"Failed to update leaderboard for guild {guild_id}: {str(e)}")
+    if changed:
+        await save_leaderboard_channels()
+
+
+@refresh_leaderboards.before_loop
+async def before_refresh_leaderboards():
+    await bot.wait_until_ready()
+
+
+async def save_rank_watch():
+    """Persist watched ranks and announcement channels off the event loop"""
+    data = rank_watcher.to_json()
+    loop = asyncio.get_event_loop()
+    try:
+        await loop.run_in_executor(None, rank_watcher.save, data)
+    except Exception as e:
+        logger.error(f"Failed to save rank watch state: {str(e)}")
+
+
+async def poll_player(driver, username):
+    """Scrape a watched player, storing new matches and updating the caches
+
+    Returns (snapshot, new match count), or None if mrivals.gg failed.
+    """
+    loop = asyncio.get_event_loop()
+    known_match_keys = await loop.run_in_executor(None, match_store.known_keys,
+                                                  username)
+    try:
+        player_data, top_heroes, stats, recent_matches = await get_player_data_async(
+            driver, username, known_match_keys)
+        mrivals_breaker.record_success()
+    except UpstreamError as e:
+        logger.warning(f"MRivals.gg unavailable for {username}: {str(e)}")
+        mrivals_breaker.record_failure()
+        return None
+    if not player_data:
+        return PlayerSnapshot(username), 0
+
+    new_matches = 0
+    try:
+        new_matches = await loop.run_in_executor(None, match_store.ingest,
+                                                 username, recent_matches)
+        recent_matches = await loop.run_in_executor(
+            None, match_store.recent_matches, username, 10)
+    except Exception as e:
+        logger.error(f"Failed to update match history: {str(e)}")
+    snapshot = PlayerSnapshot.from_profile(player_data, top_heroes, stats,
+                                           recent_matches, username)
+    await record_profile(username, snapshot, None)
+    return snapshot, new_matches
+
+
+async def announce_rank_change(snapshot, old_rank):
+    """Post a rank change in every announcement channel"""
+    if rank_position(snapshot.rank) < rank_position(old_rank):
+        text = f"📈 **{snapshot.name}** ranked up from {old_rank} to **{snapshot.rank}**!"
+    else:
+        text = f"📉 **{snapshot.name}** dropped from {old_rank} to **{snapshot.rank}**."
+    for guild_id, channel_id in rank_watcher.channels():
+        channel = bot.get_channel(channel_id)
+        if channel is None:
+            continue
+        try:
+            await channel.send(text)
+        except discord.HTTPException as e:
+            logger.error(
+                f"Failed to announce rank change in guild {guild_id}: {str(e)}")
+
+
+async def poll_watched_players(usernames):
+    """Poll due players with one background driver and announce changes"""
+    if not mrivals_breaker.allow_request():
+        rank_watcher.defer(usernames, BREAKER_RESET_TIMEOUT)
+        return
+    try:
+        slot = browser_scheduler.admit(BACKGROUND)
+    except QueueFull as e:
+        rank_watcher.defer(usernames, e.retry_after)
+        return
+
+    changes = []
+    pending = list(usernames)
+    try:
+        async with browser_scheduler.run(slot):
+            driver = await create_driver_async()
+
+            async def park_driver():
+                # Quit Chrome before handing the slot over, see scrape_players
+                nonlocal driver
+                await quit_driver_async(driver)
+                driver = None
+
+            try:
+                while pending and not mrivals_breaker.is_open():
+                    username = pending.pop(0)
+                    try:
+                        result = await poll_player(driver, username)
+                    except Exception as e:
+                        # Keep the player on the schedule and move on
+                        logger.error(
+                            f"Rank watch poll failed for {username}: {str(e)}")
+                        result = None
+                    if result is None:
+                        rank_watcher.record_failure(username)
+                    else:
+                        snapshot, new_matches = result
+                        change = rank_watcher.record(username, snapshot.rank,
+                                                     new_matches > 0)
+                        if change:
+                            changes.append((snapshot, change[0]))
+                    if (await slot.checkpoint(park_driver) and pending
+                            and not mrivals_breaker.is_open()):
+                        driver = await create_driver_async()
+            finally:
+                if driver:
+                    await quit_driver_async(driver)
+    finally:
+        # Players that were never polled go back on the schedule
+        if pending:
+            rank_watcher.defer(pending, BREAKER_RESET_TIMEOUT)
+
+    for snapshot, old_rank in changes:
+        await announce_rank_change(snapshot, old_rank)
+    await save_rank_watch()
+
+
+async def watch_ranks():
+    """Poll roster players on the watcher's schedule, for as long as any
+    server wants rank changes announced"""
+    await bot.wait_until_ready()
+    while True:
+        wait = rank_watcher.seconds_until_next() if rank_watcher.channels() else None
+        # Wake at least once a minute to notice new announcement channels
+        await asyncio.sleep(60 if wait is None else min(wait, 60))
+        if not rank_watcher.channels():
+            continue
+        usernames = rank_watcher.take_due()
+        if not usernames:
+            continue
+        try:
+            await poll_watched_players(usernames)
+        except Exception as e:
+            logger.error(f"Rank watch poll failed: {str(e)}")
+
+
+@tasks.loop(seconds=5)
+async def evaluate_service_mode():
+    """Re-evaluate the service mode even while no commands come in"""
+    try:
+        service_mode.evaluate()
+    except Exception as e:
+        logger.error(f"Service mode evaluation failed: {str(e)}")
+
+
+@tasks.loop(seconds=BROWSER_SWEEP_INTERVAL)
+async def sweep_browsers():
+    """Kill browser processes that outlived their driver"""
+    loop = asyncio.get_event_loop()
+    try:
+        await loop.run_in_executor(None, browser_supervisor.sweep)
+    except Exception as e:
+        logger.error(f"Browser sweep failed: {str(e)}")
+
+
+async def shutdown(signal_name):
+    """Drain in-flight lookups, close every browser and log out
+
+    New browser jobs are refused straight away. Lookups already queued or
+    running get SHUTDOWN_TIMEOUT seconds to finish and quit their drivers;
+    whatever is still running after that is killed.
+    """
+    if browser_scheduler.closed:
+        return
+    logger.info(f"Received {signal_name}, draining in-flight commands")
+    browser_scheduler.close(SHUTDOWN_TIMEOUT + 30)
+    refresh_leaderboards.cancel()
+    evaluate_service_mode.cancel()
+    rank_watch_task = getattr(bot, 'rank_watch_task', None)
+    if rank_watch_task:
+        rank_watch_task.cancel()
+
+    drain_until = time.monotonic() + SHUTDOWN_TIMEOUT
+    while browser_scheduler.active_jobs() and time.monotonic() < drain_until:
+        await asyncio.sleep(0.2)
+    if browser_scheduler.active_jobs():
+        logger.warning(
+            f"{browser_scheduler.active_jobs()} browser jobs still running "
+            f"after {SHUTDOWN_TIMEOUT}s, killing their browsers")
+
+    if async_engine:
+        try:
+            await async_engine.close()
+        except Exception as e:
+            logger.error(f"Failed to close the scraping engine: {str(e)}")
+    sweep_browsers.cancel()
+    loop = asyncio.get_event_loop()
+    killed = await loop.run_in_executor(None, browser_supervisor.kill_all)
+    if killed:
+        logger.warning(f"Killed {killed} browser processes on shutdown")
+    selenium_pool.shutdown(wait=False, cancel_futures=True)
+    await bot.close()
+
+
+def on_sigterm():
+    # Keep a reference so the shutdown task is not garbage collected
+    bot.shutdown_task = asyncio.ensure_future(shutdown("SIGTERM"))
+
+
+# Event: Register slash commands once per process
+@bot.event
+async def setup_hook():
+    # Keep a reference so the heartbeat task is not garbage collected
+    bot.loop_watchdog_task = asyncio.create_task(loop_watchdog.run())
+    evaluate_service_mode.start()
+    if browser_supervisor.available:
+        sweep_browsers.start()
+    try:
+        # Render stops the container with SIGTERM
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM,
+                                                      on_sigterm)
+    except NotImplementedError:
+        # No signal handlers on the Windows event loop
+        pass
+    try:
+        synced = await bot.tree.sync()
+        logger.info(f"Synced {len(synced)} slash commands")
+    except Exception as e:
+        logger.error(f"Failed to sync slash commands: {str(e)}")
 
 
 # Event: Bot is ready
@@ -493,6 +1727,13 @@ async def on_ready():
     logger.info(f'{bot.user} has connected to Discord!')
     logger.info('------')
 
+    # Start the periodic leaderboard job once
+    if not refresh_leaderboards.is_running():
+        refresh_leaderboards.start()
+    # on_ready runs again after reconnects; keep a single watcher
+    if getattr(bot, 'rank_watch_task', None) is None:
+        bot.rank_watch_task = asyncio.create_task(watch_ranks())
+
     # Check bot permissions
     for guild in bot.guilds:
         permissions = guild.me.guild_permissions
@@ -525,273 +1766,330 @@ async def hello(ctx):
     await ctx.send(f'Hello {ctx.author.name}! 👋')
 
 
+# Command: Status
+@bot.command(name='status')
+async def status(ctx):
+    """Show the service mode, lookup queue and MRivals.gg health"""
+    mode_status = service_mode.status()
+    embed = discord.Embed(title="🩺 Bot Status", color=discord.Color.blue())
+    embed.add_field(name="Service Mode",
+                    value=f"{mode_status['mode']}\n{mode_status['description']}",
+                    inline=False)
+
+    p90 = mode_status["p90_latency"]
+    embed.add_field(name="Lookup p90",
+                    value=f"{p90:.1f}s" if p90 is not None else "No lookups",
+                    inline=True)
+    embed.add_field(name="Queued", value=str(mode_status["queue_depth"]),
+                    inline=True)
+    embed.add_field(name="MRivals.gg", value=mrivals_breaker.state,
+                    inline=True)
+
+    lag = loop_watchdog.stats()
+    if lag:
+        embed.add_field(
+            name="Event Loop Lag",
+            value=f"p50 {lag['p50']:.1f}ms, p99 {lag['p99']:.1f}ms, "
+            f"max {lag['max']:.0f}ms, {lag['stalls']} stalls",
+            inline=False)
+
+    lines = []
+    for name, stats in browser_scheduler.stats().items():
+        lines.append(
+            f"{name}: {stats['running']} running, {stats['queued']} queued, "
+            f"wait {stats['mean_wait']:.1f}s, exec {stats['mean_exec']:.1f}s")
+    embed.add_field(name="Browser Jobs", value="\n".join(lines), inline=False)
+
+    if rank_watcher.channels():
+        watch = rank_watcher.stats()
+        next_poll = watch["next_poll"]
+        embed.add_field(
+            name="Rank Watch",
+            value=f"{watch['players']} players, {watch['polls']} polls, "
+            f"{watch['changes']} rank changes"
+            + (f", next poll in {next_poll:.0f}s" if next_poll is not None else ""),
+            inline=False)
+
+    if browser_supervisor.available:
+        browsers = browser_supervisor.stats()
+        embed.add_field(
+            name="Browser Processes",
+            value=f"{browsers['drivers']} drivers, {browsers['processes']} processes, "
+            f"{browsers['orphans_killed']} orphans killed, "
+            f"{browsers['zombies_reaped']} zombies reaped",
+            inline=False)
+
+    if profile_pool:
+        loop = asyncio.get_event_loop()
+        cache = await loop.run_in_executor(None, profile_pool.stats)
+        embed.add_field(
+            name="Chrome Cache",
+            value=f"{cache['bytes'] / 2**20:.1f} of {cache['max_bytes'] / 2**20:.0f} MiB, "
+            f"{cache['warm_starts']} warm / {cache['cold_starts']} cold starts",
+            inline=False)
+    await ctx.send(embed=embed)
+
+
+def prepare_rank_lookup(username):
+    """Resolve a typed username before any browser work
+
+    Returns (username, suggestions, cached_reply). Case slips are fixed
+    against usernames we have already resolved, suggestions are prepared
+    for names we have never seen, and cached_reply is set when the profile
+    is known to be missing or private.
+    """
+    suggestions = []
+    canonical_name = username_index.resolve(username)
+    if canonical_name:
+        username = canonical_name
+    else:
+        suggestions = username_index.suggest(username)
+
+    cached_reply = None
+    cached_outcome = negative_cache.get(username)
+    if cached_outcome:
+        cached_reply = negative_result_message(
+            cached_outcome, urllib.parse.quote(username), suggestions)
+    return username, suggestions, cached_reply
+
+
+def format_count(value):
+    """Display a parsed count the way mrivals.gg shows it"""
+    return "Unknown" if value is None else f"{value:,}"
+
+
+def player_emoji_for(snapshot):
+    """The player's own emoji, or one for their rank tier"""
+    return PLAYER_EMOJIS.get(snapshot.name) or RANK_EMOJIS.get(
+        snapshot.tier, "🎮")
+
+
+async def record_profile(username, snapshot, stale_minutes):
+    """Update the caches for a fetched profile and return its outcome
+
+    Returns NOT_FOUND or PRIVATE for profiles that cannot be shown and
+    None otherwise. Fresh profiles are snapshotted and their name indexed,
+    and the heroes of roster players go into the hero index.
+    """
+    if not snapshot.known:
+        negative_cache.add(username, NOT_FOUND)
+        return NOT_FOUND
+    if snapshot.private:
+        negative_cache.add(username, PRIVATE)
+        return PRIVATE
+    if stale_minutes is None:
+        rank_snapshots.put(username, snapshot)
+        on_roster = normalize_username(username) in roster_keys
+        if on_roster:
+            top_board.update(username, snapshot)
+        await remember_username(snapshot.name)
+        # Summary lookups have no hero cards; keep what the index has
+        if on_roster and snapshot.heroes:
+            await remember_heroes(snapshot.name, snapshot.heroes)
+    return None
+
+
+async def build_rank_reply(username, suggestions, start_time, user_id=None,
+                           guild_id=None, status=None, deadline=None):
+    """Fetch a player and build the rank reply
+
+    Shared by the prefix and slash commands. Returns (content, embeds),
+    where content is a plain message used when there is nothing to embed,
+    or a note about what the deadline cut from the embeds. `status` is
+    called with queue updates while the lookup waits.
+    """
+    # URL encode the username
+    encoded_username = urllib.parse.quote(username)
+    profile_url = f'https://mrivals.gg/player/{encoded_username}'
+
+    # Get player data, or the last good snapshot if mrivals.gg is down
+    mode = service_mode.mode
+    try:
+        result, stale_minutes, queue_wait = await fetch_profile(
+            username, user_id, guild_id, status, mode=mode,
+            deadline=deadline)
+    except QueueFull as e:
+        return queue_full_message(e), []
+    if result is None:
+        if deadline and deadline.skipped:
+            return deadline_message(deadline), []
+        return upstream_unavailable_message(), []
+
+    outcome = await record_profile(username, result, stale_minutes)
+    if outcome == NOT_FOUND:
+        return negative_result_message(NOT_FOUND, encoded_username,
+                                       suggestions), []
+    if outcome == PRIVATE:
+        return negative_result_message(PRIVATE, encoded_username), []
+
+    player_name = result.name
+    rank_value = result.rank
+
+    # Get rank icon URL
+    rank_lower = rank_value.lower(
+    )  # Convert entire rank string to lowercase
+    rank_icon_url = RANK_ICONS.get(rank_lower)
+
+    # If no icon found, try getting just the first word
+    if not rank_icon_url:
+        rank_lower = rank_value.split()[0].lower()
+        rank_icon_url = RANK_ICONS.get(rank_lower)
+
+    # Get player emoji or rank emoji
+    player_emoji = player_emoji_for(result)
+
+    # Create embed
+    embed = discord.Embed(
+        title=f"Player Information for {player_emoji} {player_name}",
+        color=discord.Color.blue(),
+        url=profile_url)
+
+    # Add rank information with icon if available
+    rank_display = f"{rank_value}"
+    if rank_icon_url:
+        embed.set_thumbnail(url=rank_icon_url)
+
+    # Add basic stats
+    embed.add_field(name="🎮 Rank", value=rank_display, inline=True)
+    embed.add_field(name="⭐ Level", value=format_count(result.level),
+                    inline=True)
+    embed.add_field(name="🏆 Win Rate", value=result.win_rate_text,
+                    inline=True)
+
+    # Add detailed stats from HTML
+    embed.add_field(name="⏱️ Time Played",
+                    value=result.time_played or "Unknown",
+                    inline=True)
+    embed.add_field(name="🎯 Total Matches",
+                    value=format_count(result.total_matches),
+                    inline=True)
+    embed.add_field(name="🏅 Wins", value=format_count(result.wins),
+                    inline=True)
+    embed.add_field(name="💀 Losses",
+                    value=format_count(result.losses),
+                    inline=True)
+
+    # Calculate time taken
+    time_taken = round(time.time() - start_time, 2)
+
+    # Add footer with timing information
+    footer = f"Data from MRivals.gg • Time taken: {time_taken}s"
+    if queue_wait >= 0.1:
+        footer += f" (queued {queue_wait:.1f}s)"
+    if mode != FULL:
+        footer += f" • Reduced mode: {mode}"
+    if stale_minutes is not None:
+        footer += f" • Data from {stale_minutes} minutes ago"
+    embed.set_footer(text=footer)
+
+    embeds = [embed]
+
+    # Add hero embeds if they exist
+    if result.heroes:
+        for hero in result.heroes:
+            # Get hero emoji or use default crown
+            hero_emoji = HERO_EMOJIS.get(hero.name, "👑")
+
+            hero_embed = discord.Embed(
+                title=f"{hero_emoji} {hero.name}",
+                color=discord.Color.blue(),
+                url=profile_url)
+
+            # Add hero stats
+            hero_embed.add_field(name="🎯 Matches",
+                                 value=f"{hero.matches:,} matches",
+                                 inline=True)
+            hero_embed.add_field(name="🏆 Win Rate",
+                                 value=hero.win_rate_text,
+                                 inline=True)
+            hero_embed.add_field(name="📊 W/L Record",
+                                 value=hero.w_l,
+                                 inline=True)
+
+            # Set hero image as thumbnail if available
+            if hero.image_url:
+                hero_embed.set_thumbnail(url=hero.image_url)
+
+            # Add footer with rank number
+            hero_embed.set_footer(
+                text=f"#{hero.rank} Hero for {player_name}")
+
+            embeds.append(hero_embed)
+
+    # Add match embed if it exists
+    if result.matches:
+        # Create match embed
+        match_embed = discord.Embed(title="🎮 Recent Matches",
+                                    color=discord.Color.blue(),
+                                    url=profile_url)
+
+        # Add each match as a field
+        for match in result.matches:
+            # Format KDA stats
+            kda_text = f"{match.kills}/{match.deaths}/{match.assists}"
+
+            # Create match value with details
+            match_value = f"{match.details}\n"
+            match_value += f"KDA: {kda_text} (Ratio: {match.kda:.2f})"
+
+            # Add match as a field with emoji in title
+            match_embed.add_field(
+                name=
+                f"{'✅' if match.is_win else '❌'} {match.result}",
+                value=match_value,
+                inline=False)
+
+        # Add footer
+        match_embed.set_footer(
+            text=f"Recent matches for {player_name}")
+
+        embeds.append(match_embed)
+
+    return deadline.note() if deadline else None, embeds
+
+
 # Command: Rank
 @bot.command(name='rank')
 async def rank(ctx, *, username: str):
     """Show detailed player information"""
-    driver = None
     start_time = time.time()  # Record start time
     try:
+        # Answer straight away for recently missing or private profiles
+        username, suggestions, cached_reply = prepare_rank_lookup(username)
+        if cached_reply:
+            await ctx.send(cached_reply)
+            return
+
         # Send initial loading message
         loading_message = await ctx.send("🔍 Fetching player data...")
 
-        # URL encode the username
-        encoded_username = urllib.parse.quote(username)
-        profile_url = f'https://mrivals.gg/player/{encoded_username}'
-
-        # Set up Chrome options for maximum performance
-        chrome_options = Options()
-        chrome_options.add_argument('--headless=new')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--disable-extensions')
-        chrome_options.add_argument('--disable-infobars')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--disable-web-security')
-        chrome_options.add_argument('--disable-logging')
-        chrome_options.add_argument('--log-level=3')
-        chrome_options.add_argument('--disable-images')  # Disable image loading
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
+        deadline = Deadline(COMMAND_DEADLINE)
+        content, embeds = await build_rank_reply(
+            username, suggestions, start_time, ctx.author.id,
+            ctx.guild.id if ctx.guild else None,
+            status_updater(loading_message.edit), deadline)
 
         try:
-            if os.getenv('RENDER'):
-                logger.info("Running in Render.com environment")
-                
-                # Check for Chrome binary in multiple locations
-                possible_chrome_paths = [
-                    os.getenv('CHROME_BINARY', '/usr/bin/google-chrome-stable'),
-                    '/usr/bin/google-chrome-stable',
-                    '/usr/bin/google-chrome',
-                    '/usr/bin/chromium-browser'
-                ]
-                
-                chrome_binary = None
-                for path in possible_chrome_paths:
-                    if os.path.exists(path):
-                        chrome_binary = path
-                        logger.info(f"Found Chrome binary at: {path}")
-                        break
-                        
-                if not chrome_binary:
-                    raise FileNotFoundError("Chrome binary not found in any standard location")
-                    
-                # Check for ChromeDriver
-                chromedriver_path = os.getenv('CHROMEDRIVER_PATH', '/usr/local/bin/chromedriver')
-                if not os.path.exists(chromedriver_path):
-                    raise FileNotFoundError(f"ChromeDriver not found at {chromedriver_path}")
-                    
-                # Test Chrome and ChromeDriver
-                try:
-                    import subprocess
-                    chrome_version = subprocess.check_output([chrome_binary, '--version'], stderr=subprocess.PIPE).decode().strip()
-                    logger.info(f"Chrome version: {chrome_version}")
-                    
-                    chromedriver_version = subprocess.check_output([chromedriver_path, '--version'], stderr=subprocess.PIPE).decode().strip()
-                    logger.info(f"ChromeDriver version: {chromedriver_version}")
-                except Exception as e:
-                    logger.error(f"Failed to get versions: {str(e)}")
-                    
-                chrome_options.binary_location = chrome_binary
-                service = Service(executable_path=chromedriver_path)
-            else:
-                # Local Windows configuration
-                chrome_binary_path = "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
-                if os.path.exists(chrome_binary_path):
-                    chrome_options.binary_location = chrome_binary_path
-                else:
-                    chrome_binary_path = "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe"
-                    if os.path.exists(chrome_binary_path):
-                        chrome_options.binary_location = chrome_binary_path
-                    else:
-                        raise Exception("Chrome browser not found. Please install Google Chrome.")
-                service = Service(ChromeDriverManager().install())
-
-            logger.info("Chrome configuration completed successfully")
-        except Exception as e:
-            logger.error(f"Chrome setup failed: {str(e)}")
-            raise
-
-        # Initialize the Chrome WebDriver in the thread pool
-        loop = asyncio.get_event_loop()
-        driver = await loop.run_in_executor(
-            selenium_pool,
-            lambda: webdriver.Chrome(service=service, options=chrome_options))
-
-        # Set user agent in the thread pool
-        await loop.run_in_executor(
-            selenium_pool, lambda: driver.execute_cdp_cmd(
-                'Network.setUserAgentOverride', {
-                    "userAgent":
-                    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                }))
-
-        # Get player data using the driver
-        player_data, top_heroes, stats, recent_matches = await get_player_data_async(
-            driver, username)
-
-        if player_data:
-            # Extract data from additional properties
-            additional_properties = player_data.get("additionalProperty", [])
-            player_name = player_data.get("name", username)
-
-            # Initialize values
-            rank_value = "Unknown"
-            level = "Unknown"
-            win_rate = "Unknown"
-
-            # Extract data efficiently
-            for prop in additional_properties:
-                name = prop.get("name")
-                if name == "Rank":
-                    rank_value = prop.get("value", "Unknown")
-                elif name == "Level":
-                    level = prop.get("value", "Unknown")
-                elif name == "Win Rate":
-                    win_rate = prop.get("value", "Unknown")
-
-            # Get rank icon URL
-            rank_lower = rank_value.lower(
-            )  # Convert entire rank string to lowercase
-            rank_icon_url = RANK_ICONS.get(rank_lower)
-
-            # If no icon found, try getting just the first word
-            if not rank_icon_url:
-                rank_lower = rank_value.split()[0].lower()
-                rank_icon_url = RANK_ICONS.get(rank_lower)
-
-            # Get player emoji or rank emoji
-            player_emoji = PLAYER_EMOJIS.get(player_name)
-            if not player_emoji:
-                tier, _ = parse_rank(rank_value)
-                player_emoji = RANK_EMOJIS.get(tier, "🎮")
-
-            # Create embed
-            embed = discord.Embed(
-                title=f"Player Information for {player_emoji} {player_name}",
-                color=discord.Color.blue(),
-                url=profile_url)
-
-            # Add rank information with icon if available
-            rank_display = f"{rank_value}"
-            if rank_icon_url:
-                embed.set_thumbnail(url=rank_icon_url)
-
-            # Add basic stats
-            embed.add_field(name="🎮 Rank", value=rank_display, inline=True)
-            embed.add_field(name="⭐ Level", value=level, inline=True)
-            embed.add_field(name="🏆 Win Rate", value=win_rate, inline=True)
-
-            # Add detailed stats from HTML
-            embed.add_field(name="⏱️ Time Played",
-                            value=stats["time_played"],
-                            inline=True)
-            embed.add_field(name="🎯 Total Matches",
-                            value=stats["total_matches"],
-                            inline=True)
-            embed.add_field(name="🏅 Wins", value=stats["wins"], inline=True)
-            embed.add_field(name="💀 Losses",
-                            value=stats["losses"],
-                            inline=True)
-
-            # Calculate time taken
-            time_taken = round(time.time() - start_time, 2)
-
-            # Add footer with timing information
-            embed.set_footer(
-                text=f"Data from MRivals.gg • Time taken: {time_taken}s")
-
-            try:
-                # Delete the loading message
-                await loading_message.delete()
-                # Send the main embed
-                await ctx.send(embed=embed)
-
-                # Send hero embeds if they exist
-                if top_heroes:
-                    for hero in top_heroes:
-                        # Get hero emoji or use default crown
-                        hero_emoji = HERO_EMOJIS.get(hero['name'], "👑")
-
-                        hero_embed = discord.Embed(
-                            title=f"{hero_emoji} {hero['name']}",
-                            color=discord.Color.blue(),
-                            url=profile_url)
-
-                        # Add hero stats
-                        hero_embed.add_field(name="🎯 Matches",
-                                             value=hero['matches'],
-                                             inline=True)
-                        hero_embed.add_field(name="🏆 Win Rate",
-                                             value=hero['win_rate'],
-                                             inline=True)
-                        hero_embed.add_field(name="📊 W/L Record",
-                                             value=hero['w_l'],
-                                             inline=True)
-
-                        # Set hero image as thumbnail if available
-                        if hero.get('image_url'):
-                            hero_embed.set_thumbnail(url=hero['image_url'])
-
-                        # Add footer with rank number
-                        hero_embed.set_footer(
-                            text=f"#{hero['rank']} Hero for {player_name}")
-
-                        # Send the hero embed
-                        await ctx.send(embed=hero_embed)
-
-                # Send match embed if it exists
-                if recent_matches:
-                    # Create match embed
-                    match_embed = discord.Embed(title="🎮 Recent Matches",
-                                                color=discord.Color.blue(),
-                                                url=profile_url)
-
-                    # Add each match as a field
-                    for match in recent_matches:
-                        # Format KDA stats
-                        kda_text = f"{match['stats'].get('K', '0')}/{match['stats'].get('D', '0')}/{match['stats'].get('A', '0')}"
-                        kda_ratio = match['stats'].get('KDA', '0.00')
-
-                        # Create match value with details
-                        match_value = f"{match['details']}\n"
-                        match_value += f"KDA: {kda_text} (Ratio: {kda_ratio})"
-
-                        # Add match as a field with emoji in title
-                        match_embed.add_field(
-                            name=
-                            f"{'✅' if match['is_win'] else '❌'} {match['result']}",
-                            value=match_value,
-                            inline=False)
-
-                    # Set rank image as thumbnail if available from first match
-                    if recent_matches and recent_matches[0].get(
-                            'rank_img_url'):
-                        match_embed.set_thumbnail(
-                            url=recent_matches[0]['rank_img_url'])
-
-                    # Add footer
-                    match_embed.set_footer(
-                        text=f"Recent matches for {player_name}")
-
-                    # Send the match embed
-                    await ctx.send(embed=match_embed)
-
-            except discord.Forbidden:
-                await loading_message.delete()
-                await ctx.send(
-                    "⚠️ This bot requires the 'Embed Links' permission to display rank information properly. Please contact a server administrator to enable this permission."
-                )
-            except Exception as e:
-                await loading_message.delete()
-                await ctx.send(
-                    f"An error occurred while sending the embed: {str(e)}")
-        else:
+            # Delete the loading message
             await loading_message.delete()
+            if not embeds:
+                await ctx.send(content)
+            # Send the main embed, then hero and match embeds while there
+            # is time left
+            for i, embed in enumerate(embeds):
+                if i and deadline.expired:
+                    deadline.skip("embeds")
+                    break
+                await ctx.send(embed=embed)
+            if embeds and deadline.note():
+                await ctx.send(deadline.note())
+        except discord.Forbidden:
             await ctx.send(
-                f"Could not find player data. You can view the profile at: https://mrivals.gg/player/{encoded_username}"
+                "⚠️ This bot requires the 'Embed Links' permission to display rank information properly. Please contact a server administrator to enable this permission."
             )
+        except Exception as e:
+            await ctx.send(
+                f"An error occurred while sending the embed: {str(e)}")
 
     except Exception as e:
         try:
@@ -799,187 +2097,110 @@ async def rank(ctx, *, username: str):
             await ctx.send(f"An error occurred: {str(e)}")
         except:
             await ctx.send(f"An error occurred: {str(e)}")
-    finally:
-        if driver:
-            try:
-                # Quit the driver in the thread pool
-                await loop.run_in_executor(selenium_pool, driver.quit)
-            except:
-                pass
+
+
+def build_top_page(page):
+    """Build one page of the sorted roster, returning (embed, page, pages)
+
+    Reads a slice of top_board, so paging never scrapes or sorts.
+    """
+    pages = top_board.page_count(TOP_PAGE_SIZE)
+    page = min(max(page, 1), pages)
+    embed = build_top_embed(top_board.page(page, TOP_PAGE_SIZE),
+                            start=(page - 1) * TOP_PAGE_SIZE + 1)
+    return embed, page, pages
+
+
+def top_age_footer(footer):
+    """Add how old the last roster scrape is to a !top footer"""
+    age_minutes = int((time.time() - top_cache["computed_at"]) // 60)
+    if age_minutes:
+        footer += f" • Updated {age_minutes} minutes ago"
+    return footer
+
+
+class TopPagesView(discord.ui.View):
+    """Previous and next buttons for a paginated !top reply"""
+
+    def __init__(self, page):
+        super().__init__(timeout=TOP_PAGE_TIMEOUT)
+        self.page = page
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.page <= 1
+        self.next_page.disabled = self.page >= top_board.page_count(
+            TOP_PAGE_SIZE)
+
+    async def show(self, interaction, page):
+        embed, self.page, pages = build_top_page(page)
+        embed.set_footer(text=top_age_footer(
+            f"Page {self.page}/{pages} • Data from MRivals.gg"))
+        self.update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        await self.show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        await self.show(interaction, self.page + 1)
+
+
+async def build_top_reply(start_time, user_id=None, guild_id=None,
+                          status=None, page=1):
+    """Build a page of the top players, shared by the prefix and slash commands
+
+    Returns (embed, view), where view has page buttons or is None when
+    everything fits on one page. Raises QueueFull if a roster scrape is
+    needed but refused.
+    """
+    # Reuse a recent ranking instead of scraping the roster again
+    _, computed_at = await get_top_players(user_id=user_id,
+                                           guild_id=guild_id,
+                                           status=status)
+
+    # Create embed
+    embed, page, pages = build_top_page(page)
+
+    # Calculate time taken
+    time_taken = round(time.time() - start_time, 2)
+
+    # Add footer with timing information
+    footer = f"Data from MRivals.gg • Time taken: {time_taken}s"
+    if pages > 1:
+        footer = f"Page {page}/{pages} • {footer}"
+    if computed_at >= start_time and top_cache["queue_wait"] >= 0.1:
+        footer += f" (queued {top_cache['queue_wait']:.1f}s)"
+    embed.set_footer(text=top_age_footer(footer))
+    return embed, TopPagesView(page) if pages > 1 else None
 
 
 # Command: Top
 @bot.command(name='top')
-async def top(ctx):
+async def top(ctx, page: int = 1):
     """Show top players ranked by rank and win rate"""
-    driver = None
     start_time = time.time()  # Record start time
     try:
         # Send initial loading message
         loading_message = await ctx.send("🔍 Fetching top players data...")
 
-        # Set up Chrome options for maximum performance
-        chrome_options = Options()
-        chrome_options.add_argument('--headless=new')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--disable-extensions')
-        chrome_options.add_argument('--disable-infobars')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--disable-web-security')
-        chrome_options.add_argument('--disable-logging')
-        chrome_options.add_argument('--log-level=3')
-        chrome_options.add_argument('--disable-images')  # Disable image loading
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-
         try:
-            if os.getenv('RENDER'):
-                logger.info("Running in Render.com environment")
-                
-                # Check for Chrome binary in multiple locations
-                possible_chrome_paths = [
-                    os.getenv('CHROME_BINARY', '/usr/bin/google-chrome-stable'),
-                    '/usr/bin/google-chrome-stable',
-                    '/usr/bin/google-chrome',
-                    '/usr/bin/chromium-browser'
-                ]
-                
-                chrome_binary = None
-                for path in possible_chrome_paths:
-                    if os.path.exists(path):
-                        chrome_binary = path
-                        logger.info(f"Found Chrome binary at: {path}")
-                        break
-                        
-                if not chrome_binary:
-                    raise FileNotFoundError("Chrome binary not found in any standard location")
-                    
-                # Check for ChromeDriver
-                chromedriver_path = os.getenv('CHROMEDRIVER_PATH', '/usr/local/bin/chromedriver')
-                if not os.path.exists(chromedriver_path):
-                    raise FileNotFoundError(f"ChromeDriver not found at {chromedriver_path}")
-                    
-                # Test Chrome and ChromeDriver
-                try:
-                    import subprocess
-                    chrome_version = subprocess.check_output([chrome_binary, '--version'], stderr=subprocess.PIPE).decode().strip()
-                    logger.info(f"Chrome version: {chrome_version}")
-                    
-                    chromedriver_version = subprocess.check_output([chromedriver_path, '--version'], stderr=subprocess.PIPE).decode().strip()
-                    logger.info(f"ChromeDriver version: {chromedriver_version}")
-                except Exception as e:
-                    logger.error(f"Failed to get versions: {str(e)}")
-                    
-                chrome_options.binary_location = chrome_binary
-                service = Service(executable_path=chromedriver_path)
-            else:
-                # Local Windows configuration
-                chrome_binary_path = "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
-                if os.path.exists(chrome_binary_path):
-                    chrome_options.binary_location = chrome_binary_path
-                else:
-                    chrome_binary_path = "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe"
-                    if os.path.exists(chrome_binary_path):
-                        chrome_options.binary_location = chrome_binary_path
-                    else:
-                        raise Exception("Chrome browser not found. Please install Google Chrome.")
-                service = Service(ChromeDriverManager().install())
-
-            logger.info("Chrome configuration completed successfully")
-        except Exception as e:
-            logger.error(f"Chrome setup failed: {str(e)}")
-            raise
-
-        # Initialize the Chrome WebDriver in the thread pool
-        loop = asyncio.get_event_loop()
-        driver = await loop.run_in_executor(
-            selenium_pool,
-            lambda: webdriver.Chrome(service=service, options=chrome_options))
-
-        # Set user agent in the thread pool
-        await loop.run_in_executor(
-            selenium_pool, lambda: driver.execute_cdp_cmd(
-                'Network.setUserAgentOverride', {
-                    "userAgent":
-                    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                }))
-
-        # Get data for all players using the same driver
-        player_stats = []
-        for username in TOP_PLAYERS:
-            stats = await get_player_data_for_top_async(driver, username)
-            if stats:
-                player_stats.append(stats)
-            else:
-                player_stats.append({
-                    "name":
-                    username,  # Use the actual username from TOP_PLAYERS
-                    "rank": "Unknown",
-                    "win_rate": "Unknown"
-                })
-
-        # Sort players by rank and win rate
-        def parse_win_rate(win_rate_str):
-            """Parse win rate string to get numeric value"""
-            try:
-                if win_rate_str == "Private Profile" or win_rate_str == "Unknown":
-                    return 0
-                # Remove the % symbol and convert to float
-                return float(win_rate_str.rstrip('%'))
-            except:
-                return 0
-
-        def sort_key(player):
-            if player["rank"] == "Unknown":
-                return (999, 999, 0)  # Place unknown ranks at the bottom
-            tier, number = parse_rank(player["rank"])
-            rank_value = RANK_ORDER.get(tier, 999)
-            win_rate = parse_win_rate(player["win_rate"])
-            return (
-                rank_value, number, -win_rate
-            )  # Sort by rank tier, number, then win rate (negative for descending order)
-
-        player_stats.sort(
-            key=sort_key)  # Remove reverse=True to sort in ascending order
-
-        # Create embed
-        embed = discord.Embed(title="🏆 Top Players",
-                              color=discord.Color.blue())
-
-        # Add players to embed
-        for i, player in enumerate(player_stats, 1):
-            # Get rank icon URL
-            tier, _ = parse_rank(player["rank"])
-            rank_icon_url = RANK_ICONS.get(tier)
-
-            # Get player emoji or rank emoji
-            player_emoji = PLAYER_EMOJIS.get(player["name"])
-            if not player_emoji:
-                player_emoji = RANK_EMOJIS.get(tier, "🎮")
-
-            # Create player value
-            player_value = f"Rank: {player['rank']}\n"
-            player_value += f"Win Rate: {player['win_rate']}"
-
-            # Add player as a field with emoji
-            embed.add_field(name=f"#{i} {player_emoji} {player['name']}",
-                            value=player_value,
-                            inline=False)
-
-        # Calculate time taken
-        time_taken = round(time.time() - start_time, 2)
-
-        # Add footer with timing information
-        embed.set_footer(
-            text=f"Data from MRivals.gg • Time taken: {time_taken}s")
+            embed, view = await build_top_reply(
+                start_time, ctx.author.id,
+                ctx.guild.id if ctx.guild else None,
+                status_updater(loading_message.edit), page)
+        except QueueFull as e:
+            await loading_message.delete()
+            await ctx.send(queue_full_message(e))
+            return
 
         try:
             # Delete the loading message
             await loading_message.delete()
-            # Send the embed
-            await ctx.send(embed=embed)
+            # Send the embed, with page buttons if there is more than one
+            await ctx.send(embed=embed, view=view)
         except discord.Forbidden:
             await loading_message.delete()
             await ctx.send(
@@ -995,13 +2216,633 @@ async def top(ctx):
             await ctx.send(f"An error occurred: {str(e)}")
         except:
             await ctx.send(f"An error occurred: {str(e)}")
-    finally:
-        if driver:
+
+
+# Command: Notify
+@bot.command(name='notify')
+@commands.guild_only()
+@commands.has_permissions(manage_guild=True)
+async def notify(ctx, action: str = "here"):
+    """Announce roster rank changes in this channel (here) or stop (off)"""
+    action = action.lower()
+    if action == "off":
+        if rank_watcher.remove_channel(ctx.guild.id):
+            await save_rank_watch()
+            await ctx.send("Rank change announcements stopped.")
+        else:
+            await ctx.send(
+                "Rank changes are not announced in this server.")
+        return
+    if action != "here":
+        await ctx.send("Usage: !notify [here|off]")
+        return
+
+    rank_watcher.set_channel(ctx.guild.id, ctx.channel.id)
+    await save_rank_watch()
+    await ctx.send(
+        "🔔 Rank ups and downs of roster players will be announced in this channel.")
+
+
+# Command: Leaderboard
+@bot.command(name='leaderboard')
+@commands.guild_only()
+@commands.has_permissions(manage_guild=True)
+async def leaderboard(ctx, action: str = "here"):
+    """Keep an auto-updating leaderboard in this channel (here) or stop it (off)"""
+    action = action.lower()
+    if action == "off":
+        if leaderboard_channels.remove(ctx.guild.id):
+            await save_leaderboard_channels()
+            await ctx.send("Leaderboard updates stopped.")
+        else:
+            await ctx.send(
+                "No leaderboard channel is configured for this server.")
+        return
+    if action != "here":
+        await ctx.send("Usage: !leaderboard [here|off]")
+        return
+
+    leaderboard_channels.set_channel(ctx.guild.id, ctx.channel.id)
+    await ctx.send(
+        f"📌 The leaderboard will be kept up to date in this channel every {LEADERBOARD_INTERVAL} minutes."
+    )
+    try:
+        player_stats, _ = await get_top_players(user_id=ctx.author.id,
+                                                guild_id=ctx.guild.id)
+        await update_leaderboard(ctx.guild.id,
+                                 leaderboard_channels.get(ctx.guild.id),
+                                 player_stats)
+    except Exception as e:
+        logger.error(f"Failed to post leaderboard in {ctx.guild.name}: {str(e)}")
+        await ctx.send(f"An error occurred while posting the leaderboard: {str(e)}")
+    await save_leaderboard_channels()
+
+
+# Slash command: Rank
+@bot.tree.command(name='rank', description='Show detailed player information')
+@app_commands.describe(username='MRivals.gg username')
+async def rank_slash(interaction: discord.Interaction, username: str):
+    """Slash version of !rank that defers and then fills in its response"""
+    start_time = time.time()  # Record start time
+    username, suggestions, cached_reply = prepare_rank_lookup(username)
+    if cached_reply:
+        await interaction.response.send_message(cached_reply)
+        return
+
+    # Acknowledge within Discord's 3-second window before scraping
+    await interaction.response.defer(thinking=True)
+    try:
+        content, embeds = await build_rank_reply(
+            username, suggestions, start_time, interaction.user.id,
+            interaction.guild_id,
+            status_updater(interaction.edit_original_response),
+            Deadline(COMMAND_DEADLINE))
+        # Replaces the thinking indicator or queue position in place
+        await interaction.edit_original_response(content=content,
+                                                 embeds=embeds)
+    except discord.Forbidden:
+        await interaction.followup.send(
+            "⚠️ This bot requires the 'Embed Links' permission to display rank information properly. Please contact a server administrator to enable this permission."
+        )
+    except Exception as e:
+        logger.error(f"Slash rank failed for {username}: {str(e)}")
+        await interaction.followup.send(f"An error occurred: {str(e)}")
+
+
+# Slash command: Top
+@bot.tree.command(name='top',
+                  description='Show top players ranked by rank and win rate')
+@app_commands.describe(page='Leaderboard page to start on')
+async def top_slash(interaction: discord.Interaction, page: int = 1):
+    """Slash version of !top that defers and then fills in its response"""
+    start_time = time.time()  # Record start time
+
+    # Acknowledge within Discord's 3-second window before scraping
+    await interaction.response.defer(thinking=True)
+    try:
+        embed, view = await build_top_reply(
+            start_time, interaction.user.id, interaction.guild_id,
+            status_updater(interaction.edit_original_response), page)
+        await interaction.edit_original_response(content=None, embed=embed,
+                                                 view=view)
+    except QueueFull as e:
+        await interaction.edit_original_response(
+            content=queue_full_message(e))
+    except discord.Forbidden:
+        await interaction.followup.send(
+            "⚠️ This bot requires the 'Embed Links' permission to display rank information properly. Please contact a server administrator to enable this permission."
+        )
+    except Exception as e:
+        logger.error(f"Slash top failed: {str(e)}")
+        await interaction.followup.send(f"An error occurred: {str(e)}")
+
+
+def recent_kda(recent_matches):
+    """Combined (kills + assists) / deaths over a list of recent matches"""
+    kills = sum(match.kills for match in recent_matches)
+    deaths = sum(match.deaths for match in recent_matches)
+    assists = sum(match.assists for match in recent_matches)
+    return (kills + assists) / max(deaths, 1)
+
+
+def build_compare_embed(players, failures, start_time, slowest, mode):
+    """Build the side-by-side embed for !compare
+
+    `players` holds (snapshot, stale_minutes) for every profile that
+    could be shown and `failures` (name, reason) for the rest.
+    """
+    embed = discord.Embed(title="⚔️ Player Comparison",
+                          color=discord.Color.blue())
+
+    hero_stats = {}
+    for snapshot, stale_minutes in players:
+        lines = [f"🎮 {snapshot.rank}", f"🏆 {snapshot.win_rate_text} win rate"]
+        if snapshot.matches:
+            lines.append(f"⚔️ {recent_kda(snapshot.matches):.2f} KDA "
+                         f"(last {len(snapshot.matches)})")
+        else:
+            lines.append("⚔️ No recent matches")
+        if snapshot.heroes:
+            lines.append(" ".join(HERO_EMOJIS.get(hero.name, "👑")
+                                  for hero in snapshot.heroes))
+        if stale_minutes is not None:
+            lines.append(f"🕒 {stale_minutes} minutes old")
+        embed.add_field(name=f"{player_emoji_for(snapshot)} {snapshot.name}",
+                        value="\n".join(lines),
+                        inline=True)
+
+        for hero in snapshot.heroes:
+            hero_stats.setdefault(hero.name, []).append(
+                (snapshot.name, hero.win_rate_text))
+
+    for name, reason in failures:
+        embed.add_field(name=f"❔ {name}", value=reason, inline=True)
+
+    shared = [(hero, entries) for hero, entries in hero_stats.items()
+              if len(entries) > 1]
+    if shared:
+        # Heroes most of the group plays come first
+        shared.sort(key=lambda item: -len(item[1]))
+        value = "\n".join(
+            f"{HERO_EMOJIS.get(hero, '👑')} **{hero}**: " + ", ".join(
+                f"{player} {hero_win_rate}"
+                for player, hero_win_rate in entries)
+            for hero, entries in shared)
+    else:
+        value = "No top heroes in common"
+    embed.add_field(name="🤝 Shared Top Heroes", value=value[:1024],
+                    inline=False)
+
+    time_taken = round(time.time() - start_time, 2)
+    footer = (f"Data from MRivals.gg • Time taken: {time_taken}s "
+              f"(slowest lookup {slowest:.1f}s)")
+    if mode != FULL:
+        footer += f" • Reduced mode: {mode}"
+    embed.set_footer(text=footer)
+    return embed
+
+
+async def timed_fetch(username, mode):
+    """fetch_profile plus how long this one lookup took
+
+    Meant to run inside a browser_scheduler.owner_job(), which admits the
+    command as a whole; the lookup itself is admitted without owners.
+    """
+    started_at = time.time()
+    result = await fetch_profile(username, mode=mode)
+    return result, time.time() - started_at
+
+
+# Command: Bulk rank lookup
+@bot.command(name='ranks')
+async def ranks(ctx, *, usernames: str = ""):
+    """Look up a list of players at once, optionally as a CSV file"""
+    start_time = time.time()  # Record start time
+    want_csv = False
+    if usernames.lower().startswith('--csv'):
+        want_csv = True
+        usernames = usernames[len('--csv'):]
+
+    # Names can be pasted inline or attached as a text file
+    for attachment in ctx.message.attachments:
+        is_text = (attachment.filename.lower().endswith(('.txt', '.csv'))
+                   or (attachment.content_type or '').startswith('text/'))
+        if not is_text or attachment.size > 65536:
+            continue
+        data = await attachment.read()
+        usernames += '\n' + data.decode('utf-8', errors='replace')
+
+    names = parse_username_list(usernames)
+    if not names:
+        await ctx.send(
+            "Please list usernames separated by commas, e.g. `!ranks player1, player2`, or attach a text file with one per line. Add `--csv` for a CSV file.")
+        return
+    if len(names) > MAX_BULK_LOOKUP:
+        await ctx.send(
+            f"Please look up at most {MAX_BULK_LOOKUP} players at once ({len(names)} given).")
+        return
+
+    try:
+        loading_text = f"🔍 Fetching {len(names)} players..."
+        loading_message = await ctx.send(loading_text)
+        try:
+            player_stats, queue_wait = await bulk_lookup(
+                names, ctx.author.id, ctx.guild.id if ctx.guild else None,
+                status_updater(loading_message.edit))
+        except QueueFull as e:
+            await loading_message.delete()
+            await ctx.send(queue_full_message(e))
+            return
+
+        # Calculate time taken
+        time_taken = round(time.time() - start_time, 2)
+        footer = f"{len(player_stats)} players • Time taken: {time_taken}s"
+        if queue_wait >= 0.1:
+            footer += f" (queued {queue_wait:.1f}s)"
+        if any(player.stale_minutes is not None
+               for player in player_stats):
+            footer += " • * older data while MRivals.gg is down"
+
+        # Split the table over as many messages as Discord's limit needs
+        messages = []
+        block = []
+        for line in format_ranks_table(player_stats):
+            if block and sum(len(row) + 1 for row in block) + len(line) > 1900:
+                messages.append(block)
+                block = []
+            block.append(line)
+        messages.append(block)
+
+        await loading_message.delete()
+        for i, block in enumerate(messages):
+            content = "```\n" + "\n".join(block) + "\n```"
+            if i == len(messages) - 1:
+                content += footer
+            if want_csv and i == len(messages) - 1:
+                await ctx.send(content,
+                               file=discord.File(
+                                   io.BytesIO(build_ranks_csv(player_stats)),
+                                   filename="ranks.csv"))
+            else:
+                await ctx.send(content)
+
+    except Exception as e:
+        try:
+            await loading_message.delete()
+            await ctx.send(f"An error occurred: {str(e)}")
+        except:
+            await ctx.send(f"An error occurred: {str(e)}")
+
+
+def format_hero_totals(totals):
+    """One line summary of a hero across every indexed player"""
+    return (f"{HERO_EMOJIS.get(totals['hero'], '👑')} **{totals['hero']}** - "
+            f"{totals['matches']} matches by {totals['players']} players, "
+            f"{totals['win_rate']:.1f}% win rate")
+
+
+# Command: Heroes
+@bot.command(name='heroes')
+async def heroes(ctx, *, role: str = None):
+    """Show the most-played heroes, optionally for one role"""
+    role_name = None
+    if role:
+        role_name = hero_index.resolve_role(role)
+        if not role_name:
+            await ctx.send(
+                "Unknown role. Try `vanguard`/`tank`, `duelist`/`dps` or `strategist`/`support`.")
+            return
+
+    most_played = hero_index.most_played(role_name, limit=10)
+    if not most_played:
+        await ctx.send(
+            "No hero data yet. Heroes are collected as the roster is refreshed, e.g. by `!top`.")
+        return
+
+    title = "🦸 Most-Played Heroes"
+    if role_name:
+        title = f"{ROLE_EMOJIS.get(role_name, '🦸')} Most-Played {role_name}s"
+    embed = discord.Embed(title=title,
+                          description="\n".join(
+                              f"#{i} {format_hero_totals(totals)}"
+                              for i, totals in enumerate(most_played, 1)),
+                          color=discord.Color.blue())
+    embed.set_footer(
+        text=f"From the top heroes of {len(hero_index)} roster players • Use !hero <name> for the best players")
+    await ctx.send(embed=embed)
+
+
+# Command: Hero
+@bot.command(name='hero')
+async def hero(ctx, *, name: str):
+    """Show who plays a hero best on the roster"""
+    hero_name = hero_index.resolve_hero(name)
+    if not hero_name:
+        await ctx.send(f"Unknown hero '{name}'.")
+        return
+
+    totals = hero_index.hero_totals(hero_name)
+    if not totals:
+        await ctx.send(f"Nobody on the roster has {hero_name} as a top hero.")
+        return
+
+    embed = discord.Embed(
+        title=f"{HERO_EMOJIS.get(hero_name, '👑')} {hero_name}",
+        description=format_hero_totals(totals),
+        color=discord.Color.blue())
+    for i, entry in enumerate(hero_index.best(hero_name), 1):
+        embed.add_field(
+            name=f"#{i} {entry['player']}",
+            value=f"🏆 {entry['win_rate']:.1f}% • 🎯 {entry['matches']} matches • 📊 {entry['w_l']}",
+            inline=False)
+    best = hero_index.best(hero_name, 1)[0]
+    if best.get("image_url"):
+        embed.set_thumbnail(url=best["image_url"])
+    role_name = HERO_ROLES.get(hero_name)
+    footer = f"Ranked by win rate, players with {MIN_HERO_MATCHES}+ matches first"
+    if role_name:
+        footer = f"{role_name} • {footer}"
+    embed.set_footer(text=footer)
+    await ctx.send(embed=embed)
+
+
+# Command: Compare
+@bot.command(name='compare')
+async def compare(ctx, *usernames: str):
+    """Compare several players side by side"""
+    start_time = time.time()  # Record start time
+    # Drop repeats of the same player, keeping the typed order
+    names = list({normalize_username(name): name
+                  for name in reversed(usernames)}.values())[::-1]
+    if not MIN_COMPARE_PLAYERS <= len(names) <= MAX_COMPARE_PLAYERS:
+        await ctx.send(
+            f"Please give between {MIN_COMPARE_PLAYERS} and {MAX_COMPARE_PLAYERS} "
+            f"different usernames, e.g. `!compare player1 player2`.")
+        return
+
+    try:
+        loading_message = await ctx.send(
+            f"🔍 Fetching {len(names)} players...")
+
+        lookups = []
+        failures = []
+        for name in names:
+            name, _, cached_reply = prepare_rank_lookup(name)
+            if cached_reply:
+                failures.append(
+                    (name, "Profile is private" if negative_cache.get(name)
+                     == PRIVATE else "Player not found"))
+            else:
+                lookups.append(name)
+
+        # All profiles are fetched at once, so the reply takes about as
+        # long as the slowest one. The compare counts as one job against
+        # the user and guild limits; counting each lookup would have the
+        # per-user limit refuse the third player.
+        mode = service_mode.mode
+        try:
+            with browser_scheduler.owner_job(
+                    ctx.author.id, ctx.guild.id if ctx.guild else None):
+                outcomes = await asyncio.gather(
+                    *[timed_fetch(name, mode) for name in lookups],
+                    return_exceptions=True)
+        except QueueFull as e:
+            await loading_message.delete()
+            await ctx.send(queue_full_message(e))
+            return
+
+        players = []
+        slowest = 0.0
+        for name, outcome in zip(lookups, outcomes):
+            if isinstance(outcome, QueueFull):
+                failures.append(
+                    (name, f"Lookup queue busy, retry in {outcome.retry_after}s"))
+                continue
+            if isinstance(outcome, Exception):
+                logger.error(f"Compare lookup failed for {name}: {str(outcome)}")
+                failures.append((name, "Lookup failed"))
+                continue
+            (result, stale_minutes, _), elapsed = outcome
+            slowest = max(slowest, elapsed)
+            if result is None:
+                failures.append((name, "MRivals.gg is not responding"))
+                continue
+            profile_outcome = await record_profile(name, result, stale_minutes)
+            if profile_outcome == NOT_FOUND:
+                failures.append((name, "Player not found"))
+            elif profile_outcome == PRIVATE:
+                failures.append((name, "Profile is private"))
+            else:
+                players.append((result, stale_minutes))
+
+        await loading_message.delete()
+        if not players:
+            await ctx.send("Could not fetch any of those players:\n" +
+                           "\n".join(f"• {name}: {reason}"
+                                     for name, reason in failures))
+            return
+        await ctx.send(embed=build_compare_embed(players, failures, start_time,
+                                                 slowest, mode))
+
+    except discord.Forbidden:
+        await ctx.send(
+            "⚠️ This bot requires the 'Embed Links' permission to display rank information properly. Please contact a server administrator to enable this permission."
+        )
+    except Exception as e:
+        try:
+            await loading_message.delete()
+            await ctx.send(f"An error occurred: {str(e)}")
+        except:
+            await ctx.send(f"An error occurred: {str(e)}")
+
+
+# Command: History
+@bot.command(name='history')
+async def history(ctx, *, username: str):
+    """Show win rate, KDA trend and streaks from stored match history"""
+    start_time = time.time()  # Record start time
+    try:
+        canonical_name = username_index.resolve(username)
+        if canonical_name:
+            username = canonical_name
+
+        # Send initial loading message
+        loading_message = await ctx.send("🔍 Updating match history...")
+
+        # Only the matches newer than the stored history are scraped
+        if negative_cache.get(username) is None:
             try:
-                # Quit the driver in the thread pool
-                await loop.run_in_executor(selenium_pool, driver.quit)
-            except:
-                pass
+                result, _, _ = await fetch_profile(
+                    username, ctx.author.id,
+                    ctx.guild.id if ctx.guild else None,
+                    status_updater(loading_message.edit),
+                    "🔍 Updating match history...", service_mode.mode)
+                if result is not None and not result.known:
+                    negative_cache.add(username, NOT_FOUND)
+            except QueueFull as e:
+                # Fall back to what is already stored
+                logger.info(f"Skipped history refresh for {username}: {str(e)}")
+
+        loop = asyncio.get_event_loop()
+        summary = await loop.run_in_executor(None, match_store.summary,
+                                             username)
+        last_week = await loop.run_in_executor(None, match_store.summary,
+                                               username, 7)
+
+        await loading_message.delete()
+        if not summary:
+            await ctx.send(f"No match history stored for {username} yet.")
+            return
+
+        profile_url = f'https://mrivals.gg/player/{urllib.parse.quote(username)}'
+        embed = discord.Embed(title=f"📜 Match History for {username}",
+                              color=discord.Color.blue(),
+                              url=profile_url)
+
+        embed.add_field(name="🎯 Matches Tracked",
+                        value=str(summary["matches"]),
+                        inline=True)
+        embed.add_field(
+            name="🏆 Win Rate",
+            value=f"{summary['win_rate']:.1f}% ({summary['wins']}W/{summary['losses']}L)",
+            inline=True)
+        embed.add_field(name="⚔️ KDA",
+                        value=f"{summary['kda']:.2f}",
+                        inline=True)
+
+        trend = summary["kda_trend"]
+        trend_emoji = "📈" if trend > 0.01 else "📉" if trend < -0.01 else "➡️"
+        embed.add_field(name="📊 KDA Trend",
+                        value=f"{trend_emoji} {trend:+.2f} per match",
+                        inline=True)
+
+        streak_type = "wins" if summary["current_streak_is_win"] else "losses"
+        embed.add_field(name="🔥 Current Streak",
+                        value=f"{summary['current_streak']} {streak_type}",
+                        inline=True)
+        embed.add_field(name="🏅 Longest Win Streak",
+                        value=str(summary["longest_win_streak"]),
+                        inline=True)
+
+        if last_week:
+            week_value = f"{last_week['win_rate']:.1f}% over {last_week['matches']} matches"
+        else:
+            week_value = "No matches"
+        embed.add_field(name="📅 Last 7 Days", value=week_value, inline=False)
+
+        # Calculate time taken
+        time_taken = round(time.time() - start_time, 2)
+        tracking_since = time.strftime(
+            '%Y-%m-%d', time.localtime(summary["first_recorded_at"]))
+        embed.set_footer(
+            text=f"Tracking since {tracking_since} • Time taken: {time_taken}s")
+
+        await ctx.send(embed=embed)
+
+    except discord.Forbidden:
+        await ctx.send(
+            "⚠️ This bot requires the 'Embed Links' permission to display rank information properly. Please contact a server administrator to enable this permission."
+        )
+    except Exception as e:
+        try:
+            await loading_message.delete()
+            await ctx.send(f"An error occurred: {str(e)}")
+        except:
+            await ctx.send(f"An error occurred: {str(e)}")
+
+
+def start_profiler():
+    """Start sampling the event loop and Selenium threads
+
+    Returns None if a profile is already being taken, since sampling
+    covers the whole process.
+    """
+    global active_profiler
+    if active_profiler:
+        return None
+    active_profiler = SamplingProfiler(PROFILE_INTERVAL_MS / 1000,
+                                       thread_prefixes=('selenium',))
+    active_profiler.start()
+    return active_profiler
+
+
+def stop_profiler():
+    global active_profiler
+    profile, active_profiler = active_profiler.stop(), None
+    return profile
+
+
+def write_profile(command_name, profile):
+    """Write a profile as collapsed stacks, returning the file path"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    timestamp = time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(
+        PROFILE_DIR,
+        f"{command_name}-{timestamp}-{int(time.time() * 1000) % 1000:03d}.folded")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(profile.collapsed())
+    return path
+
+
+# Command: Profile
+@bot.command(name='profile')
+@commands.guild_only()
+@commands.has_permissions(administrator=True)
+async def profile(ctx, command_name: str = None, *, arguments: str = ""):
+    """Run a command under the sampling profiler (admins only)"""
+    command = bot.get_command(command_name) if command_name else None
+    if command is None or command is profile:
+        await ctx.send("Usage: !profile <command> [arguments], e.g. !profile rank <username>")
+        return
+    if not start_profiler():
+        await ctx.send("A profile is already being taken, try again shortly.")
+        return
+
+    # Run the command as if it had been invoked with `arguments`
+    ctx.view = StringView(arguments)
+    ctx.invoked_with = command_name
+    error = None
+    try:
+        await command.invoke(ctx)
+    except commands.CommandError as e:
+        error = e
+    finally:
+        result = stop_profiler()
+
+    loop = asyncio.get_event_loop()
+    path = await loop.run_in_executor(None, write_profile, command.name,
+                                      result)
+    summary = result.summary()
+    if error:
+        summary = f"Command failed: {error}\n{summary}"
+    if len(summary) > 1900:
+        summary = summary[:1900] + "\n..."
+    await ctx.send(f"⏱️ Profile of !{command.name}\n```\n{summary}\n```",
+                   file=discord.File(path))
+
+
+@bot.before_invoke
+async def sample_command(ctx):
+    """Profile a random share of commands when PROFILE_SAMPLE_RATE is set"""
+    if (PROFILE_SAMPLE_RATE and ctx.command.name != 'profile'
+            and random.random() < PROFILE_SAMPLE_RATE):
+        ctx.sampling_profiler = start_profiler()
+
+
+@bot.after_invoke
+async def finish_sampled_command(ctx):
+    if not getattr(ctx, 'sampling_profiler', None):
+        return
+    ctx.sampling_profiler = None
+    result = stop_profiler()
+    loop = asyncio.get_event_loop()
+    try:
+        path = await loop.run_in_executor(None, write_profile,
+                                          ctx.command.name, result)
+    except Exception as e:
+        logger.error(f"Failed to write profile of !{ctx.command.name}: {str(e)}")
+        return
+    logger.info(f"Profiled !{ctx.command.name} into {path}\n{result.summary()}")
 
 
 # Event: Command error handling
@@ -1028,10 +2869,15 @@ def main():
             "No token found. Please set DISCORD_TOKEN in your .env file")
 
     try:
-        bot.run(DISCORD_TOKEN)
+        # discord.py logs through the root queue instead of its own handler
+        bot.run(DISCORD_TOKEN, log_handler=None)
     except Exception as e:
         logger.error(f"Failed to start bot: {str(e)}")
         raise
+    finally:
+        if capture_writer:
+            capture_writer.close()
+        log_listener.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,128 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Files Chrome leaves behind to claim a user-data directory
+SINGLETON_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie")
+
+# Caches that can be dropped without losing anything but warmth, relative
+# to a user-data directory
+CACHE_DIRS = (
+    os.path.join("Default", "Cache"),
+    os.path.join("Default", "Code Cache"),
+    os.path.join("Default", "Service Worker", "CacheStorage"),
+    "GrShaderCache",
+    "ShaderCache",
+    "GraphiteDawnCache",
+)
+
+
+def directory_size(path):
+    """Total size in bytes of the files under a directory"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ProfilePool:
+    """Chrome user-data directories that survive from one driver to the next
+
+    Chrome only lets one browser use a user-data directory at a time, so
+    the pool keeps one directory per concurrent driver (slot-0, slot-1, ...)
+    and leases them out. A driver started on a leased directory finds the
+    HTTP cache and V8 code cache left behind by the previous driver on that
+    slot, so mrivals.gg's scripts, styles and fonts are not downloaded and
+    compiled again. When every slot is leased a throwaway directory is used
+    instead, which starts cold but never waits.
+
+    Each slot gets an equal share of `max_bytes`. Three quarters of it go
+    to the HTTP cache through --disk-cache-size, leaving room for the code
+    cache and profile files, and a slot that still grows past its share is
+    emptied of caches when its driver is released.
+    """
+
+    def __init__(self, root, size, max_bytes):
+        self.root = os.path.abspath(root)
+        self.size = max(1, size)
+        self.max_bytes = max_bytes
+        self.slot_bytes = max_bytes // self.size
+        self.http_cache_bytes = self.slot_bytes * 3 // 4
+        # Most recently released last, so the warmest slot is reused first
+        self._free = [self._slot_path(i) for i in reversed(range(self.size))]
+        self._lock = threading.Lock()
+        self.warm_starts = 0
+        self.cold_starts = 0
+        self.trimmed_bytes = 0
+
+    def _slot_path(self, index):
+        return os.path.join(self.root, f"slot-{index}")
+
+    def acquire(self):
+        """Lease a user-data directory for a new driver"""
+        with self._lock:
+            path = self._free.pop() if self._free else None
+            if path is not None and os.path.isdir(os.path.join(path, "Default")):
+                self.warm_starts += 1
+            else:
+                self.cold_starts += 1
+        if path is None:
+            return tempfile.mkdtemp(prefix="chrome-profile-")
+
+        os.makedirs(path, exist_ok=True)
+        # Left behind by a Chrome that did not shut down cleanly; nothing
+        # else can be using a slot while it is leased to us
+        for name in SINGLETON_FILES:
+            try:
+                os.unlink(os.path.join(path, name))
+            except FileNotFoundError:
+                pass
+        return path
+
+    def release(self, path):
+        """Return a directory once its driver has quit"""
+        if not path.startswith(self.root + os.sep):
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        if self.slot_bytes and directory_size(path) > self.slot_bytes:
+            self.trim(path)
+        with self._lock:
+            self._free.append(path)
+
+    def trim(self, path):
+        """Drop the caches in a slot directory, returning bytes freed"""
+        freed = 0
+        for cache_dir in CACHE_DIRS:
+            full_path = os.path.join(path, cache_dir)
+            if os.path.isdir(full_path):
+                freed += directory_size(full_path)
+                shutil.rmtree(full_path, ignore_errors=True)
+        with self._lock:
+            self.trimmed_bytes += freed
+        logger.info(f"Trimmed {freed / 2**20:.1f} MiB of Chrome cache from {path}")
+        return freed
+
+    def chrome_arguments(self, path):
+        """Command line switches for a driver using `path`"""
+        arguments = [f"--user-data-dir={path}"]
+        if self.http_cache_bytes:
+            arguments.append(f"--disk-cache-size={self.http_cache_bytes}")
+        return arguments
+
+    def stats(self):
+        """Cache size on disk and how many drivers started warm or cold"""
+        return {
+            "bytes": directory_size(self.root) if os.path.isdir(self.root) else 0,
+            "max_bytes": self.max_bytes,
+            "warm_starts": self.warm_starts,
+            "cold_starts": self.cold_starts,
+            "trimmed_bytes": self.trimmed_bytes
+        }
@@ -0,0 +1,250 @@
+import logging
+import os
+import signal
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# /proc command names of Chrome, its helper processes and chromedriver
+BROWSER_NAMES = ("chrome", "chromium", "headless_shell")
+
+
+def process_table():
+    """{pid: (name, state, ppid, start time)} from /proc, or None without it
+
+    The start time tells a process apart from a later one given the same
+    PID.
+    """
+    if not os.path.isdir('/proc'):
+        return None
+    table = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name is in parentheses and may contain spaces
+        name = stat[stat.index('(') + 1:stat.rindex(')')]
+        fields = stat[stat.rindex(')') + 2:].split()
+        table[int(entry)] = (name, fields[0], int(fields[1]), int(fields[19]))
+    return table
+
+
+def descendants(table, pid):
+    """PIDs of every process below `pid` in a process table"""
+    children = {}
+    for child, (_, _, ppid, _) in table.items():
+        children.setdefault(ppid, []).append(child)
+    found, pending = [], list(children.get(pid, []))
+    while pending:
+        child = pending.pop()
+        found.append(child)
+        pending.extend(children.get(child, []))
+    return found
+
+
+def is_browser(name):
+    return name.startswith(BROWSER_NAMES)
+
+
+def browser_roots(table, pid):
+    """PIDs of browser processes below `pid` not started by another browser
+
+    Finds the browser a library launched through a helper process of its
+    own, such as Playwright's driver, so it can be registered.
+    """
+    return {child for child in descendants(table, pid)
+            if is_browser(table[child][0])
+            and not is_browser(table.get(table[child][2], ("", ))[0])}
+
+
+class BrowserSupervisor:
+    """Track the browser processes the bot spawns and kill the ones that leak
+
+    Drivers register the PID they started (chromedriver, or Chrome itself
+    for the CDP and Playwright engines) and release it once quit. Each sweep records the
+    processes running under every registered PID. Those still alive after
+    their driver was released or exited are orphans and get killed, as do
+    drivers held for longer than `max_age` and browser processes started
+    by the bot that stayed unregistered for two sweeps. Browser children
+    that exited without anyone waiting for them are reaped so they do not
+    pile up as zombies. Processes are matched by PID and start time, so a
+    reused PID is never killed.
+
+    Works from /proc; elsewhere `available` is False and sweeps do nothing.
+    register() and release() may be called from any thread.
+    """
+
+    def __init__(self, max_age=900):
+        self.max_age = max_age
+        self.available = os.path.isdir('/proc')
+        self.orphans_killed = 0
+        self.zombies_reaped = 0
+        self.last_leaked = 0
+        self.processes = 0
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._roots = {}  # pid -> (start time, registered at or None, label)
+        self._seen = {}  # pid -> (start time, root pid)
+        self._suspects = set()  # (pid, start time) of unregistered browsers
+        self._zombies = set()  # (pid, start time) of zombie children
+
+    @staticmethod
+    def _start_time(pid):
+        """Start time of a running process, or None once it is gone"""
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                stat = f.read()
+        except OSError:
+            return None
+        return int(stat[stat.rindex(')') + 2:].split()[19])
+
+    def _adopt(self, table, pid):
+        """Record the processes currently running under a registered PID"""
+        for child in descendants(table, pid):
+            self._seen[child] = (table[child][3], pid)
+
+    def register(self, pid, label="driver", long_lived=False):
+        """Start tracking a browser process and everything it has started
+
+        A `long_lived` process, such as a browser shared by every lookup,
+        is never killed for being held past `max_age`.
+        """
+        table = process_table()
+        if table is None or pid not in table:
+            return
+        with self._lock:
+            self._roots[pid] = (table[pid][3],
+                                None if long_lived else time.monotonic(), label)
+            self._seen[pid] = (table[pid][3], pid)
+            self._adopt(table, pid)
+
+    def release(self, pid):
+        """Stop tracking a quit driver; leftovers are killed by the next sweep"""
+        table = process_table()
+        with self._lock:
+            if self._roots.pop(pid, None) is not None and table:
+                self._adopt(table, pid)
+
+    def kill(self, pid):
+        """Kill a registered process and everything below it right away"""
+        table = process_table()
+        if table is None:
+            return 0
+        with self._lock:
+            if self._roots.pop(pid, None) is not None:
+                self._adopt(table, pid)
+            victims = [(child, start)
+                       for child, (start, root) in self._seen.items()
+                       if root == pid]
+        return self._kill(victims)
+
+    def kill_all(self):
+        """Kill every tracked process, for shutting down"""
+        table = process_table()
+        if table is None:
+            return 0
+        with self._lock:
+            for pid in self._roots:
+                self._adopt(table, pid)
+            self._roots.clear()
+            victims = list((pid, start) for pid, (start, _) in self._seen.items())
+        return self._kill(victims)
+
+    def _kill(self, victims):
+        """SIGKILL (pid, start time) pairs still running, returning the count"""
+        killed = 0
+        for pid, start in victims:
+            if self._start_time(pid) != start:
+                continue
+            try:
+                os.kill(pid, signal.SIGKILL)
+                killed += 1
+            except (ProcessLookupError, PermissionError):
+                continue
+            with self._lock:
+                self._seen.pop(pid, None)
+        return killed
+
+    def sweep(self):
+        """Kill orphaned browser processes and reap zombie ones
+
+        Returns (orphans killed, zombies reaped), or None without /proc.
+        """
+        table = process_table()
+        if table is None:
+            return None
+        now = time.monotonic()
+
+        def alive(pid, start):
+            info = table.get(pid)
+            return info is not None and info[3] == start and info[1] != 'Z'
+
+        with self._lock:
+            for pid, (start, registered_at, label) in list(self._roots.items()):
+                if not alive(pid, start):
+                    # Exited without being released: what it started is orphaned
+                    del self._roots[pid]
+                    continue
+                # Everything under a live driver belongs to it
+                self._adopt(table, pid)
+                if registered_at is not None and now - registered_at > self.max_age:
+                    logger.warning(
+                        f"{label} {pid} was held for over {self.max_age}s, "
+                        f"killing it as leaked")
+                    del self._roots[pid]
+
+            self._seen = {pid: (start, root)
+                          for pid, (start, root) in self._seen.items()
+                          if alive(pid, start)}
+            owned = {pid for pid, (_, root) in self._seen.items()
+                     if root in self._roots}
+            self.processes = len(owned)
+            orphans = {(pid, start) for pid, (start, root) in self._seen.items()
+                       if root not in self._roots}
+
+            # Browsers the bot started that no driver ever registered, e.g.
+            # a driver whose start was abandoned half way
+            suspects = {(pid, info[3]) for pid, info in table.items()
+                        if info[2] == self._pid and info[1] != 'Z'
+                        and is_browser(info[0]) and pid not in owned}
+            orphans |= suspects & self._suspects
+            self._suspects = suspects - self._suspects
+
+            zombies = {(pid, info[3]) for pid, info in table.items()
+                       if info[2] == self._pid and info[1] == 'Z'
+                       and is_browser(info[0]) and pid not in self._roots}
+            # Give whoever started a process one sweep to wait for it
+            stale_zombies = zombies & self._zombies
+            self._zombies = zombies - stale_zombies
+
+        killed = self._kill(orphans)
+        reaped = 0
+        for pid, _ in stale_zombies:
+            try:
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    reaped += 1
+            except ChildProcessError:
+                continue
+        self.orphans_killed += killed
+        self.zombies_reaped += reaped
+        self.last_leaked = killed + reaped
+        if killed or reaped:
+            logger.warning(f"Killed {killed} orphaned browser processes "
+                           f"and reaped {reaped} zombies")
+        return killed, reaped
+
+    def stats(self):
+        with self._lock:
+            drivers = len(self._roots)
+        return {
+            "drivers": drivers,
+            "processes": self.processes,
+            "orphans_killed": self.orphans_killed,
+            "zombies_reaped": self.zombies_reaped,
+            "last_leaked": self.last_leaked
+        }
@@ -0,0 +1,247 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from profile_cache import normalize_username
+
+logger = logging.getLogger(__name__)
+
+NOT_CAPTURED_PAGE = b"<html><head><title>Player not found</title></head><body></body></html>"
+UNAVAILABLE_PAGE = b"<html><head><title>503 Service Unavailable</title></head><body></body></html>"
+
+
+class CaptureStore:
+    """Content-addressed directory of captured profile pages
+
+    Each distinct HTML page or JSON-LD list is written once as a gzip
+    object under objects/, and index.jsonl records which objects were
+    captured for which username and when.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.jsonl')
+
+    def _object_path(self, key):
+        return os.path.join(self.root, 'objects', key[:2], f'{key}.gz')
+
+    def put_object(self, data):
+        """Store bytes once and return their sha256 key"""
+        key = hashlib.sha256(data).hexdigest()
+        path = self._object_path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.tmp'
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return key
+
+    def get_object(self, key):
+        with gzip.open(self._object_path(key), 'rb') as f:
+            return f.read()
+
+    def add(self, username, captured_at, html, jsonld_scripts):
+        """Store one capture and append it to the index"""
+        record = {
+            "username": username,
+            "captured_at": captured_at,
+            "html": self.put_object(html.encode('utf-8')),
+            "jsonld": self.put_object(
+                json.dumps(jsonld_scripts, ensure_ascii=False).encode('utf-8'))
+        }
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def records(self):
+        """All index records, oldest first"""
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def latest(self):
+        """Map normalized username -> newest capture record"""
+        latest = {}
+        for record in self.records():
+            latest[normalize_username(record["username"])] = record
+        return latest
+
+
+class CaptureWriter:
+    """Write captures from a background thread
+
+    submit() only enqueues the page, so the scraping thread never waits on
+    compression or disk writes.
+    """
+
+    def __init__(self, root):
+        self.store = CaptureStore(root)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run,
+                                        name='capture-writer',
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, username, html, jsonld_scripts):
+        self._queue.put((username, time.time(), html, list(jsonld_scripts)))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self.store.add(*item)
+            except Exception as e:
+                logger.error(f"Failed to write capture for {item[0]}: {str(e)}")
+
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+class ProfileHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        path = urllib.parse.urlparse(self.path).path
+        if path.startswith('/assets/'):
+            asset = server.asset(path[len('/assets/'):])
+            if asset is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            content_type, body = asset
+            server.request_count += 1
+            server.bytes_sent += len(body)
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            # Fingerprinted bundles, cached for good like mrivals.gg's
+            self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if not path.startswith('/player/'):
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        # Injected failures, for load tests
+        if server.stall_rate and random.random() < server.stall_rate:
+            time.sleep(server.stall_time)
+        if server.failure_rate and random.random() < server.failure_rate:
+            server.failures += 1
+            self.send_response(503)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(UNAVAILABLE_PAGE)))
+            self.end_headers()
+            self.wfile.write(UNAVAILABLE_PAGE)
+            return
+
+        username = urllib.parse.unquote(path[len('/player/'):])
+        body = server.render(username)
+        status = 200
+        if body is None:
+            status, body = 404, NOT_CAPTURED_PAGE
+        server.request_count += 1
+        server.bytes_sent += len(body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ProfileServer(ThreadingHTTPServer):
+    """Local stand-in for mrivals.gg serving /player/<username>
+
+    Subclasses implement render(username), returning the page as bytes or
+    None for an unknown player, and may implement asset(name), returning
+    (content_type, bytes) for /assets/<name>.
+
+    Every request waits `latency` seconds. For load tests, a share
+    `failure_rate` of profile requests get a 503, and a share `stall_rate`
+    are held for `stall_time` seconds first, long enough for the page load
+    to time out.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, failure_rate=0.0, stall_rate=0.0,
+                 stall_time=30.0):
+        super().__init__(('127.0.0.1', port), ProfileHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.stall_rate = stall_rate
+        self.stall_time = stall_time
+        self.failures = 0
+        self.request_count = 0
+        self.bytes_sent = 0
+        self._thread = None
+
+    def render(self, username):
+        raise NotImplementedError
+
+    def asset(self, name):
+        return None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        """Serve in a background thread and return the base URL"""
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class ReplayServer(ProfileServer):
+    """Serve the newest capture of each profile from a capture directory"""
+
+    def __init__(self, root, port=0, latency=0.0):
+        super().__init__(port, latency)
+        self.store = CaptureStore(root)
+        self._pages = {}
+        for key, record in self.store.latest().items():
+            self._pages[key] = self.store.get_object(record["html"])
+
+    def render(self, username):
+        return self._pages.get(normalize_username(username))
+
+    def usernames(self):
+        return sorted(self._pages)
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python capture.py <capture_dir> [port]")
+        sys.exit(1)
+    server = ReplayServer(sys.argv[1],
+                          port=int(sys.argv[2]) if len(sys.argv) > 2 else 8765)
+    print(f"Replaying {len(server.usernames())} captured profiles at "
+          f"{server.base_url}/player/<username>")
+    server.serve_forever()
@@ -0,0 +1,411 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import urllib.parse
+from collections import defaultdict
+
+import aiohttp
+
+from extraction import (EXTRACT_JSONLD_SCRIPT, EXTRACT_PLAYER_SCRIPT,
+                        PROFILE_SECTIONS, UNKNOWN_STATS,
+                        WAIT_FOR_SECTIONS_SCRIPT, build_hero_cards,
+                        build_player_data, build_top_data,
+                        find_player_entity, profile_exists, sections_args)
+from deadline import DeadlineExceeded
+from profile_cache import UpstreamError
+
+logger = logging.getLogger(__name__)
+
+# Same locations create_driver checks, plus the local Windows installs
+CHROME_PATHS = [
+    '/usr/bin/google-chrome-stable',
+    '/usr/bin/google-chrome',
+    '/usr/bin/chromium-browser',
+    '/usr/bin/chromium',
+    "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+    "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe",
+]
+
+# Requests the profile pages never need for extraction
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.mp4", "*.webm"
+]
+
+
+class CdpError(Exception):
+    """Raised when Chrome answers a DevTools command with an error"""
+
+
+def find_chrome_binary():
+    """Return the Chrome binary to launch, or None if none is installed"""
+    for path in [os.getenv('CHROME_BINARY')] + CHROME_PATHS:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+class CdpConnection:
+    """Minimal Chrome DevTools Protocol client over one websocket
+
+    Uses flattened target sessions, so every page shares the browser's
+    websocket and commands are routed by session id.
+    """
+
+    def __init__(self, ws):
+        self._ws = ws
+        self._next_id = 0
+        self._pending = {}
+        self._event_waiters = defaultdict(list)
+        self._reader = asyncio.ensure_future(self._read_loop())
+
+    async def send(self, method, params=None, session_id=None):
+        """Send a command and return its result"""
+        self._next_id += 1
+        command_id = self._next_id
+        message = {"id": command_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_event_loop().create_future()
+        self._pending[command_id] = future
+        try:
+            await self._ws.send_str(json.dumps(message))
+            return await future
+        finally:
+            # Forget commands that timed out or were cancelled too
+            self._pending.pop(command_id, None)
+
+    def wait_for_event(self, method, session_id):
+        """Return a future resolved with the params of the next event"""
+        future = asyncio.get_event_loop().create_future()
+        self._event_waiters[(session_id, method)].append(future)
+        return future
+
+    async def _read_loop(self):
+        try:
+            async for message in self._ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                data = json.loads(message.data)
+                if "id" in data:
+                    future = self._pending.pop(data["id"], None)
+                    if future is None or future.done():
+                        continue
+                    if "error" in data:
+                        future.set_exception(
+                            CdpError(data["error"].get("message", "CDP error")))
+                    else:
+                        future.set_result(data.get("result", {}))
+                else:
+                    key = (data.get("sessionId"), data.get("method"))
+                    for future in self._event_waiters.pop(key, []):
+                        if not future.done():
+                            future.set_result(data.get("params", {}))
+        finally:
+            # Fail everything still waiting once the browser goes away
+            error = ConnectionError("DevTools connection closed")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            for waiters in self._event_waiters.values():
+                for future in waiters:
+                    if not future.done():
+                        future.set_exception(error)
+            self._pending.clear()
+            self._event_waiters.clear()
+
+    @property
+    def closed(self):
+        return self._ws.closed
+
+    async def close(self):
+        await self._ws.close()
+        self._reader.cancel()
+
+
+class CdpEngine:
+    """Scrape mrivals.gg by talking to headless Chrome over CDP directly
+
+    No chromedriver is involved, so there is no driver/browser version to
+    keep in step. One browser is shared; each session is an isolated
+    browser context with a single page target.
+    """
+
+    def __init__(self, base_url, timeout, page_load_timeout, user_agent,
+                 chrome_binary=None, capture_writer=None, supervisor=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.page_load_timeout = page_load_timeout
+        self.user_agent = user_agent
+        self.chrome_binary = chrome_binary
+        self.capture_writer = capture_writer
+        self.supervisor = supervisor
+        self.process = None
+        self._http = None
+        self._connection = None
+        self._user_data_dir = None
+        self._stderr_task = None
+        self._start_lock = None
+
+    async def _launch(self):
+        """Start Chrome and connect to its DevTools websocket"""
+        chrome_binary = self.chrome_binary or find_chrome_binary()
+        if not chrome_binary:
+            raise FileNotFoundError(
+                "Chrome binary not found. Set CHROME_BINARY.")
+
+        self._user_data_dir = tempfile.mkdtemp(prefix='cdp-chrome-')
+        self.process = await asyncio.create_subprocess_exec(
+            chrome_binary,
+            '--headless=new',
+            '--remote-debugging-port=0',
+            f'--user-data-dir={self._user_data_dir}',
+            '--no-sandbox',
+            '--disable-dev-shm-usage',
+            '--disable-gpu',
+            '--disable-extensions',
+            '--disable-blink-features=AutomationControlled',
+            '--no-first-run',
+            '--no-default-browser-check',
+            'about:blank',
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE)
+        if self.supervisor:
+            self.supervisor.register(self.process.pid, "cdp chrome",
+                                     long_lived=True)
+
+        # Chrome prints the browser websocket URL once it is listening
+        ws_url = None
+        while ws_url is None:
+            line = await asyncio.wait_for(self.process.stderr.readline(),
+                                          self.page_load_timeout)
+            if not line:
+                raise ConnectionError("Chrome exited before DevTools started")
+            text = line.decode('utf-8', 'replace').strip()
+            if text.startswith('DevTools listening on '):
+                ws_url = text[len('DevTools listening on '):]
+
+        # Keep draining stderr so Chrome never blocks on a full pipe
+        self._stderr_task = asyncio.ensure_future(self._drain_stderr())
+
+        self._http = aiohttp.ClientSession()
+        ws = await self._http.ws_connect(ws_url, max_msg_size=0)
+        self._connection = CdpConnection(ws)
+        logger.info(f"Chrome started over CDP (pid {self.process.pid})")
+
+    async def _drain_stderr(self):
+        while await self.process.stderr.readline():
+            pass
+
+    async def _ensure_browser(self):
+        # Created lazily so the lock belongs to the running event loop
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._connection and not self._connection.closed:
+                return self._connection
+            await self.close()
+            await self._launch()
+            return self._connection
+
+    async def new_session(self):
+        """Create an isolated browser context with one page"""
+        connection = await self._ensure_browser()
+        context = await connection.send('Target.createBrowserContext',
+                                        {"disposeOnDetach": True})
+        context_id = context["browserContextId"]
+        target = await connection.send('Target.createTarget', {
+            "url": "about:blank",
+            "browserContextId": context_id
+        })
+        attached = await connection.send('Target.attachToTarget', {
+            "targetId": target["targetId"],
+            "flatten": True
+        })
+        session_id = attached["sessionId"]
+
+        await connection.send('Page.enable', session_id=session_id)
+        await connection.send('Network.enable', session_id=session_id)
+        await connection.send('Network.setUserAgentOverride',
+                              {"userAgent": self.user_agent},
+                              session_id=session_id)
+        await connection.send('Network.setBlockedURLs',
+                              {"urls": BLOCKED_URL_PATTERNS},
+                              session_id=session_id)
+        return {
+            "context_id": context_id,
+            "target_id": target["targetId"],
+            "session_id": session_id
+        }
+
+    async def close_session(self, session):
+        """Close a session's page and browser context, ignoring errors"""
+        connection = self._connection
+        if connection is None or connection.closed:
+            return
+        try:
+            await connection.send('Target.closeTarget',
+                                  {"targetId": session["target_id"]})
+            await connection.send('Target.disposeBrowserContext',
+                                  {"browserContextId": session["context_id"]})
+        except (CdpError, ConnectionError) as e:
+            logger.debug(f"Failed to close CDP session: {str(e)}")
+
+    async def close(self):
+        """Shut down the browser and its DevTools connection"""
+        if self._connection:
+            await self._connection.close()
+            self._connection = None
+        if self._http:
+            await self._http.close()
+            self._http = None
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+        if self.process and self.supervisor:
+            self.supervisor.release(self.process.pid)
+        if self._stderr_task:
+            self._stderr_task.cancel()
+            self._stderr_task = None
+        if self._user_data_dir:
+            shutil.rmtree(self._user_data_dir, ignore_errors=True)
+            self._user_data_dir = None
+
+    async def evaluate(self, session, expression, *args):
+        """Call a JS function expression in the page and return its value"""
+        call = f"({expression})({', '.join(json.dumps(a) for a in args)})"
+        result = await self._connection.send('Runtime.evaluate', {
+            "expression": call,
+            "awaitPromise": True,
+            "returnByValue": True
+        },
+                                             session_id=session["session_id"])
+        if "exceptionDetails" in result:
+            raise CdpError(result["exceptionDetails"].get("text", "JS error"))
+        return result["result"].get("value")
+
+    async def _open_profile(self, session, username, sections=("jsonld", ),
+                            deadline=None):
+        """Navigate to a profile and wait for the given sections to render
+
+        Returns True once the player rendered and False when the player
+        does not exist. Raises UpstreamError when the page failed or
+        answered with an error, see profile_exists. With
+        a deadline, navigation and the wait are cut short when it runs out:
+        sections still missing are recorded as skipped, and
+        DeadlineExceeded is raised if the JSON-LD never appeared.
+        """
+        connection = self._connection
+        session_id = session["session_id"]
+        profile_url = f"{self.base_url}/player/{urllib.parse.quote(username)}"
+        page_load_timeout = self.page_load_timeout
+        timeout = self.timeout
+        if deadline:
+            if deadline.expired:
+                deadline.skip("profile")
+                raise DeadlineExceeded(f"no time left to load {username}")
+            page_load_timeout = deadline.cap(page_load_timeout)
+            timeout = deadline.cap(timeout)
+
+        loaded = connection.wait_for_event('Page.domContentEventFired',
+                                           session_id)
+        try:
+            navigation = await asyncio.wait_for(
+                connection.send('Page.navigate', {"url": profile_url},
+                                session_id=session_id),
+                page_load_timeout)
+            if navigation.get("errorText"):
+                raise UpstreamError(
+                    f"Could not load {profile_url}: {navigation['errorText']}")
+            await asyncio.wait_for(loaded, page_load_timeout)
+        except (asyncio.TimeoutError, CdpError, ConnectionError) as e:
+            loaded.cancel()
+            if deadline and deadline.expired:
+                deadline.skip("profile")
+                raise DeadlineExceeded(
+                    f"ran out of time loading {profile_url}") from e
+            raise UpstreamError(f"Could not load {profile_url}: {str(e)}") from e
+
+        try:
+            readiness = await self.evaluate(
+                session, WAIT_FOR_SECTIONS_SCRIPT,
+                sections_args(sections, timeout))
+        except (CdpError, ConnectionError) as e:
+            logger.warning(f"Readiness check failed for {username}: {str(e)}")
+            readiness = None
+        if readiness:
+            logger.debug(
+                f"Sections for {username} after {readiness['elapsed']}ms: "
+                f"{readiness['timings']}, missing {readiness['missing']}")
+            if deadline and readiness["missing"] and timeout < self.timeout:
+                deadline.skip(*readiness["missing"])
+        ready = profile_exists(readiness, profile_url, deadline)
+        if ready and self.capture_writer:
+            try:
+                self.capture_writer.submit(
+                    username,
+                    await self.evaluate(
+                        session, "() => document.documentElement.outerHTML"),
+                    await self.evaluate(session, EXTRACT_JSONLD_SCRIPT))
+            except CdpError as e:
+                logger.error(f"Failed to capture profile for {username}: {str(e)}")
+        return ready
+
+    async def get_player_data(self, session, username,
+                              known_match_keys=frozenset(), deadline=None):
+        """Same contract as get_player_data in the Selenium engine"""
+        if not await self._open_profile(session, username, PROFILE_SECTIONS,
+                                        deadline):
+            return None, [], dict(UNKNOWN_STATS), []
+        try:
+            raw = await self.evaluate(session, EXTRACT_PLAYER_SCRIPT)
+        except (CdpError, ConnectionError) as e:
+            raise UpstreamError(
+                f"CDP extraction failed for {username}: {str(e)}") from e
+        result = build_player_data(raw, known_match_keys)
+        if not result[0]:
+            raise UpstreamError(f"Could not read player data for {username}")
+        return result
+
+    async def get_player_data_for_top(self, session, username, heroes=False):
+        """Same contract as get_player_data_for_top in the Selenium engine"""
+        if not await self._open_profile(
+                session, username,
+                ("jsonld", "heroes") if heroes else ("jsonld", )):
+            return build_top_data(None, username)
+        try:
+            if heroes:
+                raw = await self.evaluate(session, EXTRACT_PLAYER_SCRIPT)
+                player_data = find_player_entity(raw["jsonld"])
+                top_heroes = build_hero_cards(raw)
+            else:
+                player_data = find_player_entity(
+                    await self.evaluate(session, EXTRACT_JSONLD_SCRIPT))
+                top_heroes = None
+        except (CdpError, ConnectionError) as e:
+            raise UpstreamError(
+                f"CDP extraction failed for {username}: {str(e)}") from e
+        if not player_data:
+            raise UpstreamError(f"Could not read player data for {username}")
+        return build_top_data(player_data, username, top_heroes)
+
+    async def get_player_summary(self, session, username, deadline=None):
+        """Same contract as get_player_summary in the Selenium engine"""
+        if not await self._open_profile(session, username,
+                                        deadline=deadline):
+            return None, [], dict(UNKNOWN_STATS), []
+        try:
+            player_data = find_player_entity(
+                await self.evaluate(session, EXTRACT_JSONLD_SCRIPT))
+        except (CdpError, ConnectionError) as e:
+            raise UpstreamError(
+                f"CDP extraction failed for {username}: {str(e)}") from e
+        if not player_data:
+            raise UpstreamError(f"Could not read player data for {username}")
+        return player_data["mainEntity"], [], dict(UNKNOWN_STATS), []
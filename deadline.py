@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+# How skipped stages are described to users
+STAGE_NAMES = {
+    "profile": "fresh profile data",
+    "jsonld": "the rank",
+    "stats": "career stats",
+    "heroes": "top heroes",
+    "matches": "new matches",
+    "embeds": "the rest of the reply"
+}
+
+
+class DeadlineExceeded(Exception):
+    """A command ran out of time before a stage could start or finish"""
+
+
+class Deadline:
+    """Time budget for one command, passed through every stage serving it
+
+    Each stage caps its own timeout with cap(), checks `expired` before
+    starting and records what it had to leave out with skip(), so the
+    reply can be sent with what was extracted and a note about the rest.
+    Stages may run on executor threads; the deadline is only read there.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.skipped = []
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def cap(self, timeout):
+        """`timeout`, shortened to the time left"""
+        return min(timeout, self.remaining())
+
+    def skip(self, *stages):
+        for stage in stages:
+            if stage not in self.skipped:
+                self.skipped.append(stage)
+
+    async def wait(self, awaitable):
+        """Await within the time left, raising DeadlineExceeded after it"""
+        try:
+            return await asyncio.wait_for(awaitable, self.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(
+                f"out of time after {self.seconds:g}s") from None
+
+    def note(self):
+        """A line telling the user what was skipped, or None"""
+        if not self.skipped:
+            return None
+        names = [STAGE_NAMES.get(stage, stage) for stage in self.skipped]
+        if len(names) > 1:
+            names = [", ".join(names[:-1]) + " and " + names[-1]]
+        return f"⏱️ Out of time after {self.seconds:g}s, left out {names[0]}."
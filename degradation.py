@@ -0,0 +1,125 @@
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Service modes, from full service down to answering from cache only
+FULL = "full"
+SUMMARY = "summary"
+STALE = "stale"
+CACHE_ONLY = "cache_only"
+
+MODES = [FULL, SUMMARY, STALE, CACHE_ONLY]
+
+MODE_DESCRIPTIONS = {
+    FULL: "Full profiles with heroes and matches",
+    SUMMARY: "Rank summaries only, no heroes or match cards",
+    STALE: "Recent snapshots served before scraping",
+    CACHE_ONLY: "Cached data only, no scraping"
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class DegradationController:
+    """Step down through service modes while latency SLOs are breached
+
+    Pressure is high when the p90 of command latencies exceeds
+    `latency_slo`, or more than `max_queue_depth` jobs are waiting for a
+    browser. Latencies are taken from the last `window` seconds, but only
+    since the last mode change, so each mode is judged on its own samples
+    rather than on those of the heavier mode before it. Each high reading
+    drops one mode, at most once per `step_interval` seconds. Once
+    pressure has stayed below half of both limits for `recovery_period`
+    seconds the controller climbs back one mode at a time.
+
+    evaluate() runs whenever a latency is recorded or the mode is read;
+    call it on a timer too, so an idle bot still recovers on schedule.
+    """
+
+    def __init__(self, latency_slo, max_queue_depth, queue_depth,
+                 window=120, step_interval=15, recovery_period=60):
+        self.latency_slo = latency_slo
+        self.max_queue_depth = max_queue_depth
+        self.queue_depth = queue_depth
+        self.window = window
+        self.step_interval = step_interval
+        self.recovery_period = recovery_period
+        self._level = 0
+        self._samples = deque()
+        self._changed_at = time.monotonic()
+        self._calm_since = None
+
+    @property
+    def mode(self):
+        """Current mode, re-evaluated against the latest readings"""
+        self.evaluate()
+        return MODES[self._level]
+
+    def record_latency(self, seconds):
+        """Record how long a command took end to end"""
+        self._samples.append((time.monotonic(), seconds))
+        self.evaluate()
+
+    def _recent_latencies(self, now):
+        while self._samples and now - self._samples[0][0] > self.window:
+            self._samples.popleft()
+        return [seconds for _, seconds in self._samples]
+
+    def p90_latency(self):
+        """p90 of recent command latencies, or None without samples"""
+        latencies = self._recent_latencies(time.monotonic())
+        return percentile(latencies, 0.9) if latencies else None
+
+    def evaluate(self):
+        """Move one mode down under pressure, or one up after calm"""
+        now = time.monotonic()
+        self._recent_latencies(now)
+        # Only what the current mode served counts towards the next step
+        latencies = [seconds for at, seconds in self._samples
+                     if at >= self._changed_at]
+        p90 = percentile(latencies, 0.9) if latencies else 0.0
+        depth = self.queue_depth()
+
+        if p90 > self.latency_slo or depth > self.max_queue_depth:
+            self._calm_since = None
+            if (self._level < len(MODES) - 1
+                    and now - self._changed_at >= self.step_interval):
+                self._set_level(self._level + 1, now, p90, depth)
+            return
+
+        if p90 > self.latency_slo / 2 or depth > self.max_queue_depth / 2:
+            # Neither breached nor calm enough to recover
+            self._calm_since = None
+            return
+
+        if self._calm_since is None:
+            self._calm_since = now
+        if self._level and now - self._calm_since >= self.recovery_period:
+            self._set_level(self._level - 1, now, p90, depth)
+            # Wait a full period again before the next step up
+            self._calm_since = now
+
+    def _set_level(self, level, now, p90, depth):
+        logger.warning(
+            f"Service mode {MODES[self._level]} -> {MODES[level]} "
+            f"(p90 latency {p90:.1f}s, queue depth {depth})")
+        self._level = level
+        self._changed_at = now
+
+    def status(self):
+        """Snapshot of the controller for monitoring"""
+        mode = self.mode
+        return {
+            "mode": mode,
+            "description": MODE_DESCRIPTIONS[mode],
+            "p90_latency": self.p90_latency(),
+            "queue_depth": self.queue_depth(),
+            "samples": len(self._samples)
+        }
@@ -0,0 +1,299 @@
+import json
+
+from deadline import DeadlineExceeded
+from match_history import match_key
+from profile_cache import UpstreamError
+
+# Runs in the profile page and returns everything get_player_data reads,
+# using the same selectors, in a single round trip
+EXTRACT_PLAYER_SCRIPT = r"""
+() => {
+    const xpathAll = (xpath, context) => {
+        const result = document.evaluate(xpath, context || document, null,
+            XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const nodes = [];
+        for (let i = 0; i < result.snapshotLength; i++) {
+            nodes.push(result.snapshotItem(i));
+        }
+        return nodes;
+    };
+    const text = (element, selector) => {
+        const node = element.querySelector(selector);
+        return node ? node.innerText : null;
+    };
+    const statValue = (label) => {
+        const node = xpathAll("//span[contains(@class, 'text-xl font-bold text-white') and following-sibling::span[contains(text(), '" + label + "')]]")[0];
+        return node ? node.innerText.trim() : null;
+    };
+
+    const jsonld = Array.from(
+        document.querySelectorAll("script[type='application/ld+json']"))
+        .map((script) => script.innerHTML);
+
+    const timePlayed = xpathAll("//*[contains(text(), 'Time Played:')]")[0];
+    const stats = {
+        time_played: timePlayed ?
+            timePlayed.innerText.replace('Time Played:', '').trim() : null,
+        total_matches: statValue('Total Matches'),
+        wins: statValue('Wins'),
+        losses: statValue('Losses'),
+    };
+
+    const heroes = xpathAll("//div[contains(@class, 'flex items-center bg-dark-200') and .//h3[contains(@class, 'text-white text-sm font-bold')]]")
+        .slice(0, 3).map((hero) => {
+            const img = hero.querySelector("img.w-16.h-16.rounded-full");
+            return {
+                name: text(hero, "h3.text-white.text-sm.font-bold"),
+                matches: text(hero, "p.text-xs.text-gray-400"),
+                win_rate: text(hero, "div.text-right.flex.flex-col.justify-center div.text-white.font-bold.text-sm"),
+                w_l: text(hero, "div.text-right.flex.flex-col.justify-center div.text-xs.text-gray-400.mt-1"),
+                image_url: img ? img.getAttribute("src") : null,
+            };
+        });
+
+    const matches = xpathAll("//div[contains(@class, 'bg-dark-200') and .//div[contains(@class, 'absolute left-0 top-0')]]")
+        .slice(0, 10).map((match) => {
+            const resultDiv = match.querySelector("div.absolute.left-0.top-0");
+            const matchStats = {};
+            match.querySelectorAll("div.text-center").forEach((stat) => {
+                const value = text(stat, "div.text-2xl.font-bold");
+                const label = text(stat, "p.text-xs.text-gray-400");
+                if (value !== null && label !== null) {
+                    matchStats[label] = value;
+                }
+            });
+            return {
+                is_win: resultDiv ?
+                    resultDiv.className.includes("bg-green-500") : null,
+                details: text(match, "p.text-xs.text-gray-400"),
+                stats: matchStats,
+            };
+        });
+
+    return {jsonld: jsonld, stats: stats, heroes: heroes, matches: matches};
+}
+"""
+
+# Returns the raw JSON-LD scripts, all get_player_data_for_top needs
+EXTRACT_JSONLD_SCRIPT = r"""
+() => Array.from(
+    document.querySelectorAll("script[type='application/ld+json']"))
+    .map((script) => script.innerHTML)
+"""
+
+# Resolves as soon as every requested section is in the page, using a
+# MutationObserver instead of polling, or after `timeoutMs` with the
+# sections still missing. It never resolves early on a quiet page, so a
+# section that renders late is never read half-rendered. `jsonld` is the
+# player entity, the same document find_player_entity looks for, not the
+# site-wide schema that is in the page from the start. A "not found" page
+# resolves straight away. The result also carries the HTTP status of the
+# page, where the browser reports it. Timings are in ms from when the
+# script started.
+WAIT_FOR_SECTIONS_SCRIPT = r"""
+({sections, timeoutMs}) => new Promise((resolve) => {
+    const xpathCount = (xpath) => document.evaluate("count(" + xpath + ")",
+        document, null, XPathResult.NUMBER_TYPE, null).numberValue;
+    const checks = {
+        jsonld: () => Array.from(
+            document.querySelectorAll("script[type='application/ld+json']"))
+            .some((script) => script.textContent.includes("mainEntity")
+                && script.textContent.includes("Rank")),
+        stats: () => xpathCount("//span[contains(text(), 'Total Matches')]") > 0,
+        heroes: () => xpathCount("//div[contains(@class, 'flex items-center bg-dark-200') and .//h3[contains(@class, 'text-white text-sm font-bold')]]") > 0,
+        matches: () => xpathCount("//div[contains(@class, 'bg-dark-200') and .//div[contains(@class, 'absolute left-0 top-0')]]") > 0,
+    };
+    const notFound = () => /not found/i.test(document.title);
+    const navigation = performance.getEntriesByType("navigation")[0];
+    const status = navigation && navigation.responseStatus ?
+        navigation.responseStatus : null;
+    const start = performance.now();
+    const timings = {};
+    let finished = false;
+
+    const finish = () => {
+        if (finished) {
+            return;
+        }
+        finished = true;
+        observer.disconnect();
+        clearTimeout(timeoutTimer);
+        const missing = sections.filter((name) => !(name in timings));
+        resolve({ready: missing.length === 0, timings: timings,
+                 missing: missing, status: status,
+                 notFound: status === 404 || notFound(),
+                 elapsed: Math.round(performance.now() - start)});
+    };
+    const check = () => {
+        for (const name of sections) {
+            if (!(name in timings) && checks[name]()) {
+                timings[name] = Math.round(performance.now() - start);
+            }
+        }
+        if (sections.every((name) => name in timings) || notFound()) {
+            finish();
+        }
+    };
+
+    const observer = new MutationObserver(check);
+    observer.observe(document, {childList: true, subtree: true,
+                                characterData: true});
+    const timeoutTimer = setTimeout(finish, timeoutMs);
+    check();
+})
+"""
+
+# Sections get_player_data reads; get_player_data_for_top needs jsonld, and
+# heroes on roster refreshes
+PROFILE_SECTIONS = ("jsonld", "stats", "heroes", "matches")
+
+
+def sections_args(sections, timeout):
+    """Argument object for WAIT_FOR_SECTIONS_SCRIPT"""
+    return {
+        "sections": list(sections),
+        "timeoutMs": int(timeout * 1000)
+    }
+
+
+def profile_exists(readiness, profile_url, deadline=None):
+    """Classify a profile page from WAIT_FOR_SECTIONS_SCRIPT's result
+
+    Returns True once the player entity has rendered, and False for a
+    missing player: HTTP 404, a "not found" page, or a page that loaded
+    without the player entity, which is how mrivals.gg renders an unknown
+    username. Raises UpstreamError for other non-2xx statuses and a failed
+    readiness check (`readiness` None), and DeadlineExceeded when the
+    entity was still missing once the deadline ran out.
+    """
+    if readiness is None:
+        raise UpstreamError(f"Readiness check failed on {profile_url}")
+    if readiness.get("notFound"):
+        return False
+    status = readiness.get("status")
+    if status and not 200 <= status < 300:
+        raise UpstreamError(f"{profile_url} answered HTTP {status}")
+    if "jsonld" not in readiness["timings"]:
+        if deadline and deadline.expired:
+            raise DeadlineExceeded(f"ran out of time reading {profile_url}")
+        return False
+    return True
+
+
+def selenium_async_script(script):
+    """Wrap a promise-returning function for execute_async_script"""
+    return ("const done = arguments[arguments.length - 1];\n"
+            f"({script})(arguments[0]).then(done);")
+
+
+UNKNOWN_STATS = {
+    "time_played": "Unknown",
+    "total_matches": "Unknown",
+    "wins": "Unknown",
+    "losses": "Unknown"
+}
+
+
+def is_private_profile(rank_value, win_rate):
+    """Private profiles report Unranked with a 0% win rate"""
+    return rank_value == "Unranked" and win_rate == "0%"
+
+
+def find_player_entity(jsonld_scripts):
+    """Return the parsed JSON-LD document holding the player, or None"""
+    for script_content in jsonld_scripts:
+        try:
+            if "mainEntity" in script_content and "Rank" in script_content:
+                player_data = json.loads(script_content)
+                if "mainEntity" in player_data:
+                    return player_data
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def build_hero_cards(raw):
+    """Turn the hero cards in EXTRACT_PLAYER_SCRIPT output into hero dicts"""
+    top_heroes = []
+    for i, hero in enumerate(raw.get("heroes", []), 1):
+        if None in (hero["name"], hero["matches"], hero["win_rate"],
+                    hero["w_l"]):
+            continue
+        img_url = hero.get("image_url")
+        if img_url and img_url.startswith("/"):
+            img_url = f"https://mrivals.gg{img_url}"
+        top_heroes.append({
+            "name": hero["name"],
+            "matches": hero["matches"],
+            "win_rate": hero["win_rate"],
+            "w_l": hero["w_l"],
+            "rank": i,
+            "image_url": img_url
+        })
+    return top_heroes
+
+
+def build_player_data(raw, known_match_keys=frozenset()):
+    """Turn EXTRACT_PLAYER_SCRIPT output into get_player_data's result"""
+    player_data = find_player_entity(raw.get("jsonld", []))
+    if not player_data:
+        return None, [], dict(UNKNOWN_STATS), []
+
+    stats = {
+        key: value or UNKNOWN_STATS[key]
+        for key, value in raw.get("stats", {}).items()
+    }
+
+    top_heroes = build_hero_cards(raw)
+
+    recent_matches = []
+    for match in raw.get("matches", []):
+        if match["is_win"] is None or match["details"] is None:
+            continue
+        # Older matches are already in the history store
+        if match_key(match["details"], match["stats"]) in known_match_keys:
+            break
+        recent_matches.append({
+            "result": "Victory" if match["is_win"] else "Defeat",
+            "is_win": match["is_win"],
+            "details": match["details"],
+            "stats": match["stats"]
+        })
+
+    return player_data["mainEntity"], top_heroes, stats, recent_matches
+
+
+def build_top_data(player_data, username, top_heroes=None):
+    """Turn a player JSON-LD document into get_player_data_for_top's result
+
+    `top_heroes`, hero dicts from build_hero_cards, are passed on under
+    "heroes" for roster refreshes that read them.
+    """
+    if not player_data:
+        return {"name": username, "rank": "Unknown", "win_rate": "Unknown"}
+
+    rank_value = "Unknown"
+    win_rate = "Unknown"
+    for prop in player_data["mainEntity"].get("additionalProperty", []):
+        name = prop.get("name")
+        if name == "Rank":
+            rank_value = prop.get("value", "Unknown")
+        elif name == "Win Rate":
+            win_rate = prop.get("value", "Unknown")
+
+    # If we get Unranked and 0% win rate, show as Private Profile
+    if is_private_profile(rank_value, win_rate):
+        return {
+            "name": username,
+            "rank": "Private Profile",
+            "win_rate": "Private Profile"
+        }
+
+    top_data = {
+        "name": player_data["mainEntity"].get("name", username),
+        "rank": rank_value,
+        "win_rate": win_rate
+    }
+    if top_heroes is not None:
+        top_data["heroes"] = top_heroes
+    return top_data
@@ -0,0 +1,179 @@
+import json
+
+from profile_cache import normalize_username
+from snapshot import HeroStat
+from storage import write_atomic
+
+# Words players use for each role
+ROLE_ALIASES = {
+    "vanguard": "Vanguard",
+    "tank": "Vanguard",
+    "duelist": "Duelist",
+    "dps": "Duelist",
+    "damage": "Duelist",
+    "strategist": "Strategist",
+    "support": "Strategist",
+    "healer": "Strategist"
+}
+
+# Fewer matches than this on a hero ranks a player below everyone who
+# has played it enough for the win rate to mean something
+MIN_HERO_MATCHES = 10
+
+
+def hero_entry(player, hero):
+    """Turn a parsed HeroStat into an index entry"""
+    return {
+        "player": player,
+        "matches": hero.matches,
+        "win_rate": hero.win_rate,
+        "w_l": hero.w_l,
+        "image_url": hero.image_url
+    }
+
+
+def best_key(entry):
+    return (entry["matches"] >= MIN_HERO_MATCHES, entry["win_rate"],
+            entry["matches"])
+
+
+class HeroIndex:
+    """Top heroes of every roster player, keyed by hero
+
+    Scraped hero names are matched case-insensitively against `heroes`,
+    the known hero names. Each update replaces one player's heroes and
+    re-ranks only the heroes that changed, so the ranking of players on a
+    hero and the most-played heroes overall and per role are ready to
+    read without any work at query time.
+    """
+
+    def __init__(self, path=None, heroes=(), roles=None):
+        self.path = path
+        self.roles = roles or {}
+        self._hero_names = {normalize_username(hero): hero for hero in heroes}
+        self._players = {}  # normalized player -> {hero: entry}
+        self._entries = {}  # hero -> {normalized player: entry}
+        self._ranked = {}  # hero -> entries, best player first
+        self._totals = {}  # hero -> summary across players
+        self._most_played = {}  # role or None -> hero summaries
+
+    def __len__(self):
+        return len(self._players)
+
+    def resolve_hero(self, name):
+        """Return the known hero name for `name`, ignoring case"""
+        return self._hero_names.get(normalize_username(name))
+
+    def resolve_role(self, name):
+        """Return the role for a role name or alias such as "tank" """
+        return ROLE_ALIASES.get(normalize_username(name))
+
+    def update(self, player, top_heroes):
+        """Replace a player's heroes, returning True if the index changed
+
+        `top_heroes` are the HeroStat cards of a PlayerSnapshot.
+        """
+        key = normalize_username(player)
+        entries = {}
+        for hero in top_heroes:
+            name = self.resolve_hero(hero.name) or hero.name
+            entries[name] = hero_entry(player, hero)
+
+        previous = self._players.get(key, {})
+        if previous == entries:
+            return False
+        self._players[key] = entries
+
+        changed = set(previous) | set(entries)
+        for hero in changed:
+            by_player = self._entries.setdefault(hero, {})
+            if hero in entries:
+                by_player[key] = entries[hero]
+            else:
+                by_player.pop(key, None)
+            if not by_player:
+                del self._entries[hero]
+                self._ranked.pop(hero, None)
+                self._totals.pop(hero, None)
+                continue
+            self._rank_hero(hero)
+        self._rank_most_played()
+        return True
+
+    def _rank_hero(self, hero):
+        entries = list(self._entries[hero].values())
+        self._ranked[hero] = sorted(entries, key=best_key, reverse=True)
+        matches = sum(entry["matches"] for entry in entries)
+        wins = sum(entry["matches"] * entry["win_rate"] / 100
+                   for entry in entries)
+        self._totals[hero] = {
+            "hero": hero,
+            "role": self.roles.get(hero),
+            "players": len(entries),
+            "matches": matches,
+            "win_rate": wins / matches * 100 if matches else 0.0
+        }
+
+    def _rank_most_played(self):
+        ordered = sorted(self._totals.values(),
+                         key=lambda totals: (totals["matches"], totals["players"]),
+                         reverse=True)
+        most_played = {None: ordered}
+        for totals in ordered:
+            most_played.setdefault(totals["role"], []).append(totals)
+        self._most_played = most_played
+
+    def best(self, hero, limit=5):
+        """Players with the best win rate on a hero, most practised first"""
+        return self._ranked.get(hero, [])[:limit]
+
+    def hero_totals(self, hero):
+        """Matches, players and combined win rate for a hero, or None"""
+        return self._totals.get(hero)
+
+    def most_played(self, role=None, limit=5):
+        """Heroes by total matches across players, optionally for one role"""
+        return self._most_played.get(role, [])[:limit]
+
+    def to_json(self):
+        """Serialize every player's entries as a JSON string"""
+        players = {}
+        for entries in self._players.values():
+            for hero, entry in entries.items():
+                players.setdefault(entry["player"], {})[hero] = entry
+        return json.dumps(players, ensure_ascii=False)
+
+    def save(self, data=None):
+        """Write the index to disk atomically
+
+        `data` may be a string from `to_json()` taken earlier, so that the
+        write can happen off the event loop without touching the index.
+        """
+        if not self.path:
+            return
+        if data is None:
+            data = self.to_json()
+        write_atomic(self.path, data)
+
+    @classmethod
+    def load(cls, path, heroes=(), roles=None, players=None):
+        """Load an index from disk, starting empty if the file is missing
+
+        With `players`, only those players are loaded, so players that
+        left the roster drop out of the index.
+        """
+        index = cls(path, heroes, roles)
+        keys = None if players is None else {
+            normalize_username(player) for player in players}
+        try:
+            with open(path, encoding='utf-8') as f:
+                for player, entries in json.load(f).items():
+                    if keys is not None and normalize_username(player) not in keys:
+                        continue
+                    index.update(player, [
+                        HeroStat.from_card(dict(entry, name=hero))
+                        for hero, entry in entries.items()
+                    ])
+        except FileNotFoundError:
+            pass
+        return index
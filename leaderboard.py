@@ -0,0 +1,176 @@
+import bisect
+import hashlib
+import json
+import math
+
+from profile_cache import normalize_username
+from storage import write_atomic
+
+
+def content_hash(embed_dict):
+    """Hash the visible content of an embed, ignoring timestamps and footer"""
+    content = {
+        key: value
+        for key, value in embed_dict.items()
+        if key not in ("timestamp", "footer")
+    }
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def format_delta(delta):
+    """Format a rank movement for display next to a player"""
+    if delta is None:
+        return "🆕"
+    if delta > 0:
+        return f"🔼{delta}"
+    if delta < 0:
+        return f"🔽{-delta}"
+    return ""
+
+
+class SortedLeaderboard:
+    """Players kept in leaderboard order as single results arrive
+
+    Entries are ordered by (key(player), normalized name) with bisect, so
+    updating one player only moves that player, and a page is a slice of
+    the already sorted list.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._keys = []  # (sort key, normalized name), ascending
+        self._players = []  # players in the same order as _keys
+        self._entries = {}  # normalized name -> its entry in _keys
+
+    def __len__(self):
+        return len(self._players)
+
+    def __contains__(self, name):
+        return normalize_username(name) in self._entries
+
+    def update(self, name, player):
+        """Insert or move a player, returning their 1-based position"""
+        name_key = normalize_username(name)
+        self.remove(name)
+        entry = (self.key(player), name_key)
+        index = bisect.bisect_right(self._keys, entry)
+        self._keys.insert(index, entry)
+        self._players.insert(index, player)
+        self._entries[name_key] = entry
+        return index + 1
+
+    def remove(self, name):
+        """Drop a player, returning True if they were on the board"""
+        entry = self._entries.pop(normalize_username(name), None)
+        if entry is None:
+            return False
+        index = bisect.bisect_left(self._keys, entry)
+        del self._keys[index]
+        del self._players[index]
+        return True
+
+    def page_count(self, size):
+        return max(1, math.ceil(len(self._players) / size))
+
+    def page(self, page, size):
+        """Players on a 1-based page of `size` entries"""
+        start = (page - 1) * size
+        return self._players[start:start + size]
+
+    def players(self):
+        """Every player, in order"""
+        return list(self._players)
+
+
+class LeaderboardChannels:
+    """Per-guild leaderboard channel settings, persisted as JSON
+
+    Each entry keeps the channel and pinned message ids, the hash of the
+    last rendered content, the positions shown in the last post and the
+    positions before the last change, used to show rank movements.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+
+    @classmethod
+    def load(cls, path):
+        """Load settings from disk, starting empty if the file is missing"""
+        channels = cls(path)
+        try:
+            with open(path, encoding='utf-8') as f:
+                channels._entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        return channels
+
+    def to_json(self):
+        """Serialize the settings as a JSON string"""
+        return json.dumps(self._entries, indent=2)
+
+    def save(self, data=None):
+        """Write the settings to disk atomically"""
+        if data is None:
+            data = self.to_json()
+        write_atomic(self.path, data)
+
+    def items(self):
+        """Return (guild_id, entry) pairs for every configured guild"""
+        return [(int(guild_id), entry)
+                for guild_id, entry in self._entries.items()]
+
+    def get(self, guild_id):
+        return self._entries.get(str(guild_id))
+
+    def set_channel(self, guild_id, channel_id):
+        """Configure the leaderboard channel for a guild"""
+        self._entries[str(guild_id)] = {
+            "channel_id": channel_id,
+            "message_id": None,
+            "content_hash": None,
+            "positions": {},
+            "previous_positions": {},
+        }
+
+    def record_post(self, guild_id, message_id, rendered_hash, positions):
+        """Remember what was last posted for a guild"""
+        entry = self.get(guild_id)
+        if entry is None:
+            return
+        if positions != entry["positions"]:
+            entry["previous_positions"] = entry["positions"]
+            entry["positions"] = positions
+        entry["message_id"] = message_id
+        entry["content_hash"] = rendered_hash
+
+    def remove(self, guild_id):
+        """Stop posting the leaderboard in a guild"""
+        return self._entries.pop(str(guild_id), None) is not None
+
+
+def rank_deltas(entry, player_stats):
+    """Work out rank movements for a freshly sorted leaderboard
+
+    Returns (positions, deltas). Movements are measured against the last
+    post when the order changed, and otherwise repeat what the last post
+    showed, so an unchanged leaderboard renders identically.
+    """
+    positions = {
+        player.name: i
+        for i, player in enumerate(player_stats, 1)
+    }
+    if positions != entry["positions"]:
+        baseline = entry["positions"]
+    else:
+        baseline = entry["previous_positions"]
+
+    deltas = {}
+    for name, position in positions.items():
+        previous = baseline.get(name)
+        deltas[name] = None if previous is None else previous - position
+    # Nothing to compare against for the very first post
+    if not baseline:
+        deltas = {name: 0 for name in positions}
+    return positions, deltas
@@ -0,0 +1,69 @@
+import json
+import logging
+import logging.handlers
+import queue
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def build_file_handler(path, max_bytes, backup_count, rotate_when=None):
+    """Rotate by time when `rotate_when` is set (e.g. "midnight"), else by size"""
+    if rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=rotate_when, backupCount=backup_count,
+            encoding='utf-8')
+    return logging.handlers.RotatingFileHandler(path,
+                                                maxBytes=max_bytes,
+                                                backupCount=backup_count,
+                                                encoding='utf-8')
+
+
+def setup_logging(level, path, max_bytes=10 * 1024 * 1024, backup_count=5,
+                  rotate_when=None, json_records=False):
+    """Route all logging through a queue drained by a background thread
+
+    The root logger only gets a QueueHandler, so a log call on the event
+    loop just enqueues the record; the file and console handlers run on
+    the QueueListener's thread. Returns the started listener, which should
+    be stopped on shutdown to flush what is left in the queue.
+    """
+    formatter = JsonFormatter() if json_records else logging.Formatter(
+        TEXT_FORMAT)
+    file_handler = build_file_handler(path, max_bytes, backup_count,
+                                      rotate_when)
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue,
+                                              file_handler,
+                                              console_handler,
+                                              respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener.start()
+    return listener
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from degradation import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class LoopWatchdog:
+    """Measure event loop lag and catch the code that blocks the loop
+
+    A heartbeat coroutine sleeps for `interval` seconds at a time and
+    records how late it wakes up. A thread watches the heartbeat; when the
+    loop has not come back for `threshold` seconds it logs the loop
+    thread's stack while the blocking call is still running, so the
+    offending coroutine shows up by name. Lag percentiles over the last
+    `window` heartbeats are logged every `report_interval` seconds and are
+    available from stats().
+    """
+
+    def __init__(self, threshold=0.25, interval=0.05, window=6000,
+                 report_interval=300):
+        self.threshold = threshold
+        self.interval = interval
+        self.report_interval = report_interval
+        self.stalls = 0
+        self._lags = deque(maxlen=window)
+        self._last_beat = None
+        self._stalled_since = None
+        self._loop_ident = None
+        self._stop = threading.Event()
+
+    async def run(self):
+        """Heartbeat until cancelled; run it as a task on the loop to watch"""
+        self._loop_ident = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        watcher = threading.Thread(target=self._watch, name='loop-watchdog',
+                                   daemon=True)
+        watcher.start()
+        reported_at = self._last_beat
+        try:
+            while True:
+                expected = time.perf_counter() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.perf_counter()
+                lag = max(0.0, now - expected)
+                self._lags.append(lag)
+                self._last_beat = now
+                if self._stalled_since is not None:
+                    self._stalled_since = None
+                    logger.warning(
+                        f"Event loop was blocked for {lag * 1000:.0f}ms")
+                if now - reported_at >= self.report_interval:
+                    reported_at = now
+                    self.log_stats()
+        finally:
+            self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.threshold / 4):
+            if self._stalled_since is not None:
+                continue
+            blocked = time.perf_counter() - self._last_beat - self.interval
+            if blocked < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_ident)
+            if frame is None:
+                continue
+            self._stalled_since = self._last_beat
+            self.stalls += 1
+            stack = ''.join(traceback.format_stack(frame))
+            logger.warning(
+                f"Event loop blocked for over {blocked * 1000:.0f}ms, "
+                f"currently in:\n{stack}")
+
+    def stats(self):
+        """Lag percentiles in ms over recent heartbeats, or None without any"""
+        lags = list(self._lags)
+        if not lags:
+            return None
+        return {
+            "samples": len(lags),
+            "p50": percentile(lags, 0.5) * 1000,
+            "p90": percentile(lags, 0.9) * 1000,
+            "p99": percentile(lags, 0.99) * 1000,
+            "max": max(lags) * 1000,
+            "stalls": self.stalls
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        if stats:
+            logger.info(
+                f"Event loop lag over {stats['samples']} heartbeats: "
+                f"p50 {stats['p50']:.1f}ms, p90 {stats['p90']:.1f}ms, "
+                f"p99 {stats['p99']:.1f}ms, max {stats['max']:.0f}ms, "
+                f"{stats['stalls']} stalls over {self.threshold * 1000:.0f}ms")
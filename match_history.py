@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+# One append-only file per column, so each loads as a contiguous array
+COLUMNS = {
+    "key": np.uint64,
+    "recorded_at": np.float64,
+    "is_win": np.bool_,
+    "kills": np.int32,
+    "deaths": np.int32,
+    "assists": np.int32,
+    "kda": np.float32,
+}
+
+
+def match_key(details, stats):
+    """Return a stable 64-bit key for a match card's details and stats"""
+    payload = json.dumps([details, sorted(stats.items())], ensure_ascii=False)
+    digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def parse_number(value, cast=int):
+    """Parse a scraped number such as '1,204' or '2.35', defaulting to 0"""
+    try:
+        return cast(str(value).replace(',', '').strip())
+    except (TypeError, ValueError):
+        return cast(0)
+
+
+class PlayerHistory:
+    """A player's stored matches as column arrays, oldest first"""
+
+    def __init__(self, columns, details):
+        self.columns = columns
+        self.details = details
+        self.keys = set(columns["key"].tolist())
+
+    def __len__(self):
+        return len(self.details)
+
+
+class MatchHistoryStore:
+    """Append-only columnar store of match cards, one directory per player
+
+    Matches are deduplicated by their details and stats, so re-scraping a
+    profile only appends the matches that were not seen before.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._players = {}
+        self._lock = threading.Lock()
+
+    def _player_dir(self, username):
+        return os.path.join(self.root,
+                            urllib.parse.quote(username.strip().lower(), safe=''))
+
+    def _load(self, username):
+        """Return the cached PlayerHistory for a username, loading it once"""
+        key = username.strip().lower()
+        history = self._players.get(key)
+        if history is not None:
+            return history
+
+        player_dir = self._player_dir(username)
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(player_dir, f"{name}.bin")
+            if os.path.exists(path):
+                columns[name] = np.fromfile(path, dtype=dtype)
+            else:
+                columns[name] = np.empty(0, dtype=dtype)
+
+        details = []
+        details_path = os.path.join(player_dir, "details.jsonl")
+        if os.path.exists(details_path):
+            with open(details_path, encoding='utf-8') as f:
+                details = [json.loads(line) for line in f if line.strip()]
+
+        # Drop a partially written last row if a previous append was cut off
+        length = min([len(details)] + [len(c) for c in columns.values()])
+        columns = {name: column[:length] for name, column in columns.items()}
+        history = PlayerHistory(columns, details[:length])
+        self._players[key] = history
+        return history
+
+    def known_keys(self, username):
+        """Return the keys of every stored match for a username"""
+        with self._lock:
+            return frozenset(self._load(username).keys)
+
+    def ingest(self, username, matches):
+        """Store new matches (newest first, as scraped) and return how many"""
+        with self._lock:
+            history = self._load(username)
+            new_matches = []
+            for match in reversed(matches):
+                key = match_key(match["details"], match["stats"])
+                if key not in history.keys:
+                    history.keys.add(key)
+                    new_matches.append((key, match))
+            if not new_matches:
+                return 0
+
+            now = time.time()
+            rows = {
+                "key": [key for key, _ in new_matches],
+                "recorded_at": [now] * len(new_matches),
+                "is_win": [m["is_win"] for _, m in new_matches],
+                "kills": [parse_number(m["stats"].get("K")) for _, m in new_matches],
+                "deaths": [parse_number(m["stats"].get("D")) for _, m in new_matches],
+                "assists": [parse_number(m["stats"].get("A")) for _, m in new_matches],
+                "kda": [
+                    parse_number(m["stats"].get("KDA"), float)
+                    for _, m in new_matches
+                ],
+            }
+
+            player_dir = self._player_dir(username)
+            os.makedirs(player_dir, exist_ok=True)
+            with open(os.path.join(player_dir, "details.jsonl"), 'a',
+                      encoding='utf-8') as f:
+                for _, match in new_matches:
+                    f.write(json.dumps(match["details"], ensure_ascii=False))
+                    f.write("\n")
+            for name, dtype in COLUMNS.items():
+                values = np.asarray(rows[name], dtype=dtype)
+                with open(os.path.join(player_dir, f"{name}.bin"), 'ab') as f:
+                    values.tofile(f)
+                history.columns[name] = np.concatenate(
+                    [history.columns[name], values])
+            history.details.extend(m["details"] for _, m in new_matches)
+            return len(new_matches)
+
+    def recent_matches(self, username, limit=10):
+        """Return up to `limit` stored matches, newest first, as match dicts"""
+        with self._lock:
+            history = self._load(username)
+            columns = history.columns
+            matches = []
+            for i in range(len(history) - 1, max(len(history) - limit, 0) - 1,
+                           -1):
+                is_win = bool(columns["is_win"][i])
+                matches.append({
+                    "result": "Victory" if is_win else "Defeat",
+                    "is_win": is_win,
+                    "details": history.details[i],
+                    "stats": {
+                        "K": str(columns["kills"][i]),
+                        "D": str(columns["deaths"][i]),
+                        "A": str(columns["assists"][i]),
+                        "KDA": f"{columns['kda'][i]:.2f}",
+                    }
+                })
+            return matches
+
+    def summary(self, username, days=None):
+        """Aggregate win rate, KDA trend and streaks over stored matches
+
+        Returns None if no matches are stored for the window.
+        """
+        with self._lock:
+            columns = self._load(username).columns
+
+        if days is not None:
+            mask = columns["recorded_at"] >= time.time() - days * 86400
+            columns = {name: column[mask] for name, column in columns.items()}
+
+        is_win = columns["is_win"]
+        total = len(is_win)
+        if total == 0:
+            return None
+
+        wins = int(np.count_nonzero(is_win))
+        kills = int(columns["kills"].sum())
+        deaths = int(columns["deaths"].sum())
+        assists = int(columns["assists"].sum())
+
+        # KDA trend: slope of per-match KDA over the last 20 matches
+        recent_kda = columns["kda"][-20:].astype(np.float64)
+        kda_trend = 0.0
+        if len(recent_kda) >= 2:
+            kda_trend = float(
+                np.polyfit(np.arange(len(recent_kda)), recent_kda, 1)[0])
+
+        # Current streak: run length of the last result
+        changes = np.flatnonzero(is_win[1:] != is_win[:-1])
+        current_streak = total - (int(changes[-1]) + 1 if changes.size else 0)
+
+        # Longest win streak from the edges of each run of wins
+        edges = np.diff(np.concatenate(([0], is_win.astype(np.int8), [0])))
+        run_lengths = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+        longest_win_streak = int(run_lengths.max()) if run_lengths.size else 0
+
+        return {
+            "matches": total,
+            "wins": wins,
+            "losses": total - wins,
+            "win_rate": wins / total * 100,
+            "kda": (kills + assists) / max(deaths, 1),
+            "average_kda": float(columns["kda"].mean()),
+            "kda_trend": kda_trend,
+            "current_streak": current_streak,
+            "current_streak_is_win": bool(is_win[-1]),
+            "longest_win_streak": longest_win_streak,
+            "first_recorded_at": float(columns["recorded_at"][0]),
+        }
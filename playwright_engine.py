@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import urllib.parse
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import async_playwright
+
+from extraction import (EXTRACT_JSONLD_SCRIPT, EXTRACT_PLAYER_SCRIPT,
+                        PROFILE_SECTIONS, UNKNOWN_STATS,
+                        WAIT_FOR_SECTIONS_SCRIPT, build_hero_cards,
+                        build_player_data, build_top_data,
+                        find_player_entity, profile_exists, sections_args)
+from browser_supervisor import browser_roots, process_table
+from deadline import DeadlineExceeded
+from profile_cache import UpstreamError
+
+logger = logging.getLogger(__name__)
+
+# Requests the profile pages never need for extraction
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+
+class PlaywrightEngine:
+    """Scrape mrivals.gg with async Playwright
+
+    One Chromium browser is shared by the whole bot. Each session is a
+    lightweight browser context, so many lookups run concurrently on the
+    event loop without a thread pool. Playwright starts Chromium from its
+    own driver process, so the browser is found in the process table after
+    launch and registered with the supervisor, if one is given.
+    """
+
+    def __init__(self, base_url, timeout, page_load_timeout, user_agent,
+                 executable_path=None, capture_writer=None, supervisor=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.timeout_ms = timeout * 1000
+        self.page_load_timeout_ms = page_load_timeout * 1000
+        self.user_agent = user_agent
+        self.executable_path = executable_path
+        self.capture_writer = capture_writer
+        self.supervisor = supervisor
+        self._browser_pids = set()
+        self._playwright = None
+        self._browser = None
+        self._start_lock = None
+
+    async def _ensure_browser(self):
+        """Launch the shared browser on first use, or after it crashed"""
+        # Created lazily so the lock belongs to the running event loop
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._browser and self._browser.is_connected():
+                return self._browser
+            # A crashed browser's leftovers are killed by the next sweep
+            self._release_browser()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            loop = asyncio.get_event_loop()
+            running = set()
+            if self.supervisor:
+                running = await loop.run_in_executor(None,
+                                                     self._running_browsers)
+            self._browser = await self._playwright.chromium.launch(
+                headless=True,
+                executable_path=self.executable_path,
+                args=[
+                    '--no-sandbox', '--disable-dev-shm-usage',
+                    '--disable-gpu', '--disable-extensions',
+                    '--disable-blink-features=AutomationControlled'
+                ])
+            logger.info("Playwright Chromium browser launched")
+            if self.supervisor:
+                self._browser_pids = await loop.run_in_executor(
+                    None, self._register_browser, running)
+            return self._browser
+
+    @staticmethod
+    def _running_browsers():
+        """Browsers running below this process, from the process table"""
+        table = process_table()
+        return browser_roots(table, os.getpid()) if table else set()
+
+    def _register_browser(self, running):
+        """Register the browsers launched since `running` was taken"""
+        pids = self._running_browsers() - running
+        for pid in pids:
+            self.supervisor.register(pid, "playwright chromium",
+                                     long_lived=True)
+        return pids
+
+    def _release_browser(self):
+        for pid in self._browser_pids:
+            self.supervisor.release(pid)
+        self._browser_pids = set()
+
+    async def _route(self, route):
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def new_session(self):
+        """Create an isolated browser context for a command"""
+        browser = await self._ensure_browser()
+        context = await browser.new_context(user_agent=self.user_agent)
+        context.set_default_timeout(self.timeout_ms)
+        context.set_default_navigation_timeout(self.page_load_timeout_ms)
+        await context.route("**/*", self._route)
+        return context
+
+    async def close_session(self, context):
+        """Close a browser context, ignoring errors"""
+        try:
+            await context.close()
+        except PlaywrightError as e:
+            logger.debug(f"Failed to close browser context: {str(e)}")
+
+    async def close(self):
+        """Shut down the shared browser and Playwright"""
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        self._release_browser()
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _open_profile(self, context, username, sections=("jsonld", ),
+                            deadline=None):
+        """Open a profile page and wait for the given sections to render
+
+        Returns (page, found); found is False when the player does not
+        exist. Raises UpstreamError when the page failed or answered with
+        an error, see profile_exists. With a deadline,
+        navigation and the wait are cut short when it runs out: sections
+        still missing are recorded as skipped, and DeadlineExceeded is
+        raised if the JSON-LD never appeared.
+        """
+        page_load_timeout = self.page_load_timeout_ms / 1000
+        timeout = self.timeout
+        if deadline:
+            if deadline.expired:
+                deadline.skip("profile")
+                raise DeadlineExceeded(f"no time left to load {username}")
+            page_load_timeout = deadline.cap(page_load_timeout)
+            timeout = deadline.cap(timeout)
+
+        page = await context.new_page()
+        profile_url = f"{self.base_url}/player/{urllib.parse.quote(username)}"
+        try:
+            # A timeout of 0 would disable the limit altogether
+            await page.goto(profile_url, wait_until='domcontentloaded',
+                            timeout=max(page_load_timeout * 1000, 1))
+        except PlaywrightError as e:
+            await page.close()
+            if deadline and deadline.expired:
+                deadline.skip("profile")
+                raise DeadlineExceeded(
+                    f"ran out of time loading {profile_url}") from e
+            raise UpstreamError(f"Could not load {profile_url}: {str(e)}") from e
+
+        try:
+            readiness = await page.evaluate(WAIT_FOR_SECTIONS_SCRIPT,
+                                            sections_args(sections, timeout))
+        except PlaywrightError as e:
+            logger.warning(f"Readiness check failed for {username}: {str(e)}")
+            readiness = None
+        if readiness:
+            logger.debug(
+                f"Sections for {username} after {readiness['elapsed']}ms: "
+                f"{readiness['timings']}, missing {readiness['missing']}")
+            if deadline and readiness["missing"] and timeout < self.timeout:
+                deadline.skip(*readiness["missing"])
+        try:
+            if not profile_exists(readiness, profile_url, deadline):
+                return page, False
+        except (UpstreamError, DeadlineExceeded):
+            await page.close()
+            raise
+
+        if self.capture_writer:
+            try:
+                self.capture_writer.submit(
+                    username, await page.content(),
+                    await page.evaluate(EXTRACT_JSONLD_SCRIPT))
+            except PlaywrightError as e:
+                logger.error(f"Failed to capture profile for {username}: {str(e)}")
+        return page, True
+
+    async def get_player_data(self, context, username,
+                              known_match_keys=frozenset(), deadline=None):
+        """Same contract as get_player_data in the Selenium engine"""
+        page, found = await self._open_profile(context, username,
+                                               PROFILE_SECTIONS, deadline)
+        try:
+            if not found:
+                return None, [], dict(UNKNOWN_STATS), []
+            raw = await page.evaluate(EXTRACT_PLAYER_SCRIPT)
+            result = build_player_data(raw, known_match_keys)
+        except PlaywrightError as e:
+            raise UpstreamError(
+                f"Playwright extraction failed for {username}: {str(e)}") from e
+        finally:
+            await page.close()
+        if not result[0]:
+            raise UpstreamError(f"Could not read player data for {username}")
+        return result
+
+    async def get_player_data_for_top(self, context, username, heroes=False):
+        """Same contract as get_player_data_for_top in the Selenium engine"""
+        page, found = await self._open_profile(
+            context, username, ("jsonld", "heroes") if heroes else ("jsonld", ))
+        try:
+            if not found:
+                return build_top_data(None, username)
+            if heroes:
+                raw = await page.evaluate(EXTRACT_PLAYER_SCRIPT)
+                player_data = find_player_entity(raw["jsonld"])
+                top_heroes = build_hero_cards(raw)
+            else:
+                player_data = find_player_entity(
+                    await page.evaluate(EXTRACT_JSONLD_SCRIPT))
+                top_heroes = None
+        except PlaywrightError as e:
+            raise UpstreamError(
+                f"Playwright extraction failed for {username}: {str(e)}") from e
+        finally:
+            await page.close()
+        if not player_data:
+            raise UpstreamError(f"Could not read player data for {username}")
+        return build_top_data(player_data, username, top_heroes)
+
+    async def get_player_summary(self, context, username, deadline=None):
+        """Same contract as get_player_summary in the Selenium engine"""
+        page, found = await self._open_profile(context, username,
+                                               deadline=deadline)
+        try:
+            if not found:
+                return None, [], dict(UNKNOWN_STATS), []
+            player_data = find_player_entity(
+                await page.evaluate(EXTRACT_JSONLD_SCRIPT))
+        except PlaywrightError as e:
+            raise UpstreamError(
+                f"Playwright extraction failed for {username}: {str(e)}") from e
+        finally:
+            await page.close()
+        if not player_data:
+            raise UpstreamError(f"Could not read player data for {username}")
+        return player_data["mainEntity"], [], dict(UNKNOWN_STATS), []
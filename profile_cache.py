@@ -0,0 +1,141 @@
+import time
+
+# Lookup outcomes remembered by the negative cache
+NOT_FOUND = "not_found"
+PRIVATE = "private"
+
+
+class UpstreamError(Exception):
+    """Raised when mrivals.gg could not be reached or did not respond"""
+
+
+def normalize_username(username):
+    """Normalize a username for use as a cache key"""
+    return username.strip().lower()
+
+
+class NegativeCache:
+    """Remember usernames that were not found or private for a short time"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+
+    def get(self, username):
+        """Return the cached outcome for a username, or None"""
+        key = normalize_username(username)
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+        outcome, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        return outcome
+
+    def add(self, username, outcome):
+        """Cache a not-found or private outcome for a username
+
+        Entries are kept in expiry order, so expired ones are dropped from
+        the front here rather than only when they are looked up again.
+        """
+        key = normalize_username(username)
+        now = time.monotonic()
+        self._entries.pop(key, None)
+        self._entries[key] = (outcome, now + self.ttl)
+        for oldest in list(self._entries):
+            if self._entries[oldest][1] > now:
+                break
+            del self._entries[oldest]
+
+    def discard(self, username):
+        """Forget a username, e.g. after it resolved successfully"""
+        self._entries.pop(normalize_username(username), None)
+
+
+class SnapshotCache:
+    """Keep the last successful result for each username"""
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, username):
+        """Return (data, fetched_at) for a username, or None"""
+        return self._entries.get(normalize_username(username))
+
+    def put(self, username, data):
+        """Store a successful result for a username"""
+        self._entries[normalize_username(username)] = (data, time.time())
+
+    def age_minutes(self, username):
+        """Return how many minutes old the snapshot for a username is"""
+        entry = self.get(username)
+        if not entry:
+            return None
+        return int((time.time() - entry[1]) // 60)
+
+
+class CircuitBreaker:
+    """Stop calling mrivals.gg after repeated failures
+
+    The breaker opens after `failure_threshold` consecutive failures and
+    rejects calls until `reset_timeout` seconds have passed. It then lets a
+    single trial call through (half-open) and closes again on success.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_started_at = None
+
+    def allow_request(self):
+        """Return True if a call to mrivals.gg may go ahead"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_started_at = None
+        # Half-open: allow one trial call at a time, and another one if the
+        # previous trial never reported back
+        now = time.monotonic()
+        if (self._trial_started_at is not None
+                and now - self._trial_started_at < self.reset_timeout):
+            return False
+        self._trial_started_at = now
+        return True
+
+    def is_open(self):
+        """Return True while calls are being rejected without a trial"""
+        return (self.state == self.OPEN and
+                time.monotonic() - self.opened_at < self.reset_timeout)
+
+    def retry_after(self):
+        """Return seconds until the breaker will allow a trial call"""
+        if self.state != self.OPEN:
+            return 0
+        remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+        return max(0, int(remaining + 0.999))
+
+    def record_success(self):
+        """Record a call that reached mrivals.gg"""
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_started_at = None
+
+    def record_failure(self):
+        """Record a call that failed or timed out upstream"""
+        self.failures += 1
+        self._trial_started_at = None
+        if (self.state == self.HALF_OPEN
+                or self.failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
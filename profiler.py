@@ -0,0 +1,184 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+# Name given to the samples of the thread running the event loop
+LOOP_THREAD = "event-loop"
+
+# Selenium talks to chromedriver over HTTP from this module, so a stack
+# passing through it is a Chrome round trip
+ROUND_TRIP_FILES = ("remote_connection.py",)
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def frame_label(frame):
+    """`function (file:line)` for a stack entry, without ';' for folding"""
+    filename, name, lineno = frame
+    return f"{name} ({os.path.basename(filename)}:{lineno})".replace(";", ",")
+
+
+def is_idle(stack):
+    """True for a thread with nothing to do
+
+    The event loop is idle while it waits in its selector, and an executor
+    thread while it waits for a work item.
+    """
+    filename, name, _ = stack[-1]
+    if (name.rsplit(".", 1)[-1] == "select"
+            and os.path.basename(filename) == "selectors.py"):
+        return True
+    pool_frames = [frame for frame in stack if frame[0].endswith(
+        os.path.join("concurrent", "futures", "thread.py"))]
+    return bool(pool_frames) and pool_frames[-1][1] == "_worker"
+
+
+class Profile:
+    """Stacks sampled while a profiler ran
+
+    `stacks` maps (thread, frames) to the number of samples in which the
+    thread was busy in those frames, root first. `idle` counts the samples
+    in which each thread had nothing to do.
+    """
+
+    def __init__(self, stacks, idle, interval, duration):
+        self.stacks = stacks
+        self.idle = idle
+        self.interval = interval
+        self.duration = duration
+
+    @property
+    def busy_samples(self):
+        return sum(self.stacks.values())
+
+    def collapsed(self):
+        """Collapsed stack lines, as read by flamegraph.pl and speedscope"""
+        lines = []
+        for (thread, frames), count in sorted(self.stacks.items()):
+            path = ";".join([thread] + [frame_label(f) for f in frames])
+            lines.append(f"{path} {count}")
+        return "\n".join(lines) + "\n"
+
+    def thread_totals(self):
+        """Per thread: (busy samples, idle samples, round-trip samples)"""
+        busy = collections.Counter()
+        round_trips = collections.Counter()
+        for (thread, frames), count in self.stacks.items():
+            busy[thread] += count
+            if any(os.path.basename(f[0]) in ROUND_TRIP_FILES for f in frames):
+                round_trips[thread] += count
+        threads = sorted(set(busy) | set(self.idle))
+        return {thread: (busy[thread], self.idle.get(thread, 0), round_trips[thread])
+                for thread in threads}
+
+    def hottest(self, limit=8, own_code=False):
+        """Functions by share of busy samples
+
+        Self time by default. With `own_code`, inclusive time in functions
+        from this repository, which shows which of our calls the time was
+        spent under.
+        """
+        counts = collections.Counter()
+        for (_, frames), count in self.stacks.items():
+            if own_code:
+                for frame in set(f for f in frames
+                                 if f[0].startswith(REPO_ROOT + os.sep)):
+                    counts[frame] += count
+            else:
+                counts[frames[-1]] += count
+        total = self.busy_samples or 1
+        return [(frame_label(frame), count / total)
+                for frame, count in counts.most_common(limit)]
+
+    def summary(self, limit=8):
+        """A short text report of where the time went"""
+        lines = [f"{self.duration:.2f}s sampled every "
+                 f"{self.interval * 1000:g}ms"]
+        for thread, (busy, idle, round_trips) in self.thread_totals().items():
+            line = (f"{thread}: busy {busy / max(busy + idle, 1):.0%} "
+                    f"({busy} samples)")
+            if round_trips:
+                line += f", {round_trips / busy:.0%} of it waiting on chromedriver"
+            lines.append(line)
+        for title, own_code in (("Self time", False),
+                                ("Inclusive, bot code", True)):
+            hottest = self.hottest(limit, own_code)
+            if hottest:
+                lines.append(f"{title}:")
+                lines.extend(f"{share:6.1%}  {label}"
+                             for label, share in hottest)
+        return "\n".join(lines)
+
+
+class SamplingProfiler:
+    """Sample the stacks of the event loop and executor threads
+
+    A background thread reads every thread's current frame each `interval`
+    seconds. It samples the thread that called start(), which should be the
+    one running the event loop, and threads whose names start with one of
+    `thread_prefixes`, such as the Selenium pool's workers. Sampling is
+    process-wide, so only one profiler should run at a time.
+    """
+
+    def __init__(self, interval=0.005, thread_prefixes=()):
+        self.interval = interval
+        self.thread_prefixes = tuple(thread_prefixes)
+        self._stacks = collections.Counter()
+        self._idle = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._loop_ident = None
+        self._names = {}
+        self._started = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        self._loop_ident = threading.get_ident()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and return the Profile"""
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        return Profile(dict(self._stacks), dict(self._idle), self.interval,
+                       time.perf_counter() - self._started)
+
+    def _thread_name(self, ident):
+        if ident == self._loop_ident:
+            return LOOP_THREAD
+        if ident not in self._names:
+            self._names = {t.ident: t.name for t in threading.enumerate()}
+            self._names.setdefault(ident, "")
+        name = self._names[ident]
+        return name if name.startswith(self.thread_prefixes) else None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        for ident, frame in sys._current_frames().items():
+            thread = self._thread_name(ident)
+            if thread is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename,
+                              getattr(code, "co_qualname", code.co_name),
+                              code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            if is_idle(stack):
+                self._idle[thread] += 1
+            else:
+                self._stacks[(thread, tuple(stack))] += 1
@@ -0,0 +1,217 @@
+import heapq
+import json
+import time
+
+from profile_cache import normalize_username
+from snapshot import PRIVATE_PROFILE, RANK_ORDER, UNKNOWN, parse_rank
+from storage import write_atomic
+
+
+def rank_position(rank):
+    """(tier order, division) for a rank name, lower is better"""
+    tier, division = parse_rank(rank)
+    return RANK_ORDER.get(tier, 999), division
+
+
+class RankWatcher:
+    """Schedule background polls of roster players and spot rank changes
+
+    Each player has a polling interval. A poll that finds new matches on the
+    profile resets it to `min_interval`; a poll without new matches doubles
+    it, up to `max_interval`, so idle players are checked rarely and active
+    ones often. Due players come off a heap, and a token bucket refilled at
+    `budget_per_hour` caps how many polls start however large the roster
+    is. Players left waiting for budget stay due and are polled first.
+
+    The last rank seen per player and the channel to announce changes in
+    per guild are persisted as JSON, so a restart neither forgets the ranks
+    nor announces them again.
+    """
+
+    def __init__(self, path=None, min_interval=600, max_interval=21600,
+                 budget_per_hour=60, burst=5):
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.rate = budget_per_hour / 3600
+        self.burst = max(1, burst)
+        self.polls = 0
+        self.changes = 0
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._channels = {}  # guild id (str) -> channel id
+        self._players = {}  # normalized name -> {"name", "rank", "interval"}
+        self._due = {}  # normalized name -> monotonic time of next poll
+        self._heap = []  # (due, normalized name), stale entries skipped
+
+    def __len__(self):
+        return len(self._players)
+
+    # Announcement channels
+
+    def channels(self):
+        """Return (guild_id, channel_id) pairs"""
+        return [(int(guild_id), channel_id)
+                for guild_id, channel_id in self._channels.items()]
+
+    def set_channel(self, guild_id, channel_id):
+        self._channels[str(guild_id)] = channel_id
+
+    def remove_channel(self, guild_id):
+        return self._channels.pop(str(guild_id), None) is not None
+
+    # Scheduling
+
+    def sync(self, roster, now=None):
+        """Watch exactly the players in `roster`
+
+        New players are spread over the first `min_interval` rather than
+        all polled at once.
+        """
+        now = time.monotonic() if now is None else now
+        keys = {normalize_username(name): name for name in roster}
+        for key in set(self._players) - set(keys):
+            del self._players[key]
+            self._due.pop(key, None)
+        added = [key for key in keys if key not in self._players]
+        for i, key in enumerate(added):
+            self._players[key] = {"name": keys[key], "rank": None,
+                                  "interval": self.min_interval}
+            self._schedule(key, now + i * self.min_interval / len(added))
+
+    def _schedule(self, key, due):
+        self._due[key] = due
+        heapq.heappush(self._heap, (due, key))
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens +
+                           max(0.0, now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _next_due(self):
+        """(due, key) of the next player, dropping stale heap entries"""
+        while self._heap:
+            due, key = self._heap[0]
+            if self._due.get(key) == due:
+                return due, key
+            heapq.heappop(self._heap)
+        return None
+
+    def seconds_until_next(self, now=None):
+        """Seconds until a poll may start, or None with nobody to watch"""
+        now = time.monotonic() if now is None else now
+        following = self._next_due()
+        if following is None:
+            return None
+        self._refill(now)
+        wait_for_budget = 0.0
+        if self._tokens < 1:
+            wait_for_budget = (1 - self._tokens) / self.rate if self.rate else float('inf')
+        return max(following[0] - now, wait_for_budget, 0.0)
+
+    def take_due(self, now=None):
+        """Names of the players due now that the budget allows polling"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        names = []
+        while self._tokens >= 1:
+            following = self._next_due()
+            if following is None or following[0] > now:
+                break
+            heapq.heappop(self._heap)
+            del self._due[following[1]]
+            self._tokens -= 1
+            names.append(self._players[following[1]]["name"])
+        return names
+
+    def defer(self, names, delay, now=None):
+        """Put back players whose poll never ran, refunding their budget"""
+        now = time.monotonic() if now is None else now
+        for name in names:
+            key = normalize_username(name)
+            if key in self._players:
+                self._schedule(key, now + delay)
+        self._tokens = min(self.burst, self._tokens + len(names))
+
+    def record(self, name, rank, active, now=None):
+        """Record a finished poll and reschedule the player
+
+        `active` is whether the poll found new matches. Returns
+        (old_rank, new_rank) when the tier or division changed since the
+        last known rank, otherwise None. Unknown and private ranks are not
+        remembered, so a profile hidden for a while is not announced as a
+        change when it comes back.
+        """
+        entry = self._reschedule(name, active, now)
+        if entry is None:
+            return None
+        self.polls += 1
+        if rank in (UNKNOWN, PRIVATE_PROFILE):
+            return None
+        old_rank, entry["rank"] = entry["rank"], rank
+        if old_rank is None or rank_position(old_rank) == rank_position(rank):
+            return None
+        self.changes += 1
+        return old_rank, rank
+
+    def record_failure(self, name, now=None):
+        """Back off a player whose poll failed"""
+        self._reschedule(name, False, now)
+
+    def _reschedule(self, name, active, now):
+        now = time.monotonic() if now is None else now
+        key = normalize_username(name)
+        entry = self._players.get(key)
+        if entry is None:
+            return None
+        if active:
+            entry["interval"] = self.min_interval
+        else:
+            entry["interval"] = min(entry["interval"] * 2, self.max_interval)
+        self._schedule(key, now + entry["interval"])
+        return entry
+
+    def stats(self, now=None):
+        following = self.seconds_until_next(now)
+        return {
+            "players": len(self._players),
+            "polls": self.polls,
+            "changes": self.changes,
+            "next_poll": following
+        }
+
+    # Persistence
+
+    def to_json(self):
+        """Serialize channels and last known ranks as a JSON string"""
+        return json.dumps({
+            "channels": self._channels,
+            "ranks": {entry["name"]: entry["rank"]
+                      for entry in self._players.values() if entry["rank"]}
+        }, ensure_ascii=False)
+
+    def save(self, data=None):
+        """Write the state to disk atomically"""
+        if not self.path:
+            return
+        if data is None:
+            data = self.to_json()
+        write_atomic(self.path, data)
+
+    @classmethod
+    def load(cls, path, roster=(), **kwargs):
+        """Load the state from disk and watch `roster`"""
+        watcher = cls(path, **kwargs)
+        ranks = {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            watcher._channels = data.get("channels", {})
+            ranks = {normalize_username(name): rank
+                     for name, rank in data.get("ranks", {}).items()}
+        except FileNotFoundError:
+            pass
+        watcher.sync(roster)
+        for key, entry in watcher._players.items():
+            entry["rank"] = ranks.get(key)
+        return watcher
@@ -0,0 +1,311 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+
+# Job priorities, most urgent first
+INTERACTIVE = 0
+BULK = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk", BACKGROUND: "background"}
+
+
+class QueueFull(Exception):
+    """Raised when a job is refused admission to the scheduler"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BrowserSlot:
+    """Permission to do browser work, held for the length of a job
+
+    `wait_time` is the time spent queued (including after preemption) and
+    `exec_time` the time spent holding the slot.
+    """
+
+    def __init__(self, scheduler, priority, owners=()):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.owners = owners
+        self.started = False
+        self.wait_time = 0.0
+        self.exec_time = 0.0
+        self.preemptions = 0
+        self._started_at = None
+
+    @property
+    def running(self):
+        return self._started_at is not None
+
+    def _start(self, waited):
+        self.wait_time += waited
+        self._started_at = time.monotonic()
+
+    def _stop(self):
+        if self._started_at is not None:
+            self.exec_time += time.monotonic() - self._started_at
+            self._started_at = None
+
+    async def checkpoint(self, on_yield=None):
+        """Hand the slot to a more urgent job if one is waiting
+
+        Bulk jobs call this between players, so an interactive lookup
+        never waits for a whole roster scrape. `on_yield()` is awaited
+        before the slot is handed over, so a job can quit its browser
+        instead of keeping it open while it waits. Returns True if the
+        slot was handed over.
+        """
+        if not self.scheduler.should_yield(self):
+            return False
+        if on_yield:
+            await on_yield()
+        self.preemptions += 1
+        self.scheduler.release(self)
+        await self.scheduler.acquire(self)
+        return True
+
+
+class BrowserScheduler:
+    """Priority scheduler for browser work on the event loop
+
+    At most `capacity` jobs hold a slot at once. `reserved_interactive`
+    of those slots are kept for interactive lookups, so bulk and
+    background jobs can never fill every slot. Waiting jobs are started
+    by priority, then in arrival order.
+
+    Jobs started on behalf of a user go through admission control: at
+    most `max_queued` of them wait at once, and each user and guild may
+    only have `per_user` and `per_guild` jobs queued or running. Jobs
+    without an owner, like the background refresh, are always admitted.
+    """
+
+    def __init__(self, capacity, reserved_interactive=1, max_queued=None,
+                 per_user=None, per_guild=None):
+        self.capacity = max(1, capacity)
+        # Bulk work always keeps at least one slot
+        self.reserved_interactive = max(
+            0, min(reserved_interactive, self.capacity - 1))
+        self.max_queued = max_queued
+        self.per_user = per_user
+        self.per_guild = per_guild
+        self._running = {priority: 0 for priority in PRIORITY_NAMES}
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._queued = 0
+        self._owner_jobs = Counter()
+        self._active = 0
+        self.rejected = 0
+        self.closed = False
+        self._closed_retry_after = None
+        self._totals = {
+            priority: {"jobs": 0, "wait": 0.0, "exec": 0.0}
+            for priority in PRIORITY_NAMES
+        }
+
+    def _can_start(self, priority):
+        running = sum(self._running.values())
+        if running >= self.capacity:
+            return False
+        if priority == INTERACTIVE:
+            return True
+        shared = running - self._running[INTERACTIVE]
+        return shared < self.capacity - self.reserved_interactive
+
+    def _dispatch(self):
+        """Start waiting jobs while there is capacity for them"""
+        while self._waiting:
+            priority, _, future = self._waiting[0]
+            if future.done():
+                # Cancelled while queued
+                heapq.heappop(self._waiting)
+                continue
+            if not self._can_start(priority):
+                break
+            heapq.heappop(self._waiting)
+            self._running[priority] += 1
+            future.set_result(None)
+
+    def should_yield(self, slot):
+        """True if a more urgent job is queued behind a running slot"""
+        return any(priority < slot.priority and not future.done()
+                   for priority, _, future in self._waiting)
+
+    def _position(self, entry):
+        """1-based place of a waiting entry in start order"""
+        return 1 + sum(1 for other in self._waiting
+                       if other[:2] < entry[:2] and not other[2].done())
+
+    def retry_after(self):
+        """Rough seconds until the queue has drained by one slot's worth"""
+        jobs = sum(totals["jobs"] for totals in self._totals.values())
+        exec_total = sum(totals["exec"] for totals in self._totals.values())
+        mean_exec = exec_total / jobs if jobs else 10.0
+        return max(5, math.ceil(mean_exec * (self._queued + 1) / self.capacity))
+
+    def _admit_owners(self, user_id, guild_id):
+        """Check admission for a user and guild and count a job against them"""
+        if self.closed:
+            self.rejected += 1
+            raise QueueFull("the bot is restarting", self._closed_retry_after)
+
+        owners = []
+        if user_id is not None:
+            owners.append(("user", user_id))
+        if guild_id is not None:
+            owners.append(("guild", guild_id))
+
+        if owners:
+            reason = None
+            if self.max_queued is not None and self._queued >= self.max_queued:
+                reason = "the lookup queue is full"
+            elif (self.per_user is not None and user_id is not None
+                  and self._owner_jobs[("user", user_id)] >= self.per_user):
+                reason = f"you already have {self.per_user} lookups in progress"
+            elif (self.per_guild is not None and guild_id is not None
+                  and self._owner_jobs[("guild", guild_id)] >= self.per_guild):
+                reason = f"this server already has {self.per_guild} lookups in progress"
+            if reason:
+                self.rejected += 1
+                raise QueueFull(reason, self.retry_after())
+
+        for owner in owners:
+            self._owner_jobs[owner] += 1
+        return tuple(owners)
+
+    def _release_owners(self, owners):
+        for owner in owners:
+            self._owner_jobs[owner] -= 1
+            if not self._owner_jobs[owner]:
+                del self._owner_jobs[owner]
+
+    def admit(self, priority, user_id=None, guild_id=None):
+        """Admit a job and return its slot, or raise QueueFull"""
+        owners = self._admit_owners(user_id, guild_id)
+        self._queued += 1
+        self._active += 1
+        return BrowserSlot(self, priority, owners)
+
+    @contextmanager
+    def owner_job(self, user_id=None, guild_id=None):
+        """Count several lookups made for one command as a single owner job
+
+        Admission is checked once, raising QueueFull, and the job counts
+        against the user and guild until the block exits. Slots for the
+        individual lookups are admitted inside it without owners.
+        """
+        owners = self._admit_owners(user_id, guild_id)
+        try:
+            yield
+        finally:
+            self._release_owners(owners)
+
+    def close(self, retry_after=60):
+        """Refuse every new job from now on, for shutting down"""
+        self.closed = True
+        self._closed_retry_after = retry_after
+
+    def active_jobs(self):
+        """Number of admitted jobs that are queued or running"""
+        return self._active
+
+    def _finish(self, slot):
+        """Forget an admitted job once it has run or was cancelled"""
+        self._release_owners(slot.owners)
+        if not slot.started:
+            self._queued -= 1
+        self._active -= 1
+        totals = self._totals[slot.priority]
+        totals["jobs"] += 1
+        totals["wait"] += slot.wait_time
+        totals["exec"] += slot.exec_time
+
+    async def acquire(self, slot, on_queued=None):
+        """Wait until the slot may run
+
+        `on_queued(position)` is awaited if the job has to wait.
+        """
+        queued_at = time.monotonic()
+        future = asyncio.get_event_loop().create_future()
+        entry = (slot.priority, next(self._sequence), future)
+        heapq.heappush(self._waiting, entry)
+        self._dispatch()
+        try:
+            if on_queued and not future.done():
+                await on_queued(self._position(entry))
+            await future
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # Granted just as the waiter was cancelled or failed
+                self._running[slot.priority] -= 1
+                self._dispatch()
+            else:
+                future.cancel()
+            raise
+        slot._start(time.monotonic() - queued_at)
+        if not slot.started:
+            slot.started = True
+            self._queued -= 1
+
+    def release(self, slot):
+        """Give the slot back and start whoever is next"""
+        slot._stop()
+        self._running[slot.priority] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def run(self, slot, on_queued=None, on_started=None, timeout=None):
+        """Hold an admitted slot for the duration of a job
+
+        `on_started()` is awaited when a job that had to queue starts.
+        Raises asyncio.TimeoutError if the slot is not granted within
+        `timeout` seconds.
+        """
+        try:
+            waited = False
+
+            async def queued(position):
+                nonlocal waited
+                waited = True
+                if on_queued:
+                    await on_queued(position)
+
+            await asyncio.wait_for(self.acquire(slot, queued), timeout)
+            if waited and on_started:
+                await on_started()
+            yield slot
+        finally:
+            if slot.running:
+                self.release(slot)
+            self._finish(slot)
+
+    def slot(self, priority=INTERACTIVE, user_id=None, guild_id=None,
+             on_queued=None, on_started=None):
+        """Admit a job and hold a browser slot for its duration"""
+        return self.run(self.admit(priority, user_id, guild_id), on_queued,
+                        on_started)
+
+    def queue_depth(self):
+        """Number of admitted jobs that have not started yet"""
+        return self._queued
+
+    def stats(self):
+        """Running and queued jobs plus mean wait/exec time per priority"""
+        stats = {}
+        for priority, name in PRIORITY_NAMES.items():
+            totals = self._totals[priority]
+            jobs = totals["jobs"]
+            stats[name] = {
+                "running": self._running[priority],
+                "queued": sum(1 for p, _, future in self._waiting
+                              if p == priority and not future.done()),
+                "jobs": jobs,
+                "mean_wait": totals["wait"] / jobs if jobs else 0.0,
+                "mean_exec": totals["exec"] / jobs if jobs else 0.0
+            }
+        return stats
@@ -0,0 +1,227 @@
+import re
+import sys
+
+from extraction import is_private_profile
+
+UNKNOWN = "Unknown"
+PRIVATE_PROFILE = "Private Profile"
+
+# Add rank order mapping with more granular values
+RANK_ORDER = {
+    "one above all": -2,  # Lower value for higher rank
+    "eternity": -1,
+    "celestial": 0,
+    "grandmaster": 1,
+    "diamond": 2,
+    "platinum": 3,
+    "gold": 4,
+    "silver": 5,
+    "bronze": 6,
+    "unknown": 999  # Unknown ranks at the bottom
+}
+
+NUMBER_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+def parse_rank(rank_str):
+    """Parse rank string to get rank tier and number"""
+    try:
+        # Special handling for One Above All and Eternity
+        if rank_str.lower() == "one above all":
+            return "one above all", 0
+        elif rank_str.lower() == "eternity":
+            return "eternity", 0
+
+        parts = rank_str.lower().split()
+        if len(parts) >= 2:
+            tier = parts[0]
+            # Convert roman numerals to numbers
+            number_str = parts[1].upper()
+            number_map = {'I': 1, 'II': 2, 'III': 3}
+            number = number_map.get(number_str, 999)
+            return tier, number
+    except:
+        pass
+    return "unknown", 999  # Return unknown with high number to sort at bottom
+
+
+def parse_win_rate(win_rate_str):
+    """Parse win rate string to get numeric value"""
+    try:
+        if win_rate_str == "Private Profile" or win_rate_str == "Unknown":
+            return 0
+        # Remove the % symbol and convert to float
+        return float(win_rate_str.rstrip('%'))
+    except:
+        return 0
+
+
+def parse_count(text, cast=int):
+    """First number in scraped text such as '1,204' or '312 matches', or None"""
+    match = NUMBER_RE.search(str(text or ''))
+    if not match:
+        return None
+    return cast(match.group().replace(',', ''))
+
+
+def format_win_rate(win_rate):
+    return UNKNOWN if win_rate is None else f"{win_rate:g}%"
+
+
+class HeroStat:
+    """One of a player's top hero cards, with its numbers parsed"""
+
+    __slots__ = ("name", "rank", "matches", "win_rate", "wins", "losses",
+                 "image_url")
+
+    def __init__(self, name, rank, matches, win_rate, wins, losses,
+                 image_url=None):
+        self.name = name
+        self.rank = rank
+        self.matches = matches
+        self.win_rate = win_rate
+        self.wins = wins
+        self.losses = losses
+        self.image_url = image_url
+
+    @classmethod
+    def from_card(cls, hero):
+        """Parse a scraped hero dict, e.g. {"w_l": "175W / 137L", ...}"""
+        wins, losses = (NUMBER_RE.findall(hero.get('w_l') or '') + ['0', '0'])[:2]
+        return cls(sys.intern(hero['name']), hero.get('rank', 0),
+                   parse_count(hero.get('matches')) or 0,
+                   parse_count(hero.get('win_rate'), float) or 0.0,
+                   int(wins.replace(',', '')), int(losses.replace(',', '')),
+                   hero.get('image_url'))
+
+    @property
+    def win_rate_text(self):
+        return format_win_rate(self.win_rate)
+
+    @property
+    def w_l(self):
+        return f"{self.wins}W / {self.losses}L"
+
+
+class MatchStat:
+    """A recent match card, with its numbers parsed"""
+
+    __slots__ = ("is_win", "details", "kills", "deaths", "assists", "kda")
+
+    def __init__(self, is_win, details, kills, deaths, assists, kda):
+        self.is_win = is_win
+        self.details = details
+        self.kills = kills
+        self.deaths = deaths
+        self.assists = assists
+        self.kda = kda
+
+    @classmethod
+    def from_card(cls, match):
+        """Parse a scraped or stored match dict"""
+        stats = match.get('stats', {})
+        return cls(bool(match['is_win']), match['details'],
+                   parse_count(stats.get('K')) or 0,
+                   parse_count(stats.get('D')) or 0,
+                   parse_count(stats.get('A')) or 0,
+                   parse_count(stats.get('KDA'), float) or 0.0)
+
+    @property
+    def result(self):
+        return "Victory" if self.is_win else "Defeat"
+
+
+class PlayerSnapshot:
+    """A player's profile with every number parsed once, at scrape time
+
+    Rank, win rate and counts are stored as numbers, so sorting and
+    rendering never parse strings again. Repeated strings such as rank
+    names are interned and shared between snapshots. `level`, `win_rate`
+    and the match counts are None when the profile did not show them.
+    Roster snapshots from !top only carry rank, win rate and top heroes.
+    """
+
+    __slots__ = ("name", "rank", "tier", "division", "level", "win_rate",
+                 "time_played", "total_matches", "wins", "losses", "heroes",
+                 "matches", "stale_minutes")
+
+    def __init__(self, name, rank=UNKNOWN, win_rate=None, level=None,
+                 time_played=None, total_matches=None, wins=None, losses=None,
+                 heroes=(), matches=(), stale_minutes=None):
+        self.name = name
+        self.rank = sys.intern(rank)
+        tier, self.division = parse_rank(rank)
+        self.tier = sys.intern(tier)
+        self.win_rate = win_rate
+        self.level = level
+        self.time_played = time_played
+        self.total_matches = total_matches
+        self.wins = wins
+        self.losses = losses
+        self.heroes = heroes
+        self.matches = matches
+        self.stale_minutes = stale_minutes
+
+    @classmethod
+    def from_top_data(cls, stats):
+        """Parse get_player_data_for_top's {"name", "rank", "win_rate"},
+        plus "heroes" when the hero cards were read too"""
+        rank = stats.get("rank") or UNKNOWN
+        return cls(stats["name"], rank,
+                   None if rank == PRIVATE_PROFILE else parse_count(
+                       stats.get("win_rate"), float),
+                   heroes=tuple(HeroStat.from_card(hero)
+                                for hero in stats.get("heroes", ())))
+
+    @classmethod
+    def from_profile(cls, player_data, top_heroes, stats, recent_matches,
+                     username=None):
+        """Parse get_player_data's result"""
+        properties = {
+            prop.get("name"): prop.get("value", UNKNOWN)
+            for prop in player_data.get("additionalProperty", [])
+        }
+        rank = properties.get("Rank", UNKNOWN)
+        win_rate_text = properties.get("Win Rate", UNKNOWN)
+        win_rate = parse_count(win_rate_text, float)
+        if is_private_profile(rank, win_rate_text):
+            rank, win_rate = PRIVATE_PROFILE, None
+        time_played = stats.get("time_played")
+        return cls(player_data.get("name", username), rank, win_rate,
+                   parse_count(properties.get("Level")),
+                   None if time_played in (None, UNKNOWN) else time_played,
+                   parse_count(stats.get("total_matches")),
+                   parse_count(stats.get("wins")),
+                   parse_count(stats.get("losses")),
+                   tuple(HeroStat.from_card(hero) for hero in top_heroes),
+                   tuple(MatchStat.from_card(match) for match in recent_matches))
+
+    @property
+    def private(self):
+        return self.rank == PRIVATE_PROFILE
+
+    @property
+    def known(self):
+        return self.rank != UNKNOWN
+
+    @property
+    def win_rate_text(self):
+        if self.private:
+            return PRIVATE_PROFILE
+        return format_win_rate(self.win_rate)
+
+    @property
+    def sort_key(self):
+        """Leaderboard order: rank tier, number, then win rate"""
+        if self.rank == UNKNOWN:
+            return (999, 999, 0)  # Place unknown ranks at the bottom
+        return (RANK_ORDER.get(self.tier, 999), self.division,
+                -(self.win_rate or 0))
+
+    def with_age(self, stale_minutes):
+        """Copy of the snapshot marked as `stale_minutes` old"""
+        copy = PlayerSnapshot.__new__(PlayerSnapshot)
+        for name in self.__slots__:
+            setattr(copy, name, getattr(self, name))
+        copy.stale_minutes = stale_minutes
+        return copy
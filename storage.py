@@ -0,0 +1,13 @@
+import os
+
+
+def write_atomic(path, data):
+    """Write a string to `path` through a temporary file
+
+    The file is replaced in one step, so a crash mid-write leaves the
+    previous contents rather than a truncated file.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
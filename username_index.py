@@ -0,0 +1,150 @@
+import json
+import math
+import os
+import threading
+from collections import defaultdict
+
+from profile_cache import normalize_username
+from storage import write_atomic
+
+
+def trigrams(key):
+    """Return the set of padded trigrams for a normalized username"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class UsernameIndex:
+    """Local index of every username the bot has resolved
+
+    Exact matches ignore case and surrounding whitespace. Near misses are
+    found through a trigram inverted index and ranked by trigram similarity.
+
+    New names are appended to a log next to the index file, one JSON string
+    per line, rather than rewriting the whole file each time. load() replays
+    the log and folds it back into the index file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._names = {}  # normalized key -> canonical username
+        self._keys = []  # integer id -> normalized key
+        self._trigram_counts = []  # integer id -> number of trigrams
+        self._postings = defaultdict(list)  # trigram -> list of ids
+        self._log_lock = threading.Lock()
+
+    @property
+    def log_path(self):
+        return f"{self.path}.log" if self.path else None
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, username):
+        return normalize_username(username) in self._names
+
+    def add(self, username):
+        """Add or update a username, returning True if the index changed"""
+        key = normalize_username(username)
+        if not key:
+            return False
+        if key in self._names:
+            if self._names[key] == username:
+                return False
+            # Keep the most recent capitalisation seen on mrivals.gg
+            self._names[key] = username
+            return True
+
+        self._names[key] = username
+        name_id = len(self._keys)
+        self._keys.append(key)
+        grams = trigrams(key)
+        self._trigram_counts.append(len(grams))
+        for gram in grams:
+            self._postings[gram].append(name_id)
+        return True
+
+    def resolve(self, username):
+        """Return the canonical username for an exact case-insensitive match"""
+        return self._names.get(normalize_username(username))
+
+    def suggest(self, username, limit=3, min_similarity=0.4):
+        """Return up to `limit` known usernames similar to `username`"""
+        key = normalize_username(username)
+        if not key:
+            return []
+        grams = trigrams(key)
+
+        # Prefix filter: a candidate reaching `min_similarity` must share at
+        # least `min_shared` trigrams with the query, so it has to appear in
+        # one of the rarest len(grams) - min_shared + 1 posting lists
+        min_shared = max(1, math.ceil(min_similarity * len(grams)))
+        ordered = sorted(grams, key=lambda g: len(self._postings.get(g, ())))
+        candidates = set()
+        for gram in ordered[:len(grams) - min_shared + 1]:
+            candidates.update(self._postings.get(gram, ()))
+
+        scored = []
+        for name_id in candidates:
+            candidate = self._keys[name_id]
+            if candidate == key:
+                continue
+            shared = len(grams & trigrams(candidate))
+            similarity = shared / (len(grams) + self._trigram_counts[name_id] -
+                                   shared)
+            if similarity >= min_similarity:
+                scored.append((similarity, candidate))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [self._names[k] for _, k in scored[:limit]]
+
+    def to_json(self):
+        """Serialize the index as a JSON string of canonical usernames"""
+        return json.dumps(sorted(self._names.values()), ensure_ascii=False)
+
+    def save(self, data=None):
+        """Write the index to disk atomically
+
+        `data` may be a string from `to_json()` taken earlier, so that the
+        write can happen off the event loop without touching the index.
+        """
+        if not self.path:
+            return
+        if data is None:
+            data = self.to_json()
+        write_atomic(self.path, data)
+
+    def append(self, username):
+        """Append one username to the log, safe to call from any thread"""
+        if not self.path:
+            return
+        line = json.dumps(username, ensure_ascii=False) + "\n"
+        with self._log_lock:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index from disk, starting empty if the file is missing"""
+        index = cls(path)
+        try:
+            with open(path, encoding='utf-8') as f:
+                for username in json.load(f):
+                    index.add(username)
+        except FileNotFoundError:
+            pass
+
+        try:
+            with open(index.log_path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return index
+        for line in lines:
+            try:
+                index.add(json.loads(line))
+            except ValueError:
+                # A line cut short when the bot was killed mid-write
+                continue
+        index.save()
+        os.remove(index.log_path)
+        return index